@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Compare size and load/dump times of the supported model file formats.
+
+Usage (after running one of the example flows, i.e. examples/demo.py):
+
+    python scripts/benchmark_model_formats.py /tmp/seal5_llvm_demo
+"""
+
+import time
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from seal5.model_utils import (
+    MODEL_FORMATS,
+    SHARDED_FORMATS,
+    SHARDED_MAGIC,
+    ShardedModelReader,
+    serialize_model,
+    deserialize_model,
+    filter_model,
+)
+
+
+def find_models(paths):
+    ret = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            ret.append(path)
+            continue
+        if (path / ".seal5" / "models").is_dir():
+            path = path / ".seal5" / "models"
+        ret.extend(sorted(path.glob("*.seal5model")) + sorted(path.glob("*.m2isarmodel")))
+    return ret
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ret = func()
+        times.append(time.perf_counter() - start)
+    return min(times), ret
+
+
+def load_instruction(data, instr_name):
+    """Load the model with only a single instruction."""
+    if data.startswith(SHARDED_MAGIC):
+        return ShardedModelReader(data).load(instructions=[instr_name])
+    return filter_model(deserialize_model(data), instructions=[instr_name])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+", help="Model files, directories or Seal5 directories")
+    parser.add_argument("--formats", nargs="+", default=["pickle", *MODEL_FORMATS.keys(), *SHARDED_FORMATS.keys()])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", "-o", type=str, default=None, help="Write results to CSV file")
+    args = parser.parse_args()
+
+    models = find_models(args.paths)
+    assert len(models) > 0, "No models found"
+    rows = []
+    for model_file in models:
+        with open(model_file, "rb") as f:
+            model_obj = deserialize_model(f.read())
+        instr_names = [
+            instr_def.name for set_def in model_obj.sets.values() for instr_def in set_def.instructions.values()
+        ]
+        for fmt in args.formats:
+            try:
+                dump_s, data = measure(lambda: serialize_model(model_obj, fmt=fmt), args.repeat)
+            except RuntimeError as ex:
+                print(f"Skipping {fmt}: {ex}")
+                continue
+            load_s, _ = measure(lambda: deserialize_model(data), args.repeat)
+            if len(instr_names) > 0:
+                load_instr_s, _ = measure(lambda: load_instruction(data, instr_names[-1]), args.repeat)
+            else:
+                load_instr_s = None
+            rows.append(
+                {
+                    "model": model_file.name,
+                    "format": fmt,
+                    "size_kb": len(data) / 1e3,
+                    "dump_ms": dump_s * 1e3,
+                    "load_ms": load_s * 1e3,
+                    "load_instr_ms": load_instr_s * 1e3 if load_instr_s is not None else None,
+                }
+            )
+    df = pd.DataFrame(rows)
+    print(df.to_markdown(index=False, floatfmt=".2f"))
+    if args.output:
+        df.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
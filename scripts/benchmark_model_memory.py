@@ -0,0 +1,116 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Measure memory usage and pickled size of the Seal5 model classes on a large generated ISA.
+
+Instructions use the R/I-type encodings of RISC-V with operands as annotated by the transforms (register and
+immediate operands with types and constraints). Each register group is accessed repeatedly, as done by the
+backends.
+
+Usage:
+
+    python scripts/benchmark_model_memory.py --instrs 20000 --groups 64
+"""
+
+import gc
+import pickle
+import argparse
+import tracemalloc
+
+from m2isar.metamodel import arch
+
+from seal5 import model as seal5_model
+
+
+def make_instr(idx):
+    """Generate an instruction with the given index, every second one uses an immediate."""
+    unsigned = arch.DataType.U
+    if idx % 2:
+        encoding = [
+            arch.BitField("imm", arch.RangeSpec(11, 0), arch.DataType.S),
+            arch.BitField("rs1", arch.RangeSpec(4, 0), unsigned),
+            arch.BitVal(3, idx % 8),
+            arch.BitField("rd", arch.RangeSpec(4, 0), unsigned),
+            arch.BitVal(7, 0b0001011),
+        ]
+    else:
+        encoding = [
+            arch.BitVal(7, idx % 128),
+            arch.BitField("rs2", arch.RangeSpec(4, 0), unsigned),
+            arch.BitField("rs1", arch.RangeSpec(4, 0), unsigned),
+            arch.BitVal(3, idx % 8),
+            arch.BitField("rd", arch.RangeSpec(4, 0), unsigned),
+            arch.BitVal(7, 0b0101011),
+        ]
+    instr_def = seal5_model.Seal5Instruction(f"INSTR{idx}", {}, encoding, None, None, None, None, [], {})
+    for op_name, op in list(instr_def.operands.items()):
+        if op_name == "imm":
+            attrs = {seal5_model.Seal5OperandAttribute.IN: []}
+            op = seal5_model.Seal5ImmOperand(op.name, op.ty, attrs, op.constraints)
+        else:
+            attrs = {
+                seal5_model.Seal5OperandAttribute.OUT if op_name == "rd" else seal5_model.Seal5OperandAttribute.IN: []
+            }
+            reg_ty = seal5_model.Seal5Type(arch.DataType.U, 32, None)
+            op = seal5_model.Seal5GPROperand(op.name, op.ty, attrs, op.constraints, reg_ty)
+        instr_def.operands[op_name] = op
+    return instr_def
+
+
+def make_group(idx, size):
+    names = [f"R{idx}_{i}" for i in range(size)]
+    return seal5_model.Seal5RegisterGroup(names, 1, 32, False, False, seal5_model.Seal5RegisterClass.CUSTOM)
+
+
+def build(num_instrs, num_groups, group_size, accesses):
+    instrs = [make_instr(idx) for idx in range(num_instrs)]
+    groups = [make_group(idx, group_size) for idx in range(num_groups)]
+    registers = []
+    for _ in range(accesses):
+        for group in groups:
+            registers.append(group.registers)
+    return instrs, groups, registers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instrs", type=int, default=20000, help="Number of instructions")
+    parser.add_argument("--groups", type=int, default=64, help="Number of register groups")
+    parser.add_argument("--group-size", type=int, default=32, help="Registers per group")
+    parser.add_argument("--accesses", type=int, default=4, help="Accesses of the registers of each group")
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    objs = build(args.instrs, args.groups, args.group_size, args.accesses)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    operands = [op for instr_def in objs[0] for op in instr_def.operands.values()]
+    types = {id(op.ty) for op in operands} | {id(op.reg_ty) for op in operands if hasattr(op, "reg_ty")}
+    size = len(pickle.dumps(objs, protocol=5))
+    print(f"instructions:     {args.instrs}")
+    print(f"operands:         {len(operands)}")
+    print(f"type objects:     {len(types)}")
+    print(f"memory (current): {current / 1e6:.2f} MB")
+    print(f"memory (peak):    {peak / 1e6:.2f} MB")
+    print(f"pickled size:     {size / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Compare parse times of CoreDSL files using full LL and two-stage (SLL, then LL) prediction.
+
+Imports are not resolved, every file is parsed on its own. Each mode runs in a fresh process, as ANTLR
+shares its prediction cache (DFA) between all parsers of a process. The first parse of every file is
+reported as cold, the fastest of the following repetitions as warm.
+
+Usage:
+
+    python scripts/benchmark_parser.py examples/*/cdsl
+"""
+
+import sys
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from m2isar import M2SyntaxError
+
+from seal5.frontends.coredsl2_seal5.utils import parse_description
+from seal5.frontends.coredsl2_seal5.parse_cache import PICKLE_RECURSION_LIMIT
+
+
+def find_files(paths):
+    ret = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            ret.append(path)
+            continue
+        ret.extend(sorted(path.glob("**/*.core_desc")))
+    return ret
+
+
+def measure(files, two_stage, repeat):
+    """Worker: parse all files, returns cold and warm times per file (None for syntax errors)."""
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), PICKLE_RECURSION_LIMIT))
+    ret = {}
+    for file in files:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                parse_description(file, two_stage=two_stage)
+            except M2SyntaxError:
+                times = None
+                break
+            times.append(time.perf_counter() - start)
+        ret[file] = (times[0], min(times[1:], default=times[0])) if times else None
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+", help="CoreDSL files or directories")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", "-o", type=str, default=None, help="Write results to CSV file")
+    args = parser.parse_args()
+
+    files = find_files(args.paths)
+    assert len(files) > 0, "No files found"
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    for mode, two_stage in [("ll", False), ("two_stage", True)]:
+        with ProcessPoolExecutor(1, mp_context=ctx) as executor:
+            results[mode] = executor.submit(measure, files, two_stage, args.repeat).result()
+    rows = []
+    for file in files:
+        if results["ll"][file] is None:
+            print(f"Skipping {file}: syntax error")
+            continue
+        ll_cold, ll_warm = results["ll"][file]
+        ts_cold, ts_warm = results["two_stage"][file]
+        rows.append(
+            {
+                "file": str(file),
+                "size_kb": file.stat().st_size / 1e3,
+                "ll_cold_ms": ll_cold * 1e3,
+                "two_stage_cold_ms": ts_cold * 1e3,
+                "ll_warm_ms": ll_warm * 1e3,
+                "two_stage_warm_ms": ts_warm * 1e3,
+                "speedup_cold": ll_cold / ts_cold,
+                "speedup_warm": ll_warm / ts_warm,
+            }
+        )
+    df = pd.DataFrame(rows)
+    print(df.to_markdown(index=False, floatfmt=".2f"))
+    if args.output:
+        df.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 CoreDSL2 backend"""
+
+from .writer import main as CoreDSL2Backend
+
+__all__ = ["CoreDSL2Backend"]
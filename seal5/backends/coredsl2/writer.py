@@ -8,7 +8,6 @@
 
 """Clean M2-ISA-R/Seal5 metamodel to .core_desc file."""
 
-import copy
 import argparse
 import logging
 import pathlib
@@ -28,10 +27,14 @@ logger = Logger("backends.coredsl2_writer")
 
 class CoreDSL2Writer:
     # def __init__(self, reduced=False):
-    def __init__(self, reduced=True, version="coredsl2"):
+    def __init__(self, reduced=True, version="coredsl2", out=None):
         self.version = version
         self.reduced = reduced  # Reduced syntax for cdsl2llvm parser
-        self.text = ""
+        # Output is written to the given file object or collected in chunks (appending to a growing string is
+        # quadratic). Only the last written character is kept to track the line state.
+        self.out = out
+        self.chunks = []
+        self.last = ""
         self.indent_str = "    "
         self.level = 0
 
@@ -48,13 +51,29 @@ class CoreDSL2Writer:
     def indent(self):
         return self.indent_str * self.level
 
+    @property
+    def text(self):
+        assert self.out is None, "Output was written to file"
+        text = "".join(self.chunks)
+        self.chunks = [text] if text else []
+        return text
+
     @property
     def isstartofline(self):
-        return len(self.text) == 0 or self.text[-1] == "\n"
+        return self.last in ["", "\n"]
 
     @property
     def needsspace(self):
-        return len(self.text) != 0 and self.text[-1] not in ["\n", " "]
+        return self.last not in ["", "\n", " "]
+
+    def emit(self, text):
+        if not text:
+            return
+        if self.out is None:
+            self.chunks.append(text)
+        else:
+            self.out.write(text)
+        self.last = text[-1]
 
     def write(self, text, nl=False):
         # print("text", text, type(text))
@@ -64,10 +83,17 @@ class CoreDSL2Writer:
         lines = text.split("\n")
         for i, line in enumerate(lines):
             if self.isstartofline:
-                self.text += self.indent
-            self.text += line
+                self.emit(self.indent)
+            self.emit(line)
             if (i < len(lines) - 1) or nl:
-                self.text += "\n"
+                self.emit("\n")
+
+    def fork(self):
+        """Create a writer which continues after the current output (i.e. to write alternative endings)."""
+        writer = CoreDSL2Writer(reduced=self.reduced, version=self.version)
+        writer.emit(self.text)
+        writer.level = self.level
+        return writer
 
     def write_line(self, text):
         self.write(text, nl=True)
@@ -308,11 +334,14 @@ class CoreDSL2Writer:
         self.write_behavior(instruction)
         self.leave_block()
 
-    def write_instructions(self, instructions):
-        # print("write_instructions", instructions)
+    def enter_instructions(self):
         self.write("instructions")
         # TODO: attributes?
         self.enter_block()
+
+    def write_instructions(self, instructions):
+        # print("write_instructions", instructions)
+        self.enter_instructions()
         for instruction in instructions.values():
             self.write_instruction(instruction)
         self.leave_block()
@@ -325,8 +354,7 @@ class CoreDSL2Writer:
         # TODO: scalars, memories,...
         self.leave_block()
 
-    def write_set(self, set_def):
-        # print("write_set", set_def)
+    def enter_set(self, set_def):
         # self.write_architectural_state()
         self.write("InstructionSet ")
         self.write(set_def.name)
@@ -337,18 +365,31 @@ class CoreDSL2Writer:
             self.write(", ".join(set_def.extension))
         self.enter_block()
         self.write_functions(set_def.functions)
+
+    def write_set(self, set_def):
+        # print("write_set", set_def)
+        self.enter_set(set_def)
         self.write_instructions(set_def.instructions)
         self.leave_block()
 
+    def write_set_splitted(self, instr_def):
+        """Write set containing only the given instruction, based on the output of enter_set/enter_instructions.
+
+        The set header and functions are only generated once for all instructions of a set (see run()).
+        """
+        writer = self.fork()
+        writer.write_instruction(instr_def)
+        writer.leave_block()  # instructions
+        writer.leave_block()  # set
+        return writer.text
+
     #     for instr_name, instr_def in set_def.instructions.items():
     #         logger.debug("writing instr %s", instr_def.name)
     #         # instr_def.operation.generate(context)
     #     # input("CONT1")
 
 
-def main():
-    """Main app entrypoint."""
-
+def get_parser():
     # read command line args
     parser = argparse.ArgumentParser()
     parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")
@@ -360,7 +401,11 @@ def main():
     parser.add_argument("--metrics", default=None, help="Output metrics to file")
     parser.add_argument("--ignore-failing", action="store_true", help="Do not crash in case of errors.")
     parser.add_argument("--compat", action="store_true")
-    args = parser.parse_args()
+    return parser
+
+
+def run(args, model_obj=None):
+    """Write CoreDSL2 code for an already loaded model (or the model file passed as top_level)."""
 
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -370,7 +415,8 @@ def main():
     assert args.output is not None
     out_path = pathlib.Path(args.output)
 
-    model_obj = load_model(top_level, compat=args.compat)
+    if model_obj is None:
+        model_obj = load_model(top_level, compat=args.compat)
 
     # preprocess model
     # print("model", model)
@@ -391,21 +437,23 @@ def main():
         assert out_path.is_dir(), "Expecting output directory when using --splitted"
         for set_name, set_def in model_obj.sets.items():
             metrics["n_sets"] += 1
+            logger.debug("writing set %s", set_def.name)
+            patch_model(visitor)
+            # Header and functions are shared by the files of all instructions of the set
+            header = CoreDSL2Writer(reduced=args.reduced)
+            try:
+                header.enter_set(set_def)
+                header.enter_instructions()
+            except Exception as ex:
+                logger.exception(ex)
+                header = None
             for instr_def in set_def.instructions.values():
                 metrics["n_instructions"] += 1
-                writer = CoreDSL2Writer(reduced=args.reduced)
                 logger.debug("writing instr %s/%s", set_def.name, instr_def.name)
-                patch_model(visitor)
-                set_def_ = copy.deepcopy(set_def)
-                set_def_.instructions = {
-                    key: instr_def
-                    for key, instr_def_ in set_def.instructions.items()
-                    if instr_def.name == instr_def_.name
-                }
                 try:
+                    assert header is not None, f"Failed to write set {set_name}"
                     # TODO: drop_ununsed
-                    writer.write_set(set_def_)
-                    content = writer.text
+                    content = header.write_set_splitted(instr_def)
                     out_path_ = out_path / set_name / f"{instr_def.name}.{args.ext}"
                     out_path_.parent.mkdir(exist_ok=True)
                     with open(out_path_, "w", encoding="utf-8") as f:
@@ -417,26 +465,21 @@ def main():
                     metrics["n_failed"] += 1
                     metrics["failed_instructions"].append(instr_def.name)
     else:
-        writer = CoreDSL2Writer(reduced=args.reduced)
-        for set_name, set_def in model_obj.sets.items():
-            metrics["n_sets"] += 1
-            # print("set", set_def)
-            # print("instrs", set_def.instructions)
-            # input("123")
-            logger.debug("writing set %s", set_def.name)
-            patch_model(visitor)
-            try:
-                writer.write_set(set_def)
-                metrics["n_success"] += 1
-                metrics["success_sets"].append(set_name)
-                # TODO: add instrs as well?
-            except Exception as ex:
-                logger.exception(ex)
-                metrics["n_failed"] += 1
-                metrics["failed_sets"].append(set_name)
-        content = writer.text
         with open(out_path, "w", encoding="utf-8") as f:
-            f.write(content)
+            writer = CoreDSL2Writer(reduced=args.reduced, out=f)
+            for set_name, set_def in model_obj.sets.items():
+                metrics["n_sets"] += 1
+                logger.debug("writing set %s", set_def.name)
+                patch_model(visitor)
+                try:
+                    writer.write_set(set_def)
+                    metrics["n_success"] += 1
+                    metrics["success_sets"].append(set_name)
+                    # TODO: add instrs as well?
+                except Exception as ex:
+                    logger.exception(ex)
+                    metrics["n_failed"] += 1
+                    metrics["failed_sets"].append(set_name)
     if not args.ignore_failing:
         n_failed = metrics["n_failed"]
         if n_failed > 0:
@@ -450,5 +493,12 @@ def main():
         metrics_df.to_csv(metrics_file, index=False)
 
 
+def main(argv=None, model_obj=None):
+    """Main app entrypoint."""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args, model_obj=model_obj)
+
+
 if __name__ == "__main__":
     main()
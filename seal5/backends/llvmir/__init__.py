@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 LLVMIR backend"""
+
+from .writer import main as LLVMIRBackend
+
+__all__ = ["LLVMIRBackend"]
@@ -25,9 +25,7 @@ from seal5.logging import Logger
 logger = Logger("backends.llvmir_behavior_writer")
 
 
-def main():
-    """Main app entrypoint."""
-
+def get_parser():
     # read command line args
     parser = argparse.ArgumentParser()
     parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")
@@ -36,8 +34,30 @@ def main():
     parser.add_argument("--splitted", action="store_true", help="Split per set and instruction")
     parser.add_argument("--metrics", default=None, help="Output metrics to file")
     parser.add_argument("--ext", type=str, default="ll", help="Default file extension (if using --splitted)")
+    parser.add_argument(
+        "--sets",
+        type=str,
+        default=None,
+        help="Only load the given sets (comma-separated, for manual runs: outputs only cover the selection)",
+    )
+    parser.add_argument(
+        "--instructions",
+        type=str,
+        default=None,
+        help="Only load the given instructions (comma-separated, for manual runs: outputs only cover the selection)",
+    )
     parser.add_argument("--compat", action="store_true")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--cdsl2llvm-dir",
+        type=str,
+        default=os.environ.get("CDSL2LLVM_DIR"),
+        help="Build directory of cdsl2llvm (LLVM), defaults to CDSL2LLVM_DIR",
+    )
+    return parser
+
+
+def run(args, model_obj=None):
+    """Write LLVM-IR for an already loaded model (or the model file passed as top_level)."""
 
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -46,8 +66,18 @@ def main():
     top_level = pathlib.Path(args.top_level)
     out_path = pathlib.Path(args.output)
     model_name = top_level.stem
-
-    model_obj = load_model(top_level, compat=args.compat)
+    assert args.cdsl2llvm_dir is not None, "Missing --cdsl2llvm-dir (or CDSL2LLVM_DIR)"
+    install_dir = pathlib.Path(args.cdsl2llvm_dir)
+
+    if model_obj is None:
+        model_obj = load_model(
+            top_level,
+            compat=args.compat,
+            sets=args.sets.split(",") if args.sets else None,
+            instructions=args.instructions.split(",") if args.instructions else None,
+        )
+    else:
+        assert args.sets is None and args.instructions is None, "Can not filter a loaded model"
 
     # preprocess model
     # print("model", model)
@@ -123,9 +153,6 @@ def main():
                             xlen = xlen_
                 mattr = build_riscv_mattr(features, xlen)
 
-                install_dir = os.getenv("CDSL2LLVM_DIR", None)
-                assert install_dir is not None
-                install_dir = pathlib.Path(install_dir)
                 try:
                     cdsl2llvm.run_pattern_gen(
                         # install_dir / "llvm" / "build",
@@ -159,5 +186,12 @@ def main():
         metrics_df.to_csv(metrics_file, index=False)
 
 
+def main(argv=None, model_obj=None):
+    """Main app entrypoint."""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args, model_obj=model_obj)
+
+
 if __name__ == "__main__":
     main()
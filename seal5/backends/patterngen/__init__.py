@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 PatternGen backend"""
+
+from .writer import main as PatternGenBackend
+
+__all__ = ["PatternGenBackend"]
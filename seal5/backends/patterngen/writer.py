@@ -21,15 +21,14 @@ from seal5.index import write_index_yaml, File, NamedPatch
 from seal5.model import Seal5InstrAttribute
 from seal5.riscv_utils import build_riscv_mattr, get_riscv_defaults
 from seal5.model_utils import load_model
+from seal5.tool_cache import open_tool_cache
 
 from seal5.logging import Logger
 
 logger = Logger("backends.patterngen_tablegen_writer")
 
 
-def main():
-    """Main app entrypoint."""
-
+def get_parser():
     # read command line args
     parser = argparse.ArgumentParser()
     parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")
@@ -42,10 +41,33 @@ def main():
     parser.add_argument("--index", default=None, help="Output index to file")
     parser.add_argument("--ext", type=str, default="td", help="Default file extension (if using --splitted)")
     parser.add_argument("--parallel", type=int, default=1, help="How many instructions should be processed in parallel")
+    parser.add_argument(
+        "--sets",
+        type=str,
+        default=None,
+        help="Only load the given sets (comma-separated, for manual runs: outputs only cover the selection)",
+    )
+    parser.add_argument(
+        "--instructions",
+        type=str,
+        default=None,
+        help="Only load the given instructions (comma-separated, for manual runs: outputs only cover the selection)",
+    )
     parser.add_argument("--compat", action="store_true")
+    parser.add_argument(
+        "--cdsl2llvm-dir",
+        type=str,
+        default=os.environ.get("CDSL2LLVM_DIR"),
+        help="Build directory of cdsl2llvm (LLVM), defaults to CDSL2LLVM_DIR",
+    )
+    parser.add_argument("--cache-dir", type=str, default=None, help="Cache pattern-gen results in this directory")
     parser.add_argument("--verbose", action="store_true")
     # parser.add_argument("--xlen", type=int, default=32, help="RISC-V XLEN")
-    args = parser.parse_args()
+    return parser
+
+
+def run(args, model_obj=None):
+    """Generate TableGen patterns for an already loaded model (or the model file passed as top_level)."""
 
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -54,8 +76,18 @@ def main():
     top_level = pathlib.Path(args.top_level)
     out_path = pathlib.Path(args.output)
     model_name = top_level.stem
+    assert args.cdsl2llvm_dir is not None, "Missing --cdsl2llvm-dir (or CDSL2LLVM_DIR)"
+    install_dir = pathlib.Path(args.cdsl2llvm_dir)
 
-    model_obj = load_model(top_level, compat=args.compat)
+    if model_obj is None:
+        model_obj = load_model(
+            top_level,
+            compat=args.compat,
+            sets=args.sets.split(",") if args.sets else None,
+            instructions=args.instructions.split(",") if args.instructions else None,
+        )
+    else:
+        assert args.sets is None and args.instructions is None, "Can not filter a loaded model"
 
     metrics = {
         "n_sets": 0,
@@ -63,6 +95,7 @@ def main():
         "n_skipped": 0,
         "n_failed": 0,
         "n_success": 0,
+        "n_cached": 0,
         "skipped_instructions": [],
         "failed_instructions": [],
         "success_instructions": [],
@@ -85,115 +118,126 @@ def main():
             riscv_settings = None
 
         assert out_path.is_dir(), "Expecting output directory when using --splitted"
-        for set_name, set_def in model_obj.sets.items():
-            if len(set_def.instructions) == 0:
-                continue
-            xlen = set_def.xlen
-            artifacts[set_name] = []
-            metrics["n_sets"] += 1
-            set_dir = out_path / set_name
-            ext_settings = set_def.settings
-            riscv_settings_ = riscv_settings
-            ext_riscv_settings = ext_settings.riscv
-            if ext_riscv_settings is not None:
-                riscv_settings_ = riscv_settings_.merge(ext_riscv_settings)
-            default_features, default_xlen = get_riscv_defaults(riscv_settings)
-            if xlen is None:  # TODO: redundant?
-                xlen = default_xlen
-
-            predicate = None
-            features = [*default_features]
-            if ext_settings is not None:
-                predicate = ext_settings.get_predicate(name=set_name)
-                arch_ = ext_settings.get_arch(name=set_name)
-                if arch_ is not None:
-                    features.append(arch_)
-
-            mattr = build_riscv_mattr(features, xlen)
-
-            def process_instrunction(instr_def, set_name, set_dir, mattr, predicate, xlen):
-                includes_ = []
-                metrics["n_instructions"] += 1
-                input_file = out_path / set_name / f"{instr_def.name}.core_desc"
-                attrs = instr_def.attributes
-                skip = False
-                if len(attrs) > 0:
-                    skip = Seal5InstrAttribute.SKIP_PATTERN_GEN in attrs
-                if not input_file.is_file():
-                    skip = True
-                if skip:
-                    metrics["n_skipped"] += 1
-                    metrics["skipped_instructions"].append(instr_def.name)
-                    return False, includes_
-                # if args.patterns:
-                out_name = f"{instr_def.name}.{args.ext}"
-                output_file = set_dir / out_name
-                if args.formats:
-                    out_name_fmt = f"{instr_def.name}InstrFormat.{args.ext}"
-                    output_file_fmt = set_dir / out_name_fmt
-                install_dir = os.getenv("CDSL2LLVM_DIR", None)
-
-                assert install_dir is not None
-                install_dir = pathlib.Path(install_dir)
-                try:
-                    cdsl2llvm.run_pattern_gen(
-                        # install_dir / "llvm" / "build",
-                        install_dir,
-                        input_file,
-                        output_file,
-                        skip_patterns=not args.patterns,
-                        skip_formats=not args.formats,
-                        ext=predicate,
-                        mattr=mattr,
-                        xlen=xlen,
-                        verbose=args.verbose,
-                    )
-                    if output_file.is_file():
-                        metrics["n_success"] += 1
-                        metrics["success_instructions"].append(instr_def.name)
-                        if args.formats:
-                            file_artifact_fmt_dest = f"llvm/lib/Target/RISCV/seal5/{set_name}/{out_name_fmt}"
-                            file_artifact_fmt = File(file_artifact_fmt_dest, src_path=output_file_fmt)
-                            artifacts[set_name].append(file_artifact_fmt)
-                            include_path_fmt = f"{set_name}/{out_name_fmt}"
-                            includes_.append(include_path_fmt)
-                        if args.patterns:
-                            file_artifact_dest = f"llvm/lib/Target/RISCV/seal5/{set_name}/{out_name}"
-                            file_artifact = File(file_artifact_dest, src_path=output_file)
-                            artifacts[set_name].append(file_artifact)
-                            include_path = f"{set_name}/{out_name}"
-                            includes_.append(include_path)
-                    else:
+        cache = open_tool_cache(args.cache_dir)
+        worker = cdsl2llvm.start_pattern_gen_worker(install_dir, jobs=args.parallel, verbose=args.verbose)
+        try:
+            for set_name, set_def in model_obj.sets.items():
+                if len(set_def.instructions) == 0:
+                    continue
+                xlen = set_def.xlen
+                artifacts[set_name] = []
+                metrics["n_sets"] += 1
+                set_dir = out_path / set_name
+                ext_settings = set_def.settings
+                riscv_settings_ = riscv_settings
+                ext_riscv_settings = ext_settings.riscv
+                if ext_riscv_settings is not None:
+                    riscv_settings_ = riscv_settings_.merge(ext_riscv_settings)
+                default_features, default_xlen = get_riscv_defaults(riscv_settings)
+                if xlen is None:  # TODO: redundant?
+                    xlen = default_xlen
+
+                predicate = None
+                features = [*default_features]
+                if ext_settings is not None:
+                    predicate = ext_settings.get_predicate(name=set_name)
+                    arch_ = ext_settings.get_arch(name=set_name)
+                    if arch_ is not None:
+                        features.append(arch_)
+
+                mattr = build_riscv_mattr(features, xlen)
+
+                def process_instrunction(instr_def, set_name, set_dir, mattr, predicate, xlen):
+                    includes_ = []
+                    metrics["n_instructions"] += 1
+                    input_file = out_path / set_name / f"{instr_def.name}.core_desc"
+                    attrs = instr_def.attributes
+                    skip = False
+                    if len(attrs) > 0:
+                        skip = Seal5InstrAttribute.SKIP_PATTERN_GEN in attrs
+                    if not input_file.is_file():
+                        skip = True
+                    if skip:
+                        metrics["n_skipped"] += 1
+                        metrics["skipped_instructions"].append(instr_def.name)
+                        return False, includes_
+                    # if args.patterns:
+                    out_name = f"{instr_def.name}.{args.ext}"
+                    output_file = set_dir / out_name
+                    if args.formats:
+                        out_name_fmt = f"{instr_def.name}InstrFormat.{args.ext}"
+                        output_file_fmt = set_dir / out_name_fmt
+                    try:
+                        cdsl2llvm.run_pattern_gen(
+                            # install_dir / "llvm" / "build",
+                            install_dir,
+                            input_file,
+                            output_file,
+                            skip_patterns=not args.patterns,
+                            skip_formats=not args.formats,
+                            ext=predicate,
+                            mattr=mattr,
+                            xlen=xlen,
+                            verbose=args.verbose,
+                            worker=worker,
+                            cache=cache,
+                        )
+                        if output_file.is_file():
+                            metrics["n_success"] += 1
+                            metrics["success_instructions"].append(instr_def.name)
+                            if args.formats:
+                                file_artifact_fmt_dest = f"llvm/lib/Target/RISCV/seal5/{set_name}/{out_name_fmt}"
+                                file_artifact_fmt = File(file_artifact_fmt_dest, src_path=output_file_fmt)
+                                artifacts[set_name].append(file_artifact_fmt)
+                                include_path_fmt = f"{set_name}/{out_name_fmt}"
+                                includes_.append(include_path_fmt)
+                            if args.patterns:
+                                file_artifact_dest = f"llvm/lib/Target/RISCV/seal5/{set_name}/{out_name}"
+                                file_artifact = File(file_artifact_dest, src_path=output_file)
+                                artifacts[set_name].append(file_artifact)
+                                include_path = f"{set_name}/{out_name}"
+                                includes_.append(include_path)
+                        else:
+                            metrics["n_failed"] += 1
+                            metrics["failed_instructions"].append(instr_def.name)
+                    except AssertionError:
                         metrics["n_failed"] += 1
                         metrics["failed_instructions"].append(instr_def.name)
-                except AssertionError:
-                    metrics["n_failed"] += 1
-                    metrics["failed_instructions"].append(instr_def.name)
-                    return False, includes_
-                    # errs.append((insn_name, str(ex)))
-                return True, includes_
-
-            includes = []
-            with ThreadPoolExecutor(args.parallel) as executor:
-                futures = []
-                for instr_def in set_def.instructions.values():
-                    future = executor.submit(process_instrunction, instr_def, set_name, set_dir, mattr, predicate, xlen)
-                    futures.append(future)
-                results = []
-                for future in as_completed(futures):
-                    result_, includes_ = future.result()
-                    results.append(result_)
-                    if result_:
-                        includes.extend(includes_)
-            if len(includes) > 0:
-                set_includes_str = "\n".join([f'include "seal5/{inc}"' for inc in sorted(includes)])
-                if len(set_includes_str.strip()) > 0:
-                    set_includes_artifact_dest = f"llvm/lib/Target/RISCV/seal5/{set_name}.td"
-                    set_name_lower = set_name.lower()
-                    key = f"{set_name_lower}_set_td_includes"
-                    set_includes_artifact = NamedPatch(set_includes_artifact_dest, key=key, content=set_includes_str)
-                    artifacts[set_name].append(set_includes_artifact)
-                    # model_includes.append(f"{set_name}.td")
+                        return False, includes_
+                        # errs.append((insn_name, str(ex)))
+                    return True, includes_
+
+                includes = []
+                with ThreadPoolExecutor(args.parallel) as executor:
+                    futures = []
+                    for instr_def in set_def.instructions.values():
+                        future = executor.submit(
+                            process_instrunction, instr_def, set_name, set_dir, mattr, predicate, xlen
+                        )
+                        futures.append(future)
+                    results = []
+                    for future in as_completed(futures):
+                        result_, includes_ = future.result()
+                        results.append(result_)
+                        if result_:
+                            includes.extend(includes_)
+                if len(includes) > 0:
+                    set_includes_str = "\n".join([f'include "seal5/{inc}"' for inc in sorted(includes)])
+                    if len(set_includes_str.strip()) > 0:
+                        set_includes_artifact_dest = f"llvm/lib/Target/RISCV/seal5/{set_name}.td"
+                        set_name_lower = set_name.lower()
+                        key = f"{set_name_lower}_set_td_includes"
+                        set_includes_artifact = NamedPatch(
+                            set_includes_artifact_dest, key=key, content=set_includes_str
+                        )
+                        artifacts[set_name].append(set_includes_artifact)
+                        # model_includes.append(f"{set_name}.td")
+        finally:
+            if worker is not None:
+                worker.close()
+        if cache is not None:
+            metrics["n_cached"] = cache.n_hits
+            cache.evict()
         # if len(model_includes) > 0:
         #     model_includes_str = "\n".join([f'include "seal5/{inc}"' for inc in model_includes])
         #     model_includes_artifact_dest = "llvm/lib/Target/RISCV/seal5.td"
@@ -224,5 +268,12 @@ def main():
             logger.warning("No patches generated. No index file will be written.")
 
 
+def main(argv=None, model_obj=None):
+    """Main app entrypoint."""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args, model_obj=model_obj)
+
+
 if __name__ == "__main__":
     main()
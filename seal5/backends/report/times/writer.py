@@ -20,6 +20,9 @@ from seal5.logging import Logger
 
 logger = Logger("backends.times_writer")
 
+# Metrics recorded for profiled passes (SEAL5_PROFILE)
+PROFILE_KEYS = ["cpu_s", "child_cpu_s", "peak_mem_mb", "max_rss_mb", "hotspots"]
+
 
 def main():
     """Main app entrypoint."""
@@ -32,6 +35,8 @@ def main():
     parser.add_argument("--yaml", type=str, default=None)
     parser.add_argument("--pass-times", action="store_true")
     parser.add_argument("--sum-level", type=int, default=None)
+    parser.add_argument("--profile", action="store_true", help="Add CPU time, memory usage and hotspots")
+    parser.add_argument("--top", type=int, default=3, help="Number of hotspots per pass")
     args = parser.parse_args()
 
     # initialize logging
@@ -95,13 +100,16 @@ def main():
         for stage_metrics in metrics:
             result = traverse(stage_metrics)
             all_metrics.extend(result)
-        filtered_metrics = [
-            (x, {k: v for k, v in y.items() if k in ["time_s", "start", "end"]}) for x, y in all_metrics
-        ]
+        keys = ["time_s", "start", "end"]
+        if args.profile:
+            keys += PROFILE_KEYS
+        filtered_metrics = [(x, {k: v for k, v in y.items() if k in keys}) for x, y in all_metrics]
         filtered_metrics = [(x, y) for x, y in filtered_metrics if len(y) > 0]
-        filtered_metrics = [
-            (x, {"time_s": y.get("time_s"), "start": y.get("start"), "end": y.get("end")}) for x, y in filtered_metrics
-        ]
+        filtered_metrics = [(x, {k: y.get(k) for k in keys}) for x, y in filtered_metrics]
+        if args.profile:
+            for _, y in filtered_metrics:
+                hotspots = y["hotspots"]
+                y["hotspots"] = "; ".join(hotspots[: args.top]) if hotspots else None
         stage_metrics = [{"stage": x, **y} for x, y in filtered_metrics if "." not in x]
         pass_metrics = [{"pass": x.split(".", 1)[-1], **y} for x, y in filtered_metrics if "." in x]
         return stage_metrics, pass_metrics
@@ -114,7 +122,10 @@ def main():
         pass_times_df = pd.DataFrame(pass_times).sort_values("start")
         if args.sum_level:
             pass_times_df["pass"] = pass_times_df["pass"].apply(lambda x: ".".join(x.split(".")[: args.sum_level]))
-            pass_times_df = pass_times_df.groupby("pass", as_index=False).agg({"start": "min", "end": "max"})
+            agg = {"start": "min", "end": "max"}
+            if args.profile:
+                agg.update({"cpu_s": "sum", "child_cpu_s": "sum", "peak_mem_mb": "max", "max_rss_mb": "max"})
+            pass_times_df = pass_times_df.groupby("pass", as_index=False).agg(agg)
             pass_times_df["time_s"] = pass_times_df["end"] - pass_times_df["start"]
             pass_times_df.sort_values("start", inplace=True)
         times_df = pd.concat([stage_times_df, pass_times_df])
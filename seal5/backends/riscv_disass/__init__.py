@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 RISCVDisassembler.cpp backend"""
+
+from .writer import main as RISCVDisassBackend
+
+__all__ = ["RISCVDisassBackend"]
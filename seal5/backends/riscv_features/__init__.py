@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 RISCVFeatures.td backend"""
+
+from .writer import main as RISCVFeaturesBackend
+
+__all__ = ["RISCVFeaturesBackend"]
@@ -134,9 +134,7 @@ def gen_riscv_features_str(
     return content_text + "\n", test_files
 
 
-def main():
-    """Main app entrypoint."""
-
+def get_parser():
     # read command line args
     parser = argparse.ArgumentParser()
     parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")
@@ -149,7 +147,11 @@ def main():
     parser.add_argument("--ext", type=str, default="td", help="Default file extension (if using --splitted)")
     parser.add_argument("--compat", action="store_true")
     parser.add_argument("--generate-tests", action="store_true")
-    args = parser.parse_args()
+    return parser
+
+
+def run(args, model_obj=None):
+    """Generate RISCVFeatures.td patch for an already loaded model (or the model file passed as top_level)."""
 
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -158,7 +160,8 @@ def main():
     top_level = pathlib.Path(args.top_level)
     out_path = pathlib.Path(args.output)
 
-    model_obj = load_model(top_level, compat=args.compat)
+    if model_obj is None:
+        model_obj = load_model(top_level, compat=args.compat)
 
     metrics = {
         "n_sets": 0,
@@ -226,5 +229,12 @@ def main():
             logger.warning("No patches generated. No index file will be written.")
 
 
+def main(argv=None, model_obj=None):
+    """Main app entrypoint."""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args, model_obj=model_obj)
+
+
 if __name__ == "__main__":
     main()
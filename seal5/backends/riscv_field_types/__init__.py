@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Backend for field info patches in LLVM."""
+
+from .writer import main as RISCVFieldTypesBackend
+
+__all__ = ["RISCVFieldTypesBackend"]
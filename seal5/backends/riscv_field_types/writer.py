@@ -122,9 +122,7 @@ def gen_riscv_field_types_str(field_types, llvm_settings):
     return riscv_field_types_content, riscv_operands_asm_content, riscv_operands_enum_content
 
 
-def main():
-    """Main app entrypoint."""
-
+def get_parser():
     # read command line args
     parser = argparse.ArgumentParser()
     # parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")  # TODO: drop?
@@ -135,16 +133,21 @@ def main():
     parser.add_argument("--ext", type=str, default="td", help="Default file extension (if using --splitted)")
     parser.add_argument("--compat", action="store_true")
     parser.add_argument("--yaml", type=str, default=None)
-    args = parser.parse_args()
+    return parser
+
+
+def run(args, settings=None):
+    """Generate RISCV field types patches for the given settings object (or the file passed via --yaml)."""
 
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
 
     # resolve model paths
     # top_level = pathlib.Path(args.top_level)
-    assert args.yaml is not None
-    assert pathlib.Path(args.yaml).is_file()
-    settings = Seal5Settings.from_yaml_file(args.yaml)
+    if settings is None:
+        assert args.yaml is not None
+        assert pathlib.Path(args.yaml).is_file()
+        settings = Seal5Settings.from_yaml_file(args.yaml)
     llvm_settings = settings.llvm
     assert llvm_settings is not None
 
@@ -237,5 +240,12 @@ def main():
             logger.warning("No patches generated. No index file will be written.")
 
 
+def main(argv=None, settings=None):
+    """Main app entrypoint."""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args, settings=settings)
+
+
 if __name__ == "__main__":
     main()
@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 RISCV GISel Legalizer backend"""
+
+from .writer import main as RISCVGISelLegalizerBackend
+
+__all__ = ["RISCVGISelLegalizerBackend"]
@@ -95,9 +95,7 @@ def gen_riscv_gisel_legalizer_str(legalizer_settings: RISCVLegalizerSettings):
     return ret
 
 
-def main():
-    """Main app entrypoint."""
-
+def get_parser():
     # read command line args
     parser = argparse.ArgumentParser()
     parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")
@@ -107,7 +105,11 @@ def main():
     parser.add_argument("--index", default=None, help="Output index to file")
     parser.add_argument("--ext", type=str, default="td", help="Default file extension (if using --splitted)")
     parser.add_argument("--yaml", type=str, default=None)
-    args = parser.parse_args()
+    return parser
+
+
+def run(args, settings=None):
+    """Generate RISCVLegalizerInfo.cpp patch for the given settings object (or the file passed via --yaml)."""
 
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -131,9 +133,10 @@ def main():
     assert args.output is not None
     out_path = pathlib.Path(args.output)
 
-    assert args.yaml is not None
-    assert pathlib.Path(args.yaml).is_file()
-    settings = Seal5Settings.from_yaml_file(args.yaml)
+    if settings is None:
+        assert args.yaml is not None
+        assert pathlib.Path(args.yaml).is_file()
+        settings = Seal5Settings.from_yaml_file(args.yaml)
 
     # logger.info("loading models")
     # if not is_seal5_model:
@@ -184,5 +187,12 @@ def main():
             logger.warning("No patches generated. No index file will be written.")
 
 
+def main(argv=None, settings=None):
+    """Main app entrypoint."""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args, settings=settings)
+
+
 if __name__ == "__main__":
     main()
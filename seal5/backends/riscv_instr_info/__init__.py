@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Backend for RISCVInstrInfo.td"""
+
+from .writer import main as RISCVInstrInfoBackend
+
+__all__ = ["RISCVInstrInfoBackend"]
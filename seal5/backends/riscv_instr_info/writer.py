@@ -245,9 +245,7 @@ def : Pat_{instr.name}<int_riscv_{arch_}_{intrinsic.intrinsic_name}, {instr.name
     return pat
 
 
-def main():
-    """Main app entrypoint."""
-
+def get_parser():
     # read command line args
     parser = argparse.ArgumentParser()
     parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")
@@ -267,7 +265,11 @@ def main():
     )
     parser.add_argument("--ignore-failing", action="store_true", help="Do not crash in case of errors.")
     parser.add_argument("--compat", action="store_true")
-    args = parser.parse_args()
+    return parser
+
+
+def run(args, model_obj=None):
+    """Generate RISCVInstrInfo.td patches for an already loaded model (or the model file passed as top_level)."""
 
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -276,7 +278,8 @@ def main():
     top_level = pathlib.Path(args.top_level)
     out_path = pathlib.Path(args.output)
 
-    model_obj = load_model(top_level, compat=args.compat)
+    if model_obj is None:
+        model_obj = load_model(top_level, compat=args.compat)
 
     metrics = {
         "n_sets": 0,
@@ -385,5 +388,12 @@ def main():
             logger.warning("No patches generated. No index file will be written.")
 
 
+def main(argv=None, model_obj=None):
+    """Main app entrypoint."""
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args, model_obj=model_obj)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,3 @@
+from .writer import main as RISCVIntrinsicsBackend
+
+__all__ = ["RISCVIntrinsicsBackend"]
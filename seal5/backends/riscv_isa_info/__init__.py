@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 RISCVISAInfo.td backend"""
+
+from .writer import main as RISCVISAInfoBackend
+
+__all__ = ["RISCVISAInfoBackend"]
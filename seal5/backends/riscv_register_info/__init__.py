@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 RISCVRegisterInfo.td backend"""
+
+from .writer import main as RISCVRegisterInfoBackend
+
+__all__ = ["RISCVRegisterInfoBackend"]
@@ -17,3 +17,7 @@
 # limitations under the License.
 #
 """Seal5 YAML backend."""
+
+from .writer import main as YAMLBackend
+
+__all__ = ["YAMLBackend"]
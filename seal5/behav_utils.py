@@ -0,0 +1,99 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Utilities for behavior trees: interning of leaf nodes."""
+
+from m2isar.metamodel import behav
+
+# Leaf nodes which can be shared. Inner nodes can not: transforms replace their children in place, which would be
+# applied once per occurrence. Literals and references are only safe for models which are not transformed anymore,
+# as the inferred type of a child is modified in place by some transforms (i.e. type_conv of infer_types).
+INTERNED_TYPES = (behav.Operator,)
+LEAF_TYPES = (behav.NumberLiteral, behav.NamedReference, behav.Operator)
+PRIMITIVE_TYPES = (int, str, bool, float, type(None))
+
+
+def iter_children(node):
+    """Yield (container, key, child) for all behavior nodes directly referenced by node."""
+    for attr, value in node.__dict__.items():
+        if isinstance(value, behav.BaseNode):
+            yield node.__dict__, attr, value
+        elif isinstance(value, list):
+            for idx, item in enumerate(value):
+                if isinstance(item, behav.BaseNode):
+                    yield value, idx, item
+
+
+def get_leaf_key(node):
+    # Referenced objects (memories, fields,...) are compared by identity
+    return (type(node),) + tuple(
+        (attr, value if isinstance(value, PRIMITIVE_TYPES) else id(value)) for attr, value in node.__dict__.items()
+    )
+
+
+def get_roots(set_def):
+    """Behavior trees of a set by kind: instruction behavior, instruction attributes and function bodies."""
+    instrs = list(set_def.instructions.values())
+    return {
+        "instructions": [instr_def.operation for instr_def in instrs],
+        "attributes": [op for instr_def in instrs for ops in instr_def.attributes.values() for op in ops],
+        "functions": [func_def.operation for func_def in set_def.functions.values()],
+    }
+
+
+class BehaviorInterner:
+    """Replace identical leaf nodes (of the given types, see LEAF_TYPES) of behavior trees by a shared instance.
+
+    Reduces the number of objects of a model (memory usage and size of the pickled model). Nodes shared by
+    multiple trees (i.e. always blocks) are only visited once. Leaves are only shared between trees of the same
+    kind (see get_roots), as transforms do not visit all kinds (i.e. types are only inferred for instructions).
+    """
+
+    def __init__(self, types=INTERNED_TYPES):
+        self.types = tuple(types)
+        self.tables = {}
+        self.n_nodes = 0
+        self.n_interned = 0
+
+    def intern_tree(self, root, visited, table):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if id(node) in visited:
+                continue
+            visited.add(id(node))
+            self.n_nodes += 1
+            for container, key, child in iter_children(node):
+                if isinstance(child, self.types):
+                    self.n_nodes += 1
+                    shared = table.setdefault(get_leaf_key(child), child)
+                    if shared is not child:
+                        container[key] = shared
+                        self.n_interned += 1
+                else:
+                    stack.append(child)
+
+    def intern_model(self, model_obj):
+        visited = set()
+        for set_def in model_obj.sets.values():
+            for kind, roots in get_roots(set_def).items():
+                table = self.tables.setdefault(kind, {})
+                for root in roots:
+                    if root is not None and not isinstance(root, self.types):
+                        self.intern_tree(root, visited, table)
+        return self.n_interned
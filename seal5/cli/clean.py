@@ -67,6 +67,21 @@ def add_clean_options(parser):
         action="store_true",
         help="Delete deps folder folder?",
     )
+    clean_parser.add_argument(
+        "--pass-cache",
+        action="store_true",
+        help="Delete cached pass results?",
+    )
+    clean_parser.add_argument(
+        "--parse-cache",
+        action="store_true",
+        help="Delete cached CoreDSL parse trees?",
+    )
+    clean_parser.add_argument(
+        "--tool-cache",
+        action="store_true",
+        help="Delete cached pattern-gen and llc results?",
+    )
     clean_parser.add_argument(
         "--non-interactive",
         default=True,
@@ -95,6 +110,9 @@ def handle(args):
         install=args.install,
         build=args.build,
         deps=args.deps,
+        pass_cache=args.pass_cache,
+        parse_cache=args.parse_cache,
+        tool_cache=args.tool_cache,
         verbose=args.verbose,
         interactive=not args.non_interactive,
     )
@@ -41,6 +41,31 @@ def add_generate_options(parser):
         default=None,
         help="Passes that should be carried out",
     )
+    generate_parser.add_argument(
+        "--schedule",
+        type=str,
+        choices=["list", "dag"],
+        default=None,
+        help="Run passes in order (list) or independent passes concurrently (dag)",
+    )
+    generate_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Max. number of concurrently running passes for dag schedule",
+    )
+    generate_parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=None,
+        help="Skip passes completed by the previous run if models and settings are unchanged (default: SEAL5_RESUME)",
+    )
+    generate_parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=None,
+        help="Record CPU time, memory usage and hotspots of passes (default: SEAL5_PROFILE)",
+    )
 
 
 def get_parser(subparsers):
@@ -58,4 +83,8 @@ def handle(args):
         verbose=args.verbose,
         skip=None if args.skip is None else list(args.skip),
         only=None if args.only is None else list(args.only),
+        schedule=args.schedule,
+        workers=args.workers,
+        resume=args.resume,
+        profile=args.profile,
     )
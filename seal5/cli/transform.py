@@ -41,6 +41,36 @@ def add_transform_options(parser):
         default=None,
         help="Passes that should be carried out",
     )
+    transform_parser.add_argument(
+        "--model-session",
+        action="store_true",
+        default=None,
+        help="Keep models in memory between passes (default: SEAL5_MODEL_SESSION)",
+    )
+    transform_parser.add_argument(
+        "--checkpoint",
+        type=int,
+        default=None,
+        help="Write back in-memory models every N passes (default: SEAL5_MODEL_CHECKPOINT)",
+    )
+    transform_parser.add_argument(
+        "--pass-cache",
+        action="store_true",
+        default=None,
+        help="Reuse cached results of unchanged passes (default: SEAL5_PASS_CACHE)",
+    )
+    transform_parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=None,
+        help="Skip passes completed by the previous run if models and settings are unchanged (default: SEAL5_RESUME)",
+    )
+    transform_parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=None,
+        help="Record CPU time, memory usage and hotspots of passes (default: SEAL5_PROFILE)",
+    )
 
 
 def get_parser(subparsers):
@@ -58,4 +88,9 @@ def handle(args):
         verbose=args.verbose,
         skip=None if args.skip is None else list(args.skip),
         only=None if args.only is None else list(args.only),
+        session=args.model_session,
+        checkpoint=args.checkpoint,
+        pass_cache=args.pass_cache,
+        resume=args.resume,
+        profile=args.profile,
     )
@@ -25,6 +25,7 @@ import glob
 import tarfile
 import atexit
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Optional, List, Dict, Tuple, Union
 
 
@@ -45,13 +46,23 @@ from seal5.dependencies import CDSL2LLVMDependency
 from seal5 import utils
 from seal5.tools import llvm, cdsl2llvm, inject_patches
 from seal5.resources.resources import get_patches, get_test_cfg
-from seal5.passes import Seal5Pass, PassType, PassScope, PassManager, filter_passes
+from seal5.passes import Seal5Pass, PassType, PassScope, PassManager, filter_passes, INSTR_SCOPE
 import seal5.pass_list as passes
 from seal5.testgen_utils import collect_generated_test_files
 from seal5.build_cache import combine_hashes, hash_arguments, get_patch_id, query_build_cache
+from seal5.pass_cache import get_pass_cache_dir
+from seal5.metrics import read_metrics
+from seal5.frontends.coredsl2_seal5.parse_cache import PARSE_CACHE, get_parse_cache_dir
+from seal5.transform.analyze_behavior.analyses import ANALYSIS_NAMES
+from seal5.tool_cache import get_tool_cache_dir
 
 logger = Logger("flow")
 
+# Parse CoreDSL files in the current process instead of running the frontend as a subprocess
+FRONTEND_IN_PROCESS = utils.str2bool(os.environ.get("SEAL5_FRONTEND_IN_PROCESS", True))
+# Number of CoreDSL files parsed concurrently by Seal5Flow.load
+FRONTEND_WORKERS = int(os.environ.get("SEAL5_FRONTEND_WORKERS", 1))
+
 TRANSFORM_PASS_MAP = [
     # TODO: Global -> Model
     ("convert_models", passes.convert_models, {}),
@@ -76,11 +87,8 @@ TRANSFORM_PASS_MAP = [
     ("process_settings", passes.process_settings, {}),
     ("write_yaml2", passes.write_yaml, {}),
     ("process_settings3", passes.process_settings, {}),
-    ("detect_side_effects", passes.detect_side_effects, {}),
-    ("detect_inouts", passes.detect_inouts, {}),
-    ("detect_imm_leafs", passes.detect_imm_leafs, {}),
-    ("detect_calls", passes.detect_calls, {}),
-    ("detect_loops", passes.detect_loops, {}),
+    # detect_side_effects, detect_inouts, detect_imm_leafs, detect_calls & detect_loops in a single traversal
+    ("analyze_behavior", passes.analyze_behavior, {}),
     ("annotate_opcodes", passes.annotate_opcodes, {}),
     ("check_pattern_support", passes.check_pattern_support, {}),
     ("write_cdsl_full", passes.write_cdsl, {"split": False, "compat": False}),
@@ -94,6 +102,56 @@ TRANSFORM_PASS_MAP = [
     # ("split_models", passes.split_models, {"by_set": False, "by_instr": False}),
 ]
 
+# Transform passes which only depend on the input model and their options: (input suffix, output suffix)
+CACHEABLE_PASSES = {
+    passes.convert_models: (".m2isarmodel", ".seal5model"),
+    passes.drop_unused: (".seal5model", ".seal5model"),
+    passes.eliminate_mod_rfs: (".seal5model", ".seal5model"),
+    passes.eliminate_rd_cmp_zero: (".seal5model", ".seal5model"),
+    passes.inline_functions: (".seal5model", ".seal5model"),
+    passes.optimize_model: (".seal5model", ".seal5model"),
+    passes.infer_types: (".seal5model", ".seal5model"),
+    passes.simplify_trivial_slices: (".seal5model", ".seal5model"),
+    passes.explicit_truncations: (".seal5model", ".seal5model"),
+    passes.detect_behavior_constraints: (".seal5model", ".seal5model"),
+    passes.detect_registers: (".seal5model", ".seal5model"),
+    passes.collect_register_operands: (".seal5model", ".seal5model"),
+    passes.collect_immediate_operands: (".seal5model", ".seal5model"),
+    passes.collect_operand_types: (".seal5model", ".seal5model"),
+    passes.detect_side_effects: (".seal5model", ".seal5model"),
+    passes.detect_inouts: (".seal5model", ".seal5model"),
+    passes.detect_imm_leafs: (".seal5model", ".seal5model"),
+    passes.detect_calls: (".seal5model", ".seal5model"),
+    passes.detect_loops: (".seal5model", ".seal5model"),
+    passes.analyze_behavior: (".seal5model", ".seal5model"),
+    passes.annotate_opcodes: (".seal5model", ".seal5model"),
+    passes.check_pattern_support: (".seal5model", ".seal5model"),
+}
+
+# Former passes which are now parts of a single pass: pass name -> (former names, option selecting the parts)
+PASS_ALIASES = {
+    "analyze_behavior": (ANALYSIS_NAMES, "analyses"),
+}
+
+# Transform passes which are applied to every instruction individually: model handler -> handler for a set (or chunk)
+INSTR_PASS_MAP = {
+    passes.infer_types: passes.infer_types_instr,
+    passes.simplify_trivial_slices: passes.simplify_trivial_slices_instr,
+    passes.explicit_truncations: passes.explicit_truncations_instr,
+    passes.detect_side_effects: passes.detect_side_effects_instr,
+    passes.detect_inouts: passes.detect_inouts_instr,
+    passes.detect_imm_leafs: passes.detect_imm_leafs_instr,
+    passes.detect_calls: passes.detect_calls_instr,
+    passes.detect_loops: passes.detect_loops_instr,
+    passes.analyze_behavior: passes.analyze_behavior_instr,
+}
+
+# Passes which can not run in worker processes (modify settings or spawn nested pass managers)
+THREAD_ONLY_PASSES = {
+    passes.write_yaml,
+    passes.pattern_gen_pass,
+}
+
 GENERATE_PASS_MAP = [
     ("seal5_td", passes.gen_seal5_td, {}),
     # ("model_td", passes.gen_model_td, {}),
@@ -305,7 +363,27 @@ class Seal5Flow:
         # Transforms
         for pass_name, pass_handler, pass_options in TRANSFORM_PASS_MAP:
             pass_scope = PassScope.MODEL
-            self.add_pass(Seal5Pass(pass_name, PassType.TRANSFORM, pass_scope, pass_handler, options=pass_options))
+            cache_io = CACHEABLE_PASSES.get(pass_handler)
+            model_handler = None
+            if INSTR_SCOPE and pass_handler in INSTR_PASS_MAP:
+                pass_scope = PassScope.INSTR
+                model_handler = pass_handler
+                pass_handler = INSTR_PASS_MAP[pass_handler]
+            aliases, alias_option = PASS_ALIASES.get(pass_name, (None, None))
+            self.add_pass(
+                Seal5Pass(
+                    pass_name,
+                    PassType.TRANSFORM,
+                    pass_scope,
+                    pass_handler,
+                    options=pass_options,
+                    cache_io=cache_io,
+                    executor="thread" if pass_handler in THREAD_ONLY_PASSES else None,
+                    aliases=aliases,
+                    alias_option=alias_option,
+                    model_handler=model_handler,
+                )
+            )
 
         # Generates
         for pass_name, pass_handler, pass_options in GENERATE_PASS_MAP:
@@ -313,7 +391,19 @@ class Seal5Flow:
                 pass_scope = PassScope.GLOBAL
             else:
                 pass_scope = PassScope.MODEL
-            self.add_pass(Seal5Pass(pass_name, PassType.GENERATE, pass_scope, pass_handler, options=pass_options))
+            self.add_pass(
+                Seal5Pass(
+                    pass_name,
+                    PassType.GENERATE,
+                    pass_scope,
+                    pass_handler,
+                    options=pass_options,
+                    executor="thread" if pass_handler in THREAD_ONLY_PASSES else None,
+                    # Generators only read the models and emit their own patches
+                    reads=["model", "settings"],
+                    writes=[f"patch:{pass_name}"],
+                )
+            )
 
     def check(self):
         """Check/validate Seal5 flow."""
@@ -547,13 +637,25 @@ class Seal5Flow:
 
     def parse_coredsl(self, file, out_dir, verbose: bool = False, log_level: str = "warning"):
         """Parse CDSL file."""
+        cache_dir = get_parse_cache_dir(self.settings) if PARSE_CACHE else None
+        if FRONTEND_IN_PROCESS:
+            # Imported lazily, the generated parser is large
+            from seal5.frontends.coredsl2_seal5.parser import load_coredsl
+
+            return load_coredsl(file, out_dir, cache_dir=cache_dir, log_level=log_level)
+        # TODO: move to .seal5/metrics
+        metrics_file = self.settings.temp_dir / (Path(file).stem + "_parse_metrics.csv")
         args = [
             file,
             "-o",
             out_dir,
             "--log",
             log_level,
+            "--metrics",
+            metrics_file,
         ]
+        if cache_dir is not None:
+            args += ["--cache-dir", cache_dir]
         utils.python(
             "-m",
             "seal5.frontends.coredsl2_seal5.parser",
@@ -562,9 +664,40 @@ class Seal5Flow:
             print_func=self.logger.info if verbose else self.logger.debug,
             live=verbose,
         )
+        return read_metrics(metrics_file)
 
-    def load_cdsl(self, file: Path, verbose: bool = False, overwrite: bool = False):
-        """Load CDSL file."""
+    def parse_coredsl_files(
+        self,
+        files: List[Path],
+        out_dir,
+        verbose: bool = False,
+        log_level: str = "warning",
+        workers: Optional[int] = None,
+    ):
+        """Parse CDSL files, concurrently if multiple workers are used (see SEAL5_FRONTEND_WORKERS)."""
+        workers = min(FRONTEND_WORKERS if workers is None else workers, len(files))
+        if workers <= 1:
+            return [self.parse_coredsl(file, out_dir, verbose=verbose, log_level=log_level) for file in files]
+        if not FRONTEND_IN_PROCESS:
+            with ThreadPoolExecutor(workers) as executor:
+                futures = [
+                    executor.submit(self.parse_coredsl, file, out_dir, verbose=verbose, log_level=log_level)
+                    for file in files
+                ]
+                return [future.result() for future in futures]
+        from seal5.frontends.coredsl2_seal5.parser import load_coredsl
+
+        cache_dir = get_parse_cache_dir(self.settings) if PARSE_CACHE else None
+        with ProcessPoolExecutor(workers) as executor:
+            # One file per worker, no nested process pools
+            futures = [
+                executor.submit(load_coredsl, file, out_dir, cache_dir=cache_dir, workers=1, log_level=log_level)
+                for file in files
+            ]
+            return [future.result() for future in futures]
+
+    def add_cdsl(self, file: Path, overwrite: bool = False):
+        """Add CDSL file to inputs (without parsing it)."""
         assert file.is_file(), f"File does not exist: {file}"
         filename: str = file.name
         dest = self.settings.inputs_dir / filename
@@ -573,14 +706,21 @@ class Seal5Flow:
         # Add file to inputs directory and settings
         utils.copy(file, dest)
         self.settings.inputs.append(filename)
+
+    def load_cdsl(self, file: Path, verbose: bool = False, overwrite: bool = False):
+        """Load CDSL file."""
+        self.add_cdsl(file, overwrite=overwrite)
         # Parse CoreDSL file with M2-ISA-R (TODO: Standalone)
         dest = self.settings.models_dir
-        self.parse_coredsl(file, dest, verbose=verbose)
+        metrics = self.parse_coredsl(file, dest, verbose=verbose)
         self.settings.save()
+        return metrics
 
     def load(self, files: List[Path], verbose: bool = False, overwrite: bool = False):
         """Load files into Seal5 flow."""
         self.logger.info("Loading Seal5 inputs")
+        start = time.time()
+        metrics = {"models": []}
         # Expand glob patterns
 
         def glob_helper(file):
@@ -589,18 +729,35 @@ class Seal5Flow:
             return list(map(Path, res))
 
         files = sum([glob_helper(file) for file in files], [])
+        cdsl_files = []
         for file in files:
             self.logger.info("Processing file: %s", file)
             ext = file.suffix
             if ext.lower() in [".yml", ".yaml"]:
                 self.load_cfg(file, overwrite=overwrite)
             elif ext.lower() in [".core_desc"]:
-                self.load_cdsl(file, verbose=verbose, overwrite=overwrite)
+                # Parsed below, all at once
+                self.add_cdsl(file, overwrite=overwrite)
+                cdsl_files.append(file)
             elif ext.lower() in [".ll", ".c", ".cc", ".cpp", ".s", ".mir", ".gmir"]:
                 self.load_test(file, overwrite=overwrite)
             else:
                 raise RuntimeError(f"Unsupported input type: {ext}")
+        if cdsl_files:
+            self.settings.save()
+            # Parse CoreDSL files with M2-ISA-R (TODO: Standalone)
+            all_metrics = self.parse_coredsl_files(cdsl_files, self.settings.models_dir, verbose=verbose)
+            for file, metrics_ in zip(cdsl_files, all_metrics):
+                if metrics_:
+                    metrics["models"].append({file.stem: metrics_})
         # TODO: only allow single instr set for now and track inputs in settings
+        end = time.time()
+        diff = end - start
+        metrics["start"] = start
+        metrics["end"] = end
+        metrics["time_s"] = diff
+        self.settings.metrics.append({"load": metrics})
+        self.settings.save()
         self.logger.info("Completed load of Seal5 inputs")
 
     def build(self, config=None, target="all", verbose: bool = False, skip_configure: bool = False, **kwargs):
@@ -690,7 +847,17 @@ class Seal5Flow:
         self.settings.save()
         self.logger.info("Completed install of Seal5 LLVM")
 
-    def transform(self, verbose: bool = False, skip: Optional[List[str]] = None, only: Optional[List[str]] = None):
+    def transform(
+        self,
+        verbose: bool = False,
+        skip: Optional[List[str]] = None,
+        only: Optional[List[str]] = None,
+        session: Optional[bool] = None,
+        checkpoint: Optional[int] = None,
+        pass_cache: Optional[bool] = None,
+        resume: Optional[bool] = None,
+        profile: Optional[bool] = None,
+    ):
         """Transform Seal5 models."""
         self.logger.info("Tranforming Seal5 models")
         start = time.time()
@@ -709,7 +876,17 @@ class Seal5Flow:
 
         input_models = self.settings.model_names
         transform_passes = filter_passes(self.passes, pass_type=PassType.TRANSFORM)
-        with PassManager("transform_passes", transform_passes, skip=skip, only=only) as pm:
+        with PassManager(
+            "transform_passes",
+            transform_passes,
+            skip=skip,
+            only=only,
+            session=session,
+            checkpoint=checkpoint,
+            pass_cache=pass_cache,
+            resume=resume,
+            profile=profile,
+        ) as pm:
             result = pm.run(input_models, settings=self.settings, env=self.prepare_environment(), verbose=verbose)
             if result:
                 metrics_ = result.metrics
@@ -725,15 +902,38 @@ class Seal5Flow:
         self.settings.save()
         self.logger.info("Completed tranformation of Seal5 models")
 
-    def generate(self, verbose: bool = False, skip: Optional[List[str]] = None, only: Optional[List[str]] = None):
+    def generate(
+        self,
+        verbose: bool = False,
+        skip: Optional[List[str]] = None,
+        only: Optional[List[str]] = None,
+        schedule: Optional[str] = None,
+        workers: Optional[int] = None,
+        resume: Optional[bool] = None,
+        profile: Optional[bool] = None,
+        session: Optional[bool] = None,
+    ):
         """Generate Seal5 patches."""
         self.logger.info("Generating Seal5 patches")
         start = time.time()
         metrics = {"passes": []}
         generate_passes = filter_passes(self.passes, pass_type=PassType.GENERATE)
+        if session is None:
+            # Generators only read the models, so the in-process backends can share a single instance
+            session = True
         # TODO: User, Global, PerInstr
         input_models = self.settings.model_names
-        with PassManager("generate_passes", generate_passes, skip=skip, only=only) as pm:
+        with PassManager(
+            "generate_passes",
+            generate_passes,
+            skip=skip,
+            only=only,
+            schedule=schedule,
+            workers=workers,
+            resume=resume,
+            profile=profile,
+            session=session,
+        ) as pm:
             result = pm.run(input_models, settings=self.settings, env=self.prepare_environment(), verbose=verbose)
             if result:
                 metrics_ = result.metrics
@@ -1094,6 +1294,9 @@ class Seal5Flow:
         install: bool = False,
         build: bool = False,
         deps: bool = False,
+        pass_cache: bool = False,
+        parse_cache: bool = False,
+        tool_cache: bool = False,
         verbose: bool = False,
         interactive: bool = False,
     ):
@@ -1119,6 +1322,12 @@ class Seal5Flow:
             to_clean.append(self.settings.build_dir)
         if deps:
             to_clean.append(self.settings.deps_dir)
+        if pass_cache:
+            to_clean.append(get_pass_cache_dir(self.settings))
+        if parse_cache:
+            to_clean.append(get_parse_cache_dir(self.settings))
+        if tool_cache:
+            to_clean.append(get_tool_cache_dir(self.settings))
         # TODO: cleanup settings.test.paths or self.settings.tests_dir
         # if gen:
         #     to_clean.append(self.settings.gen_dir)
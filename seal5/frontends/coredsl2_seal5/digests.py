@@ -0,0 +1,70 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Source digests of instruction sets, used for incremental loading.
+
+Digests are computed on the tokens of the parse tree, so whitespace and comments do not matter. They also cover the
+frontend and metamodel sources which build the models of the sets, so changes to the builders invalidate them.
+"""
+
+import hashlib
+from pathlib import Path
+
+from antlr4.tree.Tree import TerminalNode
+
+import m2isar.metamodel
+from m2isar.metamodel import M2_METAMODEL_VERSION
+from seal5.version import __version__
+from .parse_cache import get_grammar_version
+
+_BUILDER_VERSION = None
+
+
+def get_builder_version():
+    """Digest of the sources of the frontend and metamodel (the generated parser is in get_grammar_version)."""
+    global _BUILDER_VERSION
+    if _BUILDER_VERSION is None:
+        sha = hashlib.sha256()
+        for src_dir in [Path(__file__).parent, Path(m2isar.metamodel.__file__).parent]:
+            for src_file in sorted(src_dir.glob("*.py")):
+                sha.update(src_file.name.encode())
+                sha.update(b"\0")
+                sha.update(src_file.read_bytes())
+        _BUILDER_VERSION = sha.hexdigest()
+    return _BUILDER_VERSION
+
+
+def hash_tokens(sha, ctx):
+    """Add the tokens of a parse tree to sha."""
+    stack = [ctx]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, TerminalNode):
+            sha.update(node.symbol.text.encode())
+            sha.update(b"\0")
+        elif node.children:
+            stack.extend(reversed(node.children))
+
+
+def get_set_digest(set_def):
+    """Compute the digest of a set container (see LoadOrder), including the sets it extends."""
+    sha = hashlib.sha256()
+    sha.update(f"{__version__}:{M2_METAMODEL_VERSION}:{get_grammar_version()}:{get_builder_version()}\0".encode())
+    for isa_def in set_def.children:
+        hash_tokens(sha, isa_def)
+    return sha.hexdigest()
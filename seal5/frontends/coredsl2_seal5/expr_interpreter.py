@@ -6,13 +6,102 @@
 # Chair of Electrical Design Automation
 # Technical University of Munich
 
-"""Very crude expression evaluation functions for use during model generation."""
+"""Constant folding of expressions for use during model generation.
 
+Operators are evaluated using C semantics on unbounded integers (i.e. `/` and `%` truncate towards zero). Results
+of expressions which only consist of literals are memoized per node, as constant values and sizes are resolved
+again on every access.
+"""
+
+import operator
+import weakref
+
+from m2isar import M2ValueError
 from m2isar.metamodel import arch, behav
 
 
+def _div(left, right):
+    if right == 0:
+        raise M2ValueError("division by zero in constant expression")
+    ret = abs(left) // abs(right)
+    return -ret if (left < 0) != (right < 0) else ret
+
+
+def _mod(left, right):
+    return left - right * _div(left, right)
+
+
+def _shift(func):
+    def helper(left, right):
+        if right < 0:
+            raise M2ValueError(f"negative shift amount in constant expression: {right}")
+        return func(left, right)
+
+    return helper
+
+
+def _bool(func):
+    return lambda *args: int(func(*args))
+
+
+BINARY_OPS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": _div,
+    "%": _mod,
+    "<<": _shift(operator.lshift),
+    ">>": _shift(operator.rshift),
+    "&": operator.and_,
+    "|": operator.or_,
+    "^": operator.xor,
+    "&&": _bool(lambda left, right: left and right),
+    "||": _bool(lambda left, right: left or right),
+    "==": _bool(operator.eq),
+    "!=": _bool(operator.ne),
+    "<": _bool(operator.lt),
+    ">": _bool(operator.gt),
+    "<=": _bool(operator.le),
+    ">=": _bool(operator.ge),
+}
+
+UNARY_OPS = {
+    "-": operator.neg,
+    "+": operator.pos,
+    "~": operator.invert,
+    "!": _bool(operator.not_),
+}
+
+# Folded values of (sub)expressions without references
+_FOLDED = weakref.WeakKeyDictionary()
+
+
+def eval_binary(op: str, left: int, right: int):
+    func = BINARY_OPS.get(op)
+    if func is None:
+        raise M2ValueError(f"unsupported operator in constant expression: {op}")
+    return func(left, right)
+
+
+def eval_unary(op: str, right: int):
+    func = UNARY_OPS.get(op)
+    if func is None:
+        raise M2ValueError(f"unsupported operator in constant expression: {op}")
+    return func(right)
+
+
+def _is_literal(node):
+    return isinstance(node, behav.IntLiteral) or node in _FOLDED
+
+
 def group(self: behav.Group, context):
-    return self.expr.generate(context)
+    ret = _FOLDED.get(self)
+    if ret is not None:
+        return ret
+    ret = self.expr.generate(context)
+    if ret is not None and _is_literal(self.expr):
+        _FOLDED[self] = ret
+    return ret
 
 
 def int_literal(self: behav.IntLiteral, context):
@@ -32,13 +121,27 @@ def indexed_reference(self: behav.IndexedReference, context):
 
 
 def binary_operation(self: behav.BinaryOperation, context):
+    ret = _FOLDED.get(self)
+    if ret is not None:
+        return ret
     left = self.left.generate(context)
     right = self.right.generate(context)
     if left is None or right is None:
         return None
-    return int(eval(f"{left}{self.op.value}{right}"))
+    ret = eval_binary(self.op.value, left, right)
+    if _is_literal(self.left) and _is_literal(self.right):
+        _FOLDED[self] = ret
+    return ret
 
 
 def unary_operation(self: behav.UnaryOperation, context):
+    ret = _FOLDED.get(self)
+    if ret is not None:
+        return ret
     right = self.right.generate(context)
-    return int(eval(f"{self.op.value}{right}"))
+    if right is None:
+        return None
+    ret = eval_unary(self.op.value, right)
+    if _is_literal(self.right):
+        _FOLDED[self] = ret
+    return ret
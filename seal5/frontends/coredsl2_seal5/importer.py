@@ -8,12 +8,24 @@
 
 """Classes to recursively import files of a CoreDSL model."""
 
+import os
+import sys
 import pathlib
+from typing import List
+from concurrent.futures import ProcessPoolExecutor
 
 from .parser_gen import CoreDSL2Listener, CoreDSL2Parser, CoreDSL2Visitor
 from .utils import make_parser
+from .parse_cache import ParseCache, parse_file, detach_tree, PICKLE_RECURSION_LIMIT
 from seal5.logging import Logger
 
+logger = Logger("frontends.importer")
+
+# Number of processes for parsing imported files
+PARSE_WORKERS = int(os.environ.get("SEAL5_PARSE_WORKERS", os.cpu_count() or 1))
+# Minimum total size (bytes) of files to be parsed concurrently
+PARSE_PARALLEL_MIN_SIZE = int(os.environ.get("SEAL5_PARSE_PARALLEL_MIN_SIZE", 64 * 1024))
+
 
 class Importer(CoreDSL2Listener):
     """ANTLR listener based importer. Bad on performance, as it traverses
@@ -48,81 +60,104 @@ class Importer(CoreDSL2Listener):
         pass
 
 
-def recursive_import(tree, search_path):
+def parse_worker(path: pathlib.Path, cache_dir=None):
+    """Worker: parse a file, the returned tree is detached from the parser."""
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), PICKLE_RECURSION_LIMIT))
+    cache = ParseCache(cache_dir) if cache_dir is not None else None
+    tree = parse_file(path, token_cache=cache.tokens if cache is not None else None)
+    if cache is not None:
+        cache.store(cache.get_key(path), tree)
+    return detach_tree(tree)
+
+
+def parse_files(paths: List[pathlib.Path], cache=None, workers: int = PARSE_WORKERS):
+    """Parse independent files, concurrently if they are large enough."""
+    trees = {}
+    todo = []
+    for path in paths:
+        if cache is not None:
+            tree = cache.lookup(cache.get_key(path))
+            if tree is not None:
+                trees[path] = tree
+                continue
+        todo.append(path)
+    total_size = sum(path.stat().st_size for path in todo)
+    if workers <= 1 or len(todo) < 2 or total_size < PARSE_PARALLEL_MIN_SIZE:
+        for path in todo:
+            trees[path] = parse_file(path, token_cache=cache.tokens if cache is not None else None)
+            if cache is not None:
+                cache.store(cache.get_key(path), trees[path])
+    else:
+        cache_dir = cache.directory if cache is not None else None
+        with ProcessPoolExecutor(min(workers, len(todo))) as executor:
+            for path, tree in zip(todo, executor.map(parse_worker, todo, [cache_dir] * len(todo))):
+                trees[path] = tree
+    return [trees[path] for path in paths]
+
+
+def get_imported_files(tree):
+    """Resolved paths of the files imported by a tree (after running ImportPathExtender)."""
+    ret = []
+    for import_ctx in tree.imports:
+        path = pathlib.Path(import_ctx.uri.text.replace('"', "")).resolve()
+        if path not in ret:
+            ret.append(path)
+    return ret
+
+
+def recursive_import(tree, search_path, cache=None, workers: int = PARSE_WORKERS):
     """Helper method to recursively process all import statements of a given
     parse tree. The search path should be set to the directory of the root document.
+
+    The import graph is discovered level by level, looking only at the import
+    statements. Every file is parsed at most once and all new files of a level are
+    parsed concurrently. Afterwards the imported children and definitions are
+    prepended to the tree in a topological order: files with the longest import
+    chain from the root document first, ties in the order of discovery.
     """
 
     path_extender = ImportPathExtender(search_path)
     path_extender.visit(tree)
 
-    importer = VisitImporter(search_path)
-
-    while importer.got_new:
-        importer.new_imports.clear()
-        importer.new_defs.clear()
-        importer.new_children.clear()
-        importer.got_new = False
-
-        importer.visit(tree)
-
-        tree.imports = importer.new_imports + tree.imports
-        tree.definitions = importer.new_defs + tree.definitions
-        tree.children = importer.new_children + [
-            x for x in tree.children if not isinstance(x, CoreDSL2Parser.Import_fileContext)
-        ]
-
-
-class VisitImporter(CoreDSL2Visitor):
-    """Importer class based on an ANTLR Visitor. Only traverses the model tree
-    to the import statements and stops traversion after that.
-    """
-
-    def __init__(self, search_path) -> None:
-        super().__init__()
-        self.imported = set()
-        self.new_children = []
-        self.new_imports = []
-        self.new_defs = []
-        self.got_new = True
-        self.search_path = search_path
-        self.logger = Logger("frontends.visit_importer")
-
-    def visitDescription_content(self, ctx: CoreDSL2Parser.Description_contentContext):
-        for i in ctx.imports:
-            self.visit(i)
-
-    def visitImport_file(self, ctx: CoreDSL2Parser.Import_fileContext):
-        """The actual import functionality. Extracts the filename to import,
-        constructs a new parser and parses the next file.
-        """
-
-        import_name = ctx.uri.text.replace('"', "")
-        filename = str(pathlib.Path(import_name).resolve())
-
-        # only import each file once
-        if filename not in self.imported:
-            self.logger.info("importing file %s", filename)
-
-            # keep track that we imported something
-            self.got_new = True
-            self.imported.add(filename)
-
-            # extract file path and search path
-            file_path = pathlib.Path(filename)
-            file_dir = file_path.parent
-
-            parser = make_parser(file_path)
-
-            # run ImportPathExtender on the new tree
-            tree = parser.description_content()
-            path_extender = ImportPathExtender(file_dir)
-            path_extender.visit(tree)
-
-            # keep track of the new children
-            self.new_children.extend(tree.children)
-            self.new_imports.extend(tree.imports)
-            self.new_defs.extend(tree.definitions)
+    graph = {}
+    trees = {}
+    depths = {}
+    level = get_imported_files(tree)
+    depth = 1
+    while level:
+        for path, new_tree in zip(level, parse_files(level, cache=cache, workers=workers)):
+            logger.info("importing file %s", path)
+            ImportPathExtender(path.parent).visit(new_tree)
+            trees[path] = new_tree
+            depths[path] = depth
+        next_level = []
+        for path in level:
+            graph[path] = get_imported_files(trees[path])
+            for dep in graph[path]:
+                if dep not in trees and dep not in next_level:
+                    next_level.append(dep)
+        level = next_level
+        depth += 1
+
+    # Longest import chains (bounded, import cycles are kept in order of discovery)
+    for _ in range(len(graph)):
+        changed = False
+        for path, deps in graph.items():
+            for dep in deps:
+                if depths[dep] < depths[path] + 1 and depths[dep] <= len(graph):
+                    depths[dep] = depths[path] + 1
+                    changed = True
+        if not changed:
+            break
+
+    files = sorted(trees.keys(), key=lambda path: -depths[path])
+    tree.imports = [x for path in files for x in trees[path].imports] + tree.imports
+    tree.definitions = [x for path in files for x in trees[path].definitions] + tree.definitions
+    tree.children = [
+        x
+        for x in [x for path in files for x in trees[path].children] + tree.children
+        if not isinstance(x, CoreDSL2Parser.Import_fileContext)
+    ]
 
 
 class ImportPathExtender(CoreDSL2Visitor):
@@ -0,0 +1,267 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Persistent caches for parse trees and tokens of CoreDSL files."""
+
+import os
+import sys
+import pickle
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from typing import Optional
+from importlib.metadata import version, PackageNotFoundError
+
+from seal5.logging import Logger
+from seal5.utils import str2bool
+
+logger = Logger("frontends.parse_cache")
+
+# Cache parse trees of CoreDSL files (see Seal5Flow.parse_coredsl)
+PARSE_CACHE = str2bool(os.environ.get("SEAL5_PARSE_CACHE", True))
+DEFAULT_PARSE_CACHE_SIZE = 256  # MB
+PARSE_CACHE_SIZE = int(os.environ.get("SEAL5_PARSE_CACHE_SIZE", DEFAULT_PARSE_CACHE_SIZE))
+# Cache tokens of CoreDSL files, so files without a cached parse tree do not need to be lexed again
+TOKEN_CACHE = str2bool(os.environ.get("SEAL5_TOKEN_CACHE", True))
+DEFAULT_TOKEN_CACHE_SIZE = 64  # MB
+TOKEN_CACHE_SIZE = int(os.environ.get("SEAL5_TOKEN_CACHE_SIZE", DEFAULT_TOKEN_CACHE_SIZE))
+# Parse trees are deeply nested
+PICKLE_RECURSION_LIMIT = 100000
+
+_GRAMMAR_VERSION = None
+_LEXER_VERSION = None
+
+
+def get_parse_cache_dir(settings):
+    return settings.cache_dir / "cdsl"
+
+
+def hash_generated(names):
+    sha = hashlib.sha256()
+    parser_gen_dir = Path(__file__).parent / "parser_gen"
+    for name in names:
+        sha.update((parser_gen_dir / name).read_bytes())
+    try:
+        sha.update(version("antlr4-python3-runtime").encode())
+    except PackageNotFoundError:
+        pass
+    return sha.hexdigest()
+
+
+def get_grammar_version():
+    """Digest of the generated parser and the ANTLR runtime version."""
+    global _GRAMMAR_VERSION
+    if _GRAMMAR_VERSION is None:
+        _GRAMMAR_VERSION = hash_generated(["CoreDSL2Lexer.py", "CoreDSL2Parser.py"])
+    return _GRAMMAR_VERSION
+
+
+def get_lexer_version():
+    """Digest of the generated lexer and the ANTLR runtime version."""
+    global _LEXER_VERSION
+    if _LEXER_VERSION is None:
+        _LEXER_VERSION = hash_generated(["CoreDSL2Lexer.py"])
+    return _LEXER_VERSION
+
+
+def evict_lru(directory: Path, pattern: str, max_size: int, name: str):
+    """Remove the least recently used files matching pattern until their total size is below max_size (MB)."""
+    entries = []
+    total = 0
+    for entry_file in directory.glob(pattern):
+        st = entry_file.stat()
+        entries.append((st.st_mtime, st.st_size, entry_file))
+        total += st.st_size
+    max_bytes = max_size * 1024 * 1024
+    for _, size, entry_file in sorted(entries):
+        if total <= max_bytes:
+            break
+        logger.debug("Evicting %s cache entry %s", name, entry_file.name)
+        entry_file.unlink(missing_ok=True)
+        total -= size
+
+
+def write_entry(entry_file: Path, data: bytes):
+    """Atomically write a cache entry (entries may be written concurrently by multiple processes)."""
+    entry_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = entry_file.parent / f"{entry_file.name}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+    os.replace(tmp_file, entry_file)
+
+
+def detach_tree(tree):
+    """Remove references to the parser, lexer and input stream from a parse tree.
+
+    Token texts are materialized first, as they are looked up in the input stream otherwise.
+    """
+    from antlr4 import ParserRuleContext
+    from antlr4.tree.Tree import TerminalNodeImpl
+    from antlr4.Token import CommonToken
+
+    # recursive_import removes the imports from the children of the root
+    stack = [tree, *(getattr(tree, "imports", None) or [])]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ParserRuleContext):
+            node.parser = None
+            node.exception = None
+            for token in (node.start, node.stop):
+                if token is not None:
+                    token.text = token.text
+                    token.source = CommonToken.EMPTY_SOURCE
+            if node.children:
+                stack.extend(node.children)
+        elif isinstance(node, TerminalNodeImpl):
+            node.symbol.text = node.symbol.text
+            node.symbol.source = CommonToken.EMPTY_SOURCE
+    return tree
+
+
+class ParseCache:
+    """Persistent cache for parse trees of CoreDSL files.
+
+    Entries are keyed by the digest of the file contents and the grammar version. Every lookup returns a fresh
+    copy, so the tree can be modified by the caller (i.e. when resolving imports). The least recently used
+    entries are evicted once the total size exceeds max_size (MB).
+    """
+
+    def __init__(self, directory: Path, max_size: int = PARSE_CACHE_SIZE, tokens: bool = TOKEN_CACHE):
+        self.directory: Path = Path(directory)
+        self.max_size: int = max_size
+        self.n_hits = 0
+        self.n_misses = 0
+        self.tokens: Optional[TokenCache] = TokenCache(self.directory / "tokens") if tokens else None
+
+    def get_key(self, path: Path):
+        sha = hashlib.sha256()
+        sha.update(get_grammar_version().encode())
+        sha.update(Path(path).read_bytes())
+        return sha.hexdigest()
+
+    def lookup(self, key: str):
+        entry_file = self.directory / f"{key}.pkl"
+        try:
+            with open(entry_file, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.n_misses += 1
+            return None
+        os.utime(entry_file)  # LRU
+        self.n_hits += 1
+        if sys.getrecursionlimit() < PICKLE_RECURSION_LIMIT:
+            sys.setrecursionlimit(PICKLE_RECURSION_LIMIT)
+        return pickle.loads(data)
+
+    def store(self, key: str, tree):
+        if sys.getrecursionlimit() < PICKLE_RECURSION_LIMIT:
+            sys.setrecursionlimit(PICKLE_RECURSION_LIMIT)
+        try:
+            data = pickle.dumps(detach_tree(tree), protocol=pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            logger.debug("Parse tree too deep for caching")
+            return
+        write_entry(self.directory / f"{key}.pkl", data)
+        self.evict()
+
+    def evict(self):
+        evict_lru(self.directory, "*.pkl", self.max_size, "parse")
+
+
+class TokenCache:
+    """Persistent cache for the tokens of CoreDSL files.
+
+    Tokens are stored as a flat array of (type, channel, start, stop, line, column) values. The token texts are not
+    stored, they are read from the input stream of the file when needed. Entries are keyed by the digest of the file
+    contents and the lexer version, so they stay valid if only the parser changes. Parse trees are much larger than
+    tokens, so token entries usually outlive the parse cache entries of the same file.
+    """
+
+    FIELDS = 6
+
+    def __init__(self, directory: Path, max_size: int = TOKEN_CACHE_SIZE):
+        self.directory: Path = Path(directory)
+        self.max_size: int = max_size
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def get_key(self, data: bytes):
+        sha = hashlib.sha256()
+        sha.update(get_lexer_version().encode())
+        sha.update(data)
+        return sha.hexdigest()
+
+    def lookup(self, key: str, source: tuple):
+        """Return the cached tokens, source is the (token source, input stream) pair of the new tokens."""
+        from antlr4.Token import CommonToken
+
+        entry_file = self.directory / f"{key}.tok"
+        try:
+            with open(entry_file, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.n_misses += 1
+            return None
+        fields = array("i")
+        fields.frombytes(data)
+        if len(fields) % self.FIELDS != 0:
+            logger.debug("Ignoring corrupt token cache entry %s", entry_file.name)
+            self.n_misses += 1
+            return None
+        os.utime(entry_file)  # LRU
+        self.n_hits += 1
+        tokens = []
+        columns = [fields[i :: self.FIELDS] for i in range(self.FIELDS)]
+        for type_, channel, start, stop, line, column in zip(*columns):
+            token = CommonToken(CommonToken.EMPTY_SOURCE, type_, channel, start, stop)
+            token.source = source
+            token.line = line
+            token.column = column
+            tokens.append(token)
+        return tokens
+
+    def store(self, key: str, tokens):
+        fields = array("i")
+        for token in tokens:
+            fields.extend((token.type, token.channel, token.start, token.stop, token.line, token.column))
+        write_entry(self.directory / f"{key}.tok", fields.tobytes())
+        self.evict()
+
+    def evict(self):
+        evict_lru(self.directory, "*.tok", self.max_size, "token")
+
+
+def parse_file(path: Path, cache: Optional[ParseCache] = None, token_cache: Optional[TokenCache] = None):
+    """Parse a CoreDSL file (or lookup its parse tree in the cache).
+
+    Files are lexed using the token cache of the parse cache, unless a token_cache is given explicitly.
+    """
+    # Imported lazily, the generated parser is large (this module is also used by the flow)
+    from .utils import parse_description
+
+    if cache is None:
+        return parse_description(path, token_cache=token_cache)
+    key = cache.get_key(path)
+    tree = cache.lookup(key)
+    if tree is not None:
+        logger.debug("Using cached parse tree for %s", path)
+        return tree
+    tree = parse_description(path, token_cache=cache.tokens if token_cache is None else token_cache)
+    cache.store(key, tree)
+    return tree
@@ -9,9 +9,13 @@
 import argparse
 import itertools
 import logging
+import multiprocessing
+import os
 import pathlib
-import pickle
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
 from m2isar import M2Error, M2SyntaxError
 from m2isar.metamodel import M2_METAMODEL_VERSION, M2Model, behav, patch_model
@@ -19,39 +23,360 @@ from m2isar.metamodel.code_info import CodeInfoBase
 from . import expr_interpreter
 from .architecture_model_builder import ArchitectureModelBuilder
 from .behavior_model_builder import BehaviorModelBuilder
-from .importer import recursive_import
+from .digests import get_set_digest
+from .importer import recursive_import, PARSE_WORKERS, logger as importer_logger
 from .load_order import LoadOrder
-from .utils import make_parser
+from .parse_cache import ParseCache, parse_file, detach_tree, PICKLE_RECURSION_LIMIT
+from .utils import TWO_STAGE_PARSING
+from seal5.behav_utils import BehaviorInterner
 from seal5.logging import Logger
+from seal5.model_utils import load_model, dump_model
+from seal5.utils import str2bool
 
+logger = Logger("frontends.parser")
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("top_level", help="The CoreDSL file.")
-    parser.add_argument("--log", default="info", choices=["critical", "error", "warning", "info", "debug"])
-    parser.add_argument("--output", "-o", type=str, default=None)
+# Number of processes for building the models of the sets
+BUILD_WORKERS = int(os.environ.get("SEAL5_BUILD_WORKERS", os.cpu_count() or 1))
+# Minimum total size (tokens) of the sets to be built concurrently (worker startup and pickling would dominate)
+BUILD_PARALLEL_MIN_TOKENS = int(os.environ.get("SEAL5_BUILD_PARALLEL_MIN_TOKENS", 200000))
+# Reuse unchanged sets of the previously written model when reloading a file
+INCREMENTAL_LOAD = str2bool(os.environ.get("SEAL5_INCREMENTAL_LOAD", True))
+# Share identical operator nodes of the behavior trees (see BehaviorInterner)
+INTERN_BEHAVIOR = str2bool(os.environ.get("SEAL5_INTERN_BEHAVIOR", False))
 
-    args = parser.parse_args()
 
-    # app_dir = pathlib.Path(__file__).parent.resolve()
+def build_arch_model(set_name, set_def):
+    """Generate the architecture model of a set (including the sets it extends)."""
+    logger.info(f"building architecture model for set {set_name}")
+    try:
+        arch_builder = ArchitectureModelBuilder()
+        s = arch_builder.visit(set_def)
+        if not isinstance(s, list):
+            s = [s]
+        # print("s", s)
+    except M2Error as e:
+        logger.critical("Error building architecture model of set %s: %s", set_name, e)
+        raise
+
+    return s[-1], arch_builder
+
+
+def build_behavior_model(set_name, set_def, arch_builder):
+    """Generate the behavior of the functions, always blocks and instructions of a set."""
+    logger.info("building behavior model for set %s", set_name)
+    # print("set", set_name, set_def, dir(set_def))
+
+    warned_fns = set()
+
+    logger.debug("checking core constants")
+    unassigned_const = False
+    for const in set_def.constants.values():
+        # print("const", const)
+        if const.value is None:
+            pass
+            # if const.name == "XLEN":
+            # 	if "32" in set_name:
+            # 		const.value = 32
+            # 	elif "64" in set_name:
+            # 		const.value = 64
+            # 	continue
+            # logger.critical("constant %s in set %s has no value assigned!", const.name, set_name)
+            # unassigned_const = True
+            # sys.exit(-1)
+    if unassigned_const:
+        sys.exit(-1)
+
+    logger.debug("evaluating set parameters")
+
+    for const_def in set_def.constants.values():
+        const_def._value = const_def.value
+
+    for mem_def in itertools.chain(set_def.memories.values(), set_def.memory_aliases.values()):
+        mem_def._size = mem_def.size
+        mem_def.range._lower_base = mem_def.range.lower_base
+        mem_def.range._upper_base = mem_def.range.upper_base
+
+        for attr_name, attr_ops in mem_def.attributes.items():
+            ops = []
+            for attr_op in attr_ops:
+                try:
+                    behav_builder = BehaviorModelBuilder(
+                        set_def.constants,
+                        set_def.memories,
+                        set_def.memory_aliases,
+                        {},
+                        set_def.functions,
+                        warned_fns,
+                    )
+                    op = behav_builder.visit(attr_op)
+                    ops.append(op)
+                except M2Error as e:
+                    logger.critical('error processing attribute "%s" of memory "%s": %s', attr_name, mem_def.name, e)
+                    raise
+
+            mem_def.attributes[attr_name] = ops
+
+    for fn_def in set_def.functions.values():
+        if isinstance(fn_def.operation, behav.Operation) and not fn_def.extern:
+            raise M2SyntaxError(f"non-extern function {fn_def.name} has no body")
+
+        fn_def._size = fn_def.size
+        for fn_arg in fn_def.args.values():
+            fn_arg._size = fn_arg.size
+            fn_arg._width = fn_arg.width
+
+    logger.debug("generating function behavior")
+
+    for fn_name, fn_def in set_def.functions.items():
+        logger.debug("generating function %s", fn_name)
+        logger.debug("generating attributes")
+
+        for attr_name, attr_ops in fn_def.attributes.items():
+            ops = []
+            for attr_op in attr_ops:
+                try:
+                    behav_builder = BehaviorModelBuilder(
+                        set_def.constants,
+                        set_def.memories,
+                        set_def.memory_aliases,
+                        fn_def.args,
+                        set_def.functions,
+                        warned_fns,
+                    )
+                    op = behav_builder.visit(attr_op)
+                    ops.append(op)
+                except M2Error as e:
+                    logger.critical('error processing attribute "%s" of function "%s": %s', attr_name, fn_def.name, e)
+                    raise
+
+            fn_def.attributes[attr_name] = ops
+
+        behav_builder = BehaviorModelBuilder(
+            set_def.constants, set_def.memories, set_def.memory_aliases, fn_def.args, set_def.functions, warned_fns
+        )
+
+        if not isinstance(fn_def.operation, behav.Operation):
+            try:
+                op = behav_builder.visit(fn_def.operation)
+            except M2Error as e:
+                logger.critical("Error building behavior for function %s: %s", fn_name, e)
+                raise
+
+            fn_def.scalars = behav_builder._scalars
+
+            if isinstance(op, list):
+                fn_def.operation = behav.Operation(op)
+            else:
+                fn_def.operation = behav.Operation([op])
+
+    logger.debug("generating always blocks")
+
+    always_block_statements = []
+
+    for block_def in arch_builder._always_blocks.values():
+        logger.debug("generating always block %s", block_def.name)
+        logger.debug("generating attributes")
+
+        for attr_name, attr_ops in block_def.attributes.items():
+            ops = []
+            for attr_op in attr_ops:
+                try:
+                    behav_builder = BehaviorModelBuilder(
+                        set_def.constants,
+                        set_def.memories,
+                        set_def.memory_aliases,
+                        {},
+                        set_def.functions,
+                        warned_fns,
+                    )
+                    op = behav_builder.visit(attr_op)
+                    ops.append(op)
+                except M2Error as e:
+                    logger.critical(
+                        'error processing attribute "%s" of instruction "%s": %s', attr_name, block_def.name, e
+                    )
+                    raise
+
+            block_def.attributes[attr_name] = ops
+
+        behav_builder = BehaviorModelBuilder(
+            set_def.constants, set_def.memories, set_def.memory_aliases, {}, set_def.functions, warned_fns
+        )
+
+        try:
+            op = behav_builder.visit(block_def.operation)
+        except M2Error as e:
+            logger.critical("error building behavior for always block %s: %s", block_def.name, e)
+            raise
+
+        always_block_statements.append(op)
+
+    logger.debug("generating instruction behavior")
+
+    for instr_def in set_def.instructions.values():
+        logger.debug("generating instruction %s", instr_def.name)
+        logger.debug("generating attributes")
+
+        for attr_name, attr_ops in instr_def.attributes.items():
+            ops = []
+            for attr_op in attr_ops:
+                try:
+                    behav_builder = BehaviorModelBuilder(
+                        set_def.constants,
+                        set_def.memories,
+                        set_def.memory_aliases,
+                        instr_def.fields,
+                        set_def.functions,
+                        warned_fns,
+                    )
+                    op = behav_builder.visit(attr_op)
+                    ops.append(op)
+                except M2Error as e:
+                    logger.critical(
+                        'error processing attribute "%s" of instruction "%s": %s', attr_name, instr_def.name, e
+                    )
+                    raise
+
+            instr_def.attributes[attr_name] = ops
+
+        behav_builder = BehaviorModelBuilder(
+            set_def.constants,
+            set_def.memories,
+            set_def.memory_aliases,
+            instr_def.fields,
+            set_def.functions,
+            warned_fns,
+        )
+
+        try:
+            op = behav_builder.visit(instr_def.operation)
+        except M2Error as e:
+            logger.critical("error building behavior for instruction %s::%s: %s", instr_def.ext_name, instr_def.name, e)
+            raise
 
-    logger = Logger("frontends.parser")
-    logger.setLevel(getattr(logging, args.log.upper()))
+        instr_def.scalars = behav_builder._scalars
 
-    top_level = pathlib.Path(args.top_level)
-    abs_top_level = top_level.resolve()
+        if isinstance(op, list):
+            op = behav.Operation(op)
+        else:
+            op = behav.Operation([op])
+
+        # pc_inc = behav.Assignment(
+        # 	behav.NamedReference(set_def.pc_memory),
+        # 	behav.BinaryOperation(
+        # 		behav.NamedReference(set_def.pc_memory),
+        # 		behav.Operator("+"),
+        # 		behav.IntLiteral(int(instr_def.size/8))
+        # 	)
+        # )
+
+        # op.statements.insert(0, pc_inc)
+        op.statements = always_block_statements + op.statements
+        instr_def.operation = op
+
+
+def build_set(set_name, set_def):
+    """Build the model of a single set. Sets are independent of each other.
+
+    Returns the set and the (names of) overwritten instructions, which are reported by the caller.
+    """
+    set_obj, arch_builder = build_arch_model(set_name, set_def)
+    build_behavior_model(set_name, set_obj, arch_builder)
+    overwritten_instrs = [
+        (orig.name, orig.ext_name, overwritten.name, overwritten.ext_name)
+        for orig, overwritten in arch_builder._overwritten_instrs
+    ]
+    return set_obj, overwritten_instrs
+
+
+_WORKER_SETS = None
+
+
+def init_build_worker(sets):
+    """Initializer for worker processes. With fork, the parse trees are not pickled at all."""
+    global _WORKER_SETS
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), PICKLE_RECURSION_LIMIT))
+    patch_model(expr_interpreter)
+    _WORKER_SETS = sets
+
+
+def build_set_worker(set_name):
+    """Worker: build a set, the result is pickled back to the main process."""
+    return build_set(set_name, _WORKER_SETS[set_name])
+
+
+def get_num_tokens(set_def):
+    return sum(node.stop.tokenIndex - node.start.tokenIndex + 1 for node in set_def.children)
+
+
+def build_sets(sets, workers: int = BUILD_WORKERS):
+    """Build the models of all sets, in a process pool if they are large enough."""
+    workers = min(workers, len(sets))
+    if workers <= 1 or sum(get_num_tokens(set_def) for set_def in sets.values()) < BUILD_PARALLEL_MIN_TOKENS:
+        return [build_set(set_name, set_def) for set_name, set_def in sets.items()]
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), PICKLE_RECURSION_LIMIT))
+    if multiprocessing.get_start_method() != "fork":
+        # parse trees are pickled once per worker, including the parents of the sets
+        roots = {}
+        for set_def in sets.values():
+            for node in set_def.children:
+                while node.parentCtx is not None:
+                    node = node.parentCtx
+                roots[id(node)] = node
+        for root in roots.values():
+            detach_tree(root)
+    with ProcessPoolExecutor(workers, initializer=init_build_worker, initargs=(sets,)) as executor:
+        return list(executor.map(build_set_worker, sets.keys()))
+
+
+def reserve_code_info_ids(code_infos):
+    """Number new code infos after the ones of a previous model, as reused sets keep their ids."""
+    if code_infos:
+        counter = "_CodeInfoBase__id_counter"
+        setattr(CodeInfoBase, counter, max(getattr(CodeInfoBase, counter), max(code_infos) + 1))
+
+
+def parse_model(
+    top_level,
+    cache: Optional[ParseCache] = None,
+    metrics: Optional[dict] = None,
+    workers=None,
+    previous: Optional[M2Model] = None,
+):
+    """Parse a CoreDSL file (and its imports) and build the model of all its sets in the current process.
+
+    Errors are logged and raised as M2Error. Parse and build times are added to metrics (if given). The number
+    of worker processes used for parsing imports and building sets defaults to SEAL5_PARSE_WORKERS and
+    SEAL5_BUILD_WORKERS. If the previous model of the file is given, sets with unchanged source digests are taken
+    from it instead of being built again (see get_set_digest).
+    """
+    if metrics is None:
+        metrics = {}
+    abs_top_level = pathlib.Path(top_level).resolve()
     search_path = abs_top_level.parent
 
-    parser = make_parser(abs_top_level)
+    metrics["two_stage_parsing"] = TWO_STAGE_PARSING
 
+    start = time.time()
     try:
         logger.info("parsing top level")
-        tree = parser.description_content()
+        tree = parse_file(abs_top_level, cache=cache)
 
-        recursive_import(tree, search_path)
+        recursive_import(tree, search_path, cache=cache, workers=PARSE_WORKERS if workers is None else workers)
     except M2SyntaxError as e:
         logger.critical("Error during parsing: %s", e)
-        sys.exit(1)
+        raise
+    metrics["parse_time_s"] = time.time() - start
+    logger.debug("parsing took %.3fs", metrics["parse_time_s"])
+
+    if cache is not None:
+        logger.debug("parse cache: %d hits, %d misses", cache.n_hits, cache.n_misses)
+        metrics["parse_cache_hits"] = cache.n_hits
+        metrics["parse_cache_misses"] = cache.n_misses
+        if cache.tokens is not None:  # files parsed by workers are not counted
+            logger.debug("token cache: %d hits, %d misses", cache.tokens.n_hits, cache.tokens.n_misses)
+            metrics["token_cache_hits"] = cache.tokens.n_hits
+            metrics["token_cache_misses"] = cache.tokens.n_misses
 
     logger.info("reading instruction load order")
     lo = LoadOrder()
@@ -59,265 +384,124 @@ def main():
         sets = lo.visit(tree)
     except M2Error as e:
         logger.critical("Error during load order building: %s", e)
-        sys.exit(1)
-
-    if args.output is None:
-        model_path = search_path.joinpath("gen_model")
-    else:
-        model_path = pathlib.Path(args.output)
-    model_path.mkdir(exist_ok=True)
-
-    temp_save = {}
+        raise
+
+    digests = {set_name: get_set_digest(set_def) for set_name, set_def in sets.items()}
+    reused = {}
+    if previous is not None:
+        for set_name, set_digest in digests.items():
+            prev_set = previous.sets.get(set_name)
+            if prev_set is not None and getattr(prev_set, "source_digest", None) == set_digest:
+                logger.debug("reusing unchanged set %s", set_name)
+                reused[set_name] = prev_set
+        if reused:
+            reserve_code_info_ids(previous.code_infos)
 
     patch_model(expr_interpreter)
 
-    for set_name, set_def in sets.items():
-        logger.info(f"building architecture model for set {set_name}")
-        try:
-            arch_builder = ArchitectureModelBuilder()
-            s = arch_builder.visit(set_def)
-            if not isinstance(s, list):
-                s = [s]
-            # print("s", s)
-        except M2Error as e:
-            logger.critical("Error building architecture model of core", e)
-
-        for orig, overwritten in arch_builder._overwritten_instrs:
+    start = time.time()
+    to_build = {set_name: set_def for set_name, set_def in sets.items() if set_name not in reused}
+    results = build_sets(to_build, workers=BUILD_WORKERS if workers is None else workers)
+    sets.update(reused)
+    for set_name, (set_obj, overwritten_instrs) in zip(list(to_build.keys()), results):
+        # reported in load order, independent of the order the workers finished in
+        for orig_name, orig_ext_name, overwritten_name, overwritten_ext_name in overwritten_instrs:
             logger.warning(
                 "instr %s from extension %s was overwritten by %s from %s",
-                orig.name,
-                orig.ext_name,
-                overwritten.name,
-                overwritten.ext_name,
+                orig_name,
+                orig_ext_name,
+                overwritten_name,
+                overwritten_ext_name,
             )
+        sets[set_name] = set_obj
+    metrics["build_time_s"] = time.time() - start
+    logger.debug("building models took %.3fs", metrics["build_time_s"])
+
+    metrics["reused_sets"] = len(reused)
+    metrics["built_sets"] = len(to_build)
+    logger.debug("%d sets reused, %d sets built", len(reused), len(to_build))
+    for set_name, set_obj in sets.items():
+        set_obj.source_digest = digests[set_name]
+
+    code_infos = {**previous.code_infos, **CodeInfoBase.database} if reused else CodeInfoBase.database
+    model_obj = M2Model(M2_METAMODEL_VERSION, {}, sets, code_infos)
+    if INTERN_BEHAVIOR:
+        interner = BehaviorInterner()
+        metrics["interned_nodes"] = interner.intern_model(model_obj)
+        logger.debug("interned %d of %d behavior nodes", interner.n_interned, interner.n_nodes)
+    return model_obj
+
+
+def load_previous_model(model_path: pathlib.Path):
+    """Load the model written by a previous load of the same file (if there is a compatible one)."""
+    if not model_path.is_file():
+        return None
+    try:
+        model_obj = load_model(model_path, compat=True)
+    except Exception as e:
+        logger.debug("Ignoring previous model %s: %s", model_path, e)
+        return None
+    if model_obj.model_version != M2_METAMODEL_VERSION:
+        return None
+    return model_obj
+
+
+def load_coredsl(
+    top_level, out_dir, cache_dir=None, workers=None, log_level=None, incremental: bool = INCREMENTAL_LOAD
+):
+    """Parse a CoreDSL file and write its model to <out_dir>/<name>.m2isarmodel.
+
+    Used by the command line interface and (in-process) by Seal5Flow.load. With incremental, only the sets which
+    changed since the existing model was written are built. Returns the metrics.
+    """
+    if log_level is not None:
+        set_log_level(log_level)
+    cache = ParseCache(cache_dir) if cache_dir else None
+    out_dir = pathlib.Path(out_dir)
+    model_path = out_dir / (pathlib.Path(top_level).stem + ".m2isarmodel")
+    previous = load_previous_model(model_path) if incremental else None
+    metrics = {}
+    model_obj = parse_model(top_level, cache=cache, metrics=metrics, workers=workers, previous=previous)
 
-        temp_save[set_name] = (s, arch_builder)
-
-        sets[set_name] = s[-1]
-
-    for set_name, set_def in sets.items():
-        logger.info("building behavior model for set %s", set_name)
-        # print("set", set_name, set_def, dir(set_def))
-
-        warned_fns = set()
-
-        logger.debug("checking core constants")
-        unassigned_const = False
-        for const in set_def.constants.values():
-            # print("const", const)
-            if const.value is None:
-                pass
-                # if const.name == "XLEN":
-                # 	if "32" in set_name:
-                # 		const.value = 32
-                # 	elif "64" in set_name:
-                # 		const.value = 64
-                # 	continue
-                # logger.critical("constant %s in set %s has no value assigned!", const.name, set_name)
-                # unassigned_const = True
-                # sys.exit(-1)
-        if unassigned_const:
-            sys.exit(-1)
-
-        logger.debug("evaluating set parameters")
-
-        for const_def in set_def.constants.values():
-            const_def._value = const_def.value
-
-        for mem_def in itertools.chain(set_def.memories.values(), set_def.memory_aliases.values()):
-            mem_def._size = mem_def.size
-            mem_def.range._lower_base = mem_def.range.lower_base
-            mem_def.range._upper_base = mem_def.range.upper_base
-
-            for attr_name, attr_ops in mem_def.attributes.items():
-                ops = []
-                for attr_op in attr_ops:
-                    try:
-                        behav_builder = BehaviorModelBuilder(
-                            set_def.constants,
-                            set_def.memories,
-                            set_def.memory_aliases,
-                            {},
-                            set_def.functions,
-                            warned_fns,
-                        )
-                        op = behav_builder.visit(attr_op)
-                        ops.append(op)
-                    except M2Error as e:
-                        logger.critical(
-                            'error processing attribute "%s" of memory "%s": %s', attr_name, mem_def.name, e
-                        )
-                        sys.exit(1)
-
-                mem_def.attributes[attr_name] = ops
-
-        for fn_def in set_def.functions.values():
-            if isinstance(fn_def.operation, behav.Operation) and not fn_def.extern:
-                raise M2SyntaxError(f"non-extern function {fn_def.name} has no body")
-
-            fn_def._size = fn_def.size
-            for fn_arg in fn_def.args.values():
-                fn_arg._size = fn_arg.size
-                fn_arg._width = fn_arg.width
-
-        logger.debug("generating function behavior")
-
-        for fn_name, fn_def in set_def.functions.items():
-            logger.debug("generating function %s", fn_name)
-            logger.debug("generating attributes")
-
-            for attr_name, attr_ops in fn_def.attributes.items():
-                ops = []
-                for attr_op in attr_ops:
-                    try:
-                        behav_builder = BehaviorModelBuilder(
-                            set_def.constants,
-                            set_def.memories,
-                            set_def.memory_aliases,
-                            fn_def.args,
-                            set_def.functions,
-                            warned_fns,
-                        )
-                        op = behav_builder.visit(attr_op)
-                        ops.append(op)
-                    except M2Error as e:
-                        logger.critical(
-                            'error processing attribute "%s" of function "%s": %s', attr_name, fn_def.name, e
-                        )
-                        sys.exit(1)
-
-                fn_def.attributes[attr_name] = ops
-
-            behav_builder = BehaviorModelBuilder(
-                set_def.constants, set_def.memories, set_def.memory_aliases, fn_def.args, set_def.functions, warned_fns
-            )
+    logger.info("dumping model")
+    out_dir.mkdir(exist_ok=True)
+    dump_model(model_obj, model_path, compat=True)
+    return metrics
 
-            if not isinstance(fn_def.operation, behav.Operation):
-                try:
-                    op = behav_builder.visit(fn_def.operation)
-                except M2Error as e:
-                    logger.critical("Error building behavior for function %s: %s", fn_name, e)
-                    sys.exit()
-
-                fn_def.scalars = behav_builder._scalars
-
-                if isinstance(op, list):
-                    fn_def.operation = behav.Operation(op)
-                else:
-                    fn_def.operation = behav.Operation([op])
-
-        logger.debug("generating always blocks")
-
-        always_block_statements = []
-
-        arch_builder = temp_save[set_name][1]
-        for block_def in arch_builder._always_blocks.values():
-            logger.debug("generating always block %s", block_def.name)
-            logger.debug("generating attributes")
-
-            for attr_name, attr_ops in block_def.attributes.items():
-                ops = []
-                for attr_op in attr_ops:
-                    try:
-                        behav_builder = BehaviorModelBuilder(
-                            set_def.constants,
-                            set_def.memories,
-                            set_def.memory_aliases,
-                            {},
-                            set_def.functions,
-                            warned_fns,
-                        )
-                        op = behav_builder.visit(attr_op)
-                        ops.append(op)
-                    except M2Error as e:
-                        logger.critical(
-                            'error processing attribute "%s" of instruction "%s": %s', attr_name, block_def.name, e
-                        )
-                        sys.exit(1)
-
-                block_def.attributes[attr_name] = ops
-
-            behav_builder = BehaviorModelBuilder(
-                set_def.constants, set_def.memories, set_def.memory_aliases, {}, set_def.functions, warned_fns
-            )
 
-            try:
-                op = behav_builder.visit(block_def.operation)
-            except M2Error as e:
-                logger.critical("error building behavior for always block %s: %s", block_def.name, e)
-                sys.exit(1)
-
-            always_block_statements.append(op)
-
-        logger.debug("generating instruction behavior")
-
-        for instr_def in set_def.instructions.values():
-            logger.debug("generating instruction %s", instr_def.name)
-            logger.debug("generating attributes")
-
-            for attr_name, attr_ops in instr_def.attributes.items():
-                ops = []
-                for attr_op in attr_ops:
-                    try:
-                        behav_builder = BehaviorModelBuilder(
-                            set_def.constants,
-                            set_def.memories,
-                            set_def.memory_aliases,
-                            instr_def.fields,
-                            set_def.functions,
-                            warned_fns,
-                        )
-                        op = behav_builder.visit(attr_op)
-                        ops.append(op)
-                    except M2Error as e:
-                        logger.critical(
-                            'error processing attribute "%s" of instruction "%s": %s', attr_name, instr_def.name, e
-                        )
-                        sys.exit(1)
-
-                instr_def.attributes[attr_name] = ops
-
-            behav_builder = BehaviorModelBuilder(
-                set_def.constants,
-                set_def.memories,
-                set_def.memory_aliases,
-                instr_def.fields,
-                set_def.functions,
-                warned_fns,
-            )
+def set_log_level(level: str):
+    """Set the log level of the parser and importer loggers."""
+    for logger_ in [logger, importer_logger]:
+        logger_.setLevel(getattr(logging, level.upper()))
 
-            try:
-                op = behav_builder.visit(instr_def.operation)
-            except M2Error as e:
-                logger.critical(
-                    "error building behavior for instruction %s::%s: %s", instr_def.ext_name, instr_def.name, e
-                )
-                sys.exit(1)
 
-            instr_def.scalars = behav_builder._scalars
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("top_level", help="The CoreDSL file.")
+    parser.add_argument("--log", default="info", choices=["critical", "error", "warning", "info", "debug"])
+    parser.add_argument("--output", "-o", type=str, default=None)
+    parser.add_argument("--cache-dir", type=str, default=None, help="Directory for caching parse trees")
+    parser.add_argument("--metrics", default=None, help="Output metrics to file")
+
+    args = parser.parse_args()
 
-            if isinstance(op, list):
-                op = behav.Operation(op)
-            else:
-                op = behav.Operation([op])
+    # app_dir = pathlib.Path(__file__).parent.resolve()
+
+    if args.output is None:
+        model_path = pathlib.Path(args.top_level).resolve().parent.joinpath("gen_model")
+    else:
+        model_path = pathlib.Path(args.output)
 
-            # pc_inc = behav.Assignment(
-            # 	behav.NamedReference(set_def.pc_memory),
-            # 	behav.BinaryOperation(
-            # 		behav.NamedReference(set_def.pc_memory),
-            # 		behav.Operator("+"),
-            # 		behav.IntLiteral(int(instr_def.size/8))
-            # 	)
-            # )
+    try:
+        metrics = load_coredsl(args.top_level, model_path, cache_dir=args.cache_dir, log_level=args.log)
+    except M2Error:
+        sys.exit(1)
 
-            # op.statements.insert(0, pc_inc)
-            op.statements = always_block_statements + op.statements
-            instr_def.operation = op
+    if args.metrics:
+        import pandas as pd
 
-    logger.info("dumping model")
-    with open(model_path / (abs_top_level.stem + ".m2isarmodel"), "wb") as f:
-        model_obj = M2Model(M2_METAMODEL_VERSION, {}, sets, CodeInfoBase.database)
-        pickle.dump(model_obj, f)
+        metrics_df = pd.DataFrame({key: [val] for key, val in metrics.items()})
+        metrics_df.to_csv(args.metrics, index=False)
 
 
 if __name__ == "__main__":
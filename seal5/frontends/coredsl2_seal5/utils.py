@@ -6,8 +6,14 @@
 # Chair of Electrical Design Automation
 # Technical University of Munich
 
+import os
+
 import antlr4
 import antlr4.error.ErrorListener
+from antlr4.ListTokenSource import ListTokenSource
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 
 from m2isar import M2SyntaxError
 from .parser_gen import CoreDSL2Lexer, CoreDSL2Parser
@@ -16,6 +22,9 @@ RADIX = {"b": 2, "h": 16, "d": 10, "o": 8}
 
 SHORTHANDS = {"char": 8, "short": 16, "int": 32, "long": 64}
 
+# Try fast SLL prediction first and only fall back to full LL if it fails (see parse_description)
+TWO_STAGE_PARSING = os.environ.get("SEAL5_TWO_STAGE_PARSING", "1").lower() not in ["0", "false", "off", "no"]
+
 SIGNEDNESS = {"signed": True, "unsigned": False}
 
 BOOLCONST = {"true": 1, "false": 0}
@@ -30,12 +39,52 @@ class MyErrorListener(antlr4.error.ErrorListener.ErrorListener):
         raise M2SyntaxError(f"Syntax error in file {self.filename}, line {line}, column {column}: {msg}")
 
 
-def make_parser(filename):
+def make_token_stream(filename, token_cache=None):
+    """Lex a CoreDSL file, unless its tokens are found in the token_cache (see parse_cache.TokenCache)."""
     input_stream = antlr4.FileStream(filename)
-    lexer = CoreDSL2Lexer(input_stream)
-    stream = antlr4.CommonTokenStream(lexer)
+    if token_cache is None:
+        return antlr4.CommonTokenStream(CoreDSL2Lexer(input_stream))
+    key = token_cache.get_key(input_stream.strdata.encode())
+    token_source = ListTokenSource([], sourceName=str(filename))
+    tokens = token_cache.lookup(key, (token_source, input_stream))
+    if tokens is not None:
+        token_source.tokens = tokens
+        return antlr4.CommonTokenStream(token_source)
+    stream = antlr4.CommonTokenStream(CoreDSL2Lexer(input_stream))
+    stream.fill()
+    token_cache.store(key, stream.tokens)
+    return stream
+
+
+def make_parser(filename, token_cache=None):
+    stream = make_token_stream(filename, token_cache=token_cache)
     parser = CoreDSL2Parser(stream)
     error_handler = MyErrorListener(filename)
     parser.removeErrorListeners()
     parser.addErrorListener(error_handler)
     return parser
+
+
+def parse_description(filename, two_stage: bool = TWO_STAGE_PARSING, token_cache=None):
+    """Parse a CoreDSL file and return the description_content tree.
+
+    With two_stage, the file is first parsed using SLL prediction and an error strategy which bails out on the
+    first error. SLL is much faster and only fails for very few (ambiguous) inputs. If it fails, the file is parsed
+    again using full LL prediction and MyErrorListener, so real syntax errors are reported as before.
+    """
+    parser = make_parser(filename, token_cache=token_cache)
+    if not two_stage:
+        return parser.description_content()
+    listeners = parser._listeners
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.SLL
+    try:
+        return parser.description_content()
+    except ParseCancellationException:
+        pass
+    parser.reset()
+    parser._listeners = listeners
+    parser._errHandler = DefaultErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.LL
+    return parser.description_content()
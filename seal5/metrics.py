@@ -20,3 +20,11 @@ def read_metrics(metrics_file: Union[str, Path], allow_missing: bool = True):
         vals = list(map(lambda x: ast.literal_eval(x), vals))
         data = dict(zip(keys, vals))
     return data
+
+
+def write_metrics(metrics_file: Union[str, Path], metrics: dict):
+    """Write metrics in the format of the transforms (single row, see read_metrics)."""
+    with open(metrics_file, "w", newline="") as outfile:
+        writer = csv.writer(outfile, lineterminator="\n")
+        writer.writerow(metrics.keys())
+        writer.writerow(metrics.values())
@@ -8,6 +8,7 @@
 """TODO"""
 
 import re
+import weakref
 from enum import IntEnum, Enum, auto
 from typing import Dict, List, Optional, Union
 
@@ -82,6 +83,8 @@ class Seal5RegisterClass(IntEnum):
 
 
 class Seal5Register:
+    __slots__ = ("name", "size", "width", "signed", "is_const", "reg_class")
+
     def __init__(self, name: str, size: int, width: int, signed: bool, is_const: bool, reg_class: Seal5RegisterClass):
         self.name = name
         self.size = size
@@ -100,6 +103,8 @@ class Seal5Register:
 
 
 class Seal5RegisterGroup:
+    __slots__ = ("names", "reg_size", "reg_width", "reg_signed", "reg_is_const", "reg_class", "_registers")
+
     def __init__(
         self,
         names: List[str],
@@ -116,6 +121,7 @@ class Seal5RegisterGroup:
         self.reg_is_const = reg_is_const
         # TODO: drop reg-specifics?
         self.reg_class = reg_class
+        self._registers = None
 
     def __repr__(self):
         return (
@@ -125,17 +131,20 @@ class Seal5RegisterGroup:
 
     @property
     def registers(self):
-        return [
-            Seal5Register(
-                name,
-                size=self.reg_size,
-                width=self.reg_width,
-                signed=self.reg_signed,
-                is_const=self.reg_is_const,
-                reg_class=self.reg_class,
+        # Created once, so the registers of a group are shared with the registers of the set
+        if self._registers is None:
+            self._registers = tuple(
+                Seal5Register(
+                    name,
+                    size=self.reg_size,
+                    width=self.reg_width,
+                    signed=self.reg_signed,
+                    is_const=self.reg_is_const,
+                    reg_class=self.reg_class,
+                )
+                for name in self.names
             )
-            for name in self.names
-        ]
+        return self._registers
 
     @property
     def size(self):
@@ -144,7 +153,11 @@ class Seal5RegisterGroup:
     def __len__(self):
         return self.size
 
-    # TODO: allow indexing i.e. via group[12]
+    def __getitem__(self, idx):
+        return self.registers[idx]
+
+    def __iter__(self):
+        return iter(self.registers)
 
 
 class Seal5Intrinsic:
@@ -152,8 +165,10 @@ class Seal5Intrinsic:
 
 
 class Seal5Constraint:
+    __slots__ = ("stmts", "description")
+
     stmts: List[BaseNode]
-    description: Optional[str] = None
+    description: Optional[str]
 
     def __init__(self, stmts, description=None):
         self.stmts = stmts
@@ -216,15 +231,37 @@ class Seal5DataType(Enum):
 
 
 class Seal5Type:
-    datatype: Union[DataType, Seal5DataType] = DataType.NONE
-    width: Optional[int] = None
-    lanes: Optional[int] = None
+    """Immutable type of an operand or register.
+
+    Instances are interned: Seal5Type(datatype, width, lanes) always returns the same object for the same
+    arguments, so types can be compared by identity and are shared by all operands of a model.
+    """
+
+    __slots__ = ("datatype", "width", "lanes", "__weakref__")
+    _instances = weakref.WeakValueDictionary()
+
+    datatype: Union[DataType, Seal5DataType]
+    width: Optional[int]
+    lanes: Optional[int]
     # TODO: is_vector,...
 
-    def __init__(self, datatype, width, lanes):
-        self.datatype = datatype
-        self.width = width
-        self.lanes = lanes
+    def __new__(cls, datatype=DataType.NONE, width=None, lanes=None):
+        key = (cls, datatype, width, lanes)
+        ret = cls._instances.get(key)
+        if ret is None:
+            ret = super().__new__(cls)
+            object.__setattr__(ret, "datatype", datatype)
+            object.__setattr__(ret, "width", width)
+            object.__setattr__(ret, "lanes", lanes)
+            cls._instances[key] = ret
+        return ret
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} objects are interned and can not be modified")
+
+    def __reduce__(self):
+        # Interned again when unpickled (or copied)
+        return (type(self), (self.datatype, self.width, self.lanes))
 
     def __repr__(self):
         sign_letter = None
@@ -249,10 +286,12 @@ class Seal5Type:
 
 
 class Seal5Operand:
+    __slots__ = ("name", "ty", "_attributes", "constraints")
+
     name: str
     ty: Seal5Type
-    _attributes: Dict[Seal5OperandAttribute, List[BaseNode]] = {}
-    constraints: List[Seal5Constraint] = []
+    _attributes: Dict[Seal5OperandAttribute, List[BaseNode]]
+    constraints: List[Seal5Constraint]
     # TODO: track imm, const?
     # TODO: helpers (is_float, is_int,...)
 
@@ -277,6 +316,8 @@ class Seal5Operand:
 
 
 class Seal5ImmOperand(Seal5Operand):
+    __slots__ = ()
+
     def __init__(self, name, ty, attributes, constraints):
         super().__init__(name, ty, attributes, constraints)
         if Seal5OperandAttribute.IS_IMM not in self.attributes:
@@ -293,6 +334,8 @@ class Seal5ImmOperand(Seal5Operand):
 
 
 class Seal5RegOperand(Seal5Operand):
+    __slots__ = ("reg_class", "reg_ty")
+
     reg_class: Seal5RegisterClass
     reg_ty: Seal5Type
 
@@ -314,16 +357,22 @@ class Seal5RegOperand(Seal5Operand):
 
 
 class Seal5GPROperand(Seal5RegOperand):
+    __slots__ = ()
+
     def __init__(self, name, ty, attributes, constraints, reg_ty):
         super().__init__(name, ty, attributes, constraints, Seal5RegisterClass.GPR, reg_ty)
 
 
 class Seal5FPROperand(Seal5RegOperand):
+    __slots__ = ()
+
     def __init__(self, name, ty, attributes, constraints, reg_ty):
         super().__init__(name, ty, attributes, constraints, Seal5RegisterClass.FPR, reg_ty)
 
 
 class Seal5CSROperand(Seal5RegOperand):
+    __slots__ = ()
+
     def __init__(self, name, ty, attributes, constraints, reg_ty):
         super().__init__(name, ty, attributes, constraints, Seal5RegisterClass.CSR, reg_ty)
 
@@ -688,7 +737,7 @@ class Seal5Instruction(Instruction):
         return ret
 
 
-SEAL5_METAMODEL_VERSION = 2
+SEAL5_METAMODEL_VERSION = 3
 
 
 class Seal5Model(M2Model):
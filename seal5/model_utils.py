@@ -1,25 +1,472 @@
 """Utilities for loading and dumping metamodels."""
 
+import io
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from enum import IntEnum
 from pathlib import Path
 import pickle
-from typing import Union
+from dataclasses import dataclass
+from typing import Union, Optional, Dict, Tuple, List
 
 from m2isar.metamodel import M2_METAMODEL_VERSION, M2Model
 from seal5.model import Seal5Model, SEAL5_METAMODEL_VERSION
 
 from seal5.logging import Logger
+from seal5.utils import str2bool
 
 logger = Logger("model_utils")
 
+# Format of written .seal5model files: pickle (legacy), pickle5, zstd, lz4, sharded, sharded-zstd, sharded-lz4
+# (sharded formats only speed up partial loads, see load_model, which are not used by the passes)
+# (.m2isarmodel files always use pickle)
+MODEL_FORMAT = os.environ.get("SEAL5_MODEL_FORMAT", "pickle5")
+# Compression level for zstd/lz4 (None: library default)
+MODEL_COMPRESSION_LEVEL = os.environ.get("SEAL5_MODEL_COMPRESSION_LEVEL", None)
+# Verify content hash when loading models in the framed format
+MODEL_VERIFY = str2bool(os.environ.get("SEAL5_MODEL_VERIFY", True))
 
-def load_model(
-    model_path: Union[str, Path], compat: bool = False, allow_missmatch: bool = False
-) -> Union[Seal5Model, M2Model]:
-    logger.debug("loading model: %s", str(model_path))
+MODEL_MAGIC = b"SEAL5MDL"
+MODEL_HEADER_VERSION = 1
+# magic, header version, codec, pickle protocol, sha256 of the pickled model
+MODEL_HEADER = struct.Struct("<8sBBB32s")
+
+
+class ModelCodec(IntEnum):
+    NONE = 0
+    ZSTD = 1
+    LZ4 = 2
+
+
+MODEL_FORMATS = {
+    "pickle5": ModelCodec.NONE,
+    "zstd": ModelCodec.ZSTD,
+    "lz4": ModelCodec.LZ4,
+}
+
+
+SHARDED_MAGIC = b"SEAL5SHD"
+SHARDED_HEADER_VERSION = 1
+# magic, header version, codec, offset and size of index
+SHARDED_HEADER = struct.Struct("<8sBBQQ")
+
+SHARDED_FORMATS = {
+    "sharded": ModelCodec.NONE,
+    "sharded-zstd": ModelCodec.ZSTD,
+    "sharded-lz4": ModelCodec.LZ4,
+}
+
+
+def _get_compression_level():
+    return int(MODEL_COMPRESSION_LEVEL) if MODEL_COMPRESSION_LEVEL is not None else None
+
+
+def _import_codec(codec: ModelCodec):
+    try:
+        if codec == ModelCodec.ZSTD:
+            import zstandard
+
+            return zstandard
+        if codec == ModelCodec.LZ4:
+            import lz4.frame
+
+            return lz4.frame
+    except ImportError as ex:
+        package = {ModelCodec.ZSTD: "zstandard", ModelCodec.LZ4: "lz4"}[codec]
+        raise RuntimeError(f"Model codec {codec.name} requires the {package} package") from ex
+    raise ValueError(f"Unsupported model codec: {codec}")
+
+
+def _compress(data: bytes, codec: ModelCodec):
+    if codec == ModelCodec.NONE:
+        return data
+    lib = _import_codec(codec)
+    level = _get_compression_level()
+    if codec == ModelCodec.ZSTD:
+        compressor = lib.ZstdCompressor() if level is None else lib.ZstdCompressor(level=level)
+        return compressor.compress(data)
+    return lib.compress(data) if level is None else lib.compress(data, compression_level=level)
+
+
+def _decompress(data: bytes, codec: ModelCodec):
+    if codec == ModelCodec.NONE:
+        return data
+    lib = _import_codec(codec)
+    if codec == ModelCodec.ZSTD:
+        return lib.ZstdDecompressor().decompress(data)
+    return lib.decompress(data)
+
+
+def serialize_model(model_obj, fmt: str = "pickle5"):
+    """Convert model to bytes.
+
+    Apart from the legacy format (plain pickle), the pickled model is prefixed by a header containing the format
+    version, codec and a content hash and optionally compressed.
+    """
+    if fmt == "pickle":
+        return pickle.dumps(model_obj)
+    if fmt in SHARDED_FORMATS:
+        return serialize_sharded_model(model_obj, fmt=fmt)
+    codec = MODEL_FORMATS.get(fmt)
+    if codec is None:
+        raise ValueError(f"Unsupported model format: {fmt}")
+    data = pickle.dumps(model_obj, protocol=5)
+    header = MODEL_HEADER.pack(MODEL_MAGIC, MODEL_HEADER_VERSION, codec, 5, hashlib.sha256(data).digest())
+    return header + _compress(data, codec)
+
+
+def deserialize_model(data: bytes, verify: bool = MODEL_VERIFY):
+    """Convert bytes to model (format is detected automatically)."""
+    if data.startswith(SHARDED_MAGIC):
+        return ShardedModelReader(data, verify=verify).load()
+    if not data.startswith(MODEL_MAGIC):
+        return pickle.loads(data)
+    _, version, codec, _, digest = MODEL_HEADER.unpack_from(data)
+    if version > MODEL_HEADER_VERSION:
+        raise RuntimeError(f"Unsupported model file version: {version}")
+    data = _decompress(memoryview(data)[MODEL_HEADER.size :], ModelCodec(codec))
+    if verify and hashlib.sha256(data).digest() != digest:
+        raise RuntimeError("Model file is corrupted (hash mismatch)")
+    return pickle.loads(data)
+
+
+class ShardPickler(pickle.Pickler):
+    """Pickler which stores references instead of the instruction containers of all sets and (optionally)
+    instead of objects already contained in the pickle of the base model."""
+
+    def __init__(self, file, instr_dicts: Dict[int, str], base_memo: Optional[Dict[int, int]] = None):
+        super().__init__(file, protocol=5)
+        self.instr_dicts = instr_dicts
+        self.base_memo = base_memo
+
+    def persistent_id(self, obj):
+        set_name = self.instr_dicts.get(id(obj))
+        if set_name is not None:
+            return ("instructions", set_name)
+        if self.base_memo is not None:
+            idx = self.base_memo.get(id(obj))
+            if idx is not None:
+                return ("base", idx)
+        return None
+
+
+class ShardUnpickler(pickle.Unpickler):
+    """Unpickler which resolves the references created by ShardPickler."""
+
+    def __init__(self, file, instr_dicts: Dict[str, dict], base_memo: Optional[Dict[int, object]] = None):
+        super().__init__(file)
+        self.instr_dicts = instr_dicts
+        self.base_memo = base_memo
+
+    def persistent_load(self, pid):
+        kind, key = pid
+        if kind == "instructions":
+            return self.instr_dicts.setdefault(key, {})
+        return self.base_memo[key]
+
+
+def serialize_sharded_model(model_obj, fmt: str = "sharded"):
+    """Convert model to bytes using the sharded format.
+
+    The model without any instructions (base) and every single instruction are pickled (and optionally
+    compressed) separately, followed by an index of all shards. The pickles of the instructions refer to the
+    objects of the base pickle, hence objects reachable from the base (sets, memories, functions,...) are only
+    stored once and the instructions can be loaded independently (see ShardedModelReader). Objects of the base
+    are referenced by their memo index, which is the same when pickling and unpickling.
+    """
+    codec = SHARDED_FORMATS.get(fmt)
+    if codec is None:
+        raise ValueError(f"Unsupported model format: {fmt}")
+    instr_dicts = {id(set_def.instructions): set_name for set_name, set_def in model_obj.sets.items()}
+    out = io.BytesIO()
+    out.write(bytes(SHARDED_HEADER.size))
+
+    def write_shard(obj, base_memo=None):
+        f = io.BytesIO()
+        pickler = ShardPickler(f, instr_dicts, base_memo=base_memo)
+        pickler.dump(obj)
+        data = f.getvalue()
+        offset = out.tell()
+        out.write(_compress(data, codec))
+        return pickler, (offset, out.tell() - offset, hashlib.sha256(data).digest())
+
+    base_pickler, base_entry = write_shard(model_obj)
+    # Keep the copied memo alive while pickling the instructions, ids are only unique for live objects
+    base_objs = base_pickler.memo.copy()
+    # Plain strings are cheaper to store again than to reference
+    base_memo = {obj_id: idx for obj_id, (idx, obj) in base_objs.items() if not isinstance(obj, str)}
+    index = {"base": base_entry, "sets": {}}
+    for set_name, set_def in model_obj.sets.items():
+        entries = []
+        for key, instr_def in set_def.instructions.items():
+            _, entry = write_shard(instr_def, base_memo=base_memo)
+            entries.append((key, instr_def.name, entry))
+        index["sets"][set_name] = entries
+    index_data = pickle.dumps(index, protocol=5)
+    index_offset = out.tell()
+    out.write(index_data)
+    out.seek(0)
+    out.write(SHARDED_HEADER.pack(SHARDED_MAGIC, SHARDED_HEADER_VERSION, codec, index_offset, len(index_data)))
+    return out.getvalue()
+
+
+class ShardedModelReader:
+    """Loads the base model and selected instructions of a model in the sharded format.
+
+    Instructions are added to the model returned by load_base(), repeated loads share the same model object.
+    """
+
+    def __init__(self, buf, verify: bool = MODEL_VERIFY):
+        magic, version, codec, index_offset, index_size = SHARDED_HEADER.unpack_from(buf)
+        assert magic == SHARDED_MAGIC, "Not a sharded model"
+        if version > SHARDED_HEADER_VERSION:
+            raise RuntimeError(f"Unsupported model file version: {version}")
+        self.buf = buf
+        self.verify = verify
+        self.codec = ModelCodec(codec)
+        self.index = pickle.loads(buf[index_offset : index_offset + index_size])
+        self.instr_dicts: Dict[str, dict] = {}
+        self.base_memo = None
+        self.model_obj = None
+
+    @property
+    def set_names(self):
+        return list(self.index["sets"].keys())
+
+    def instruction_names(self, set_name: str):
+        return [instr_name for _, instr_name, _ in self.index["sets"][set_name]]
+
+    def _read_shard(self, entry):
+        offset, size, digest = entry
+        data = _decompress(self.buf[offset : offset + size], self.codec)
+        if self.verify and hashlib.sha256(data).digest() != digest:
+            raise RuntimeError("Model file is corrupted (hash mismatch)")
+        return data
+
+    def load_base(self):
+        """Load the model without instructions."""
+        if self.model_obj is None:
+            unpickler = ShardUnpickler(io.BytesIO(self._read_shard(self.index["base"])), self.instr_dicts)
+            self.model_obj = unpickler.load()
+            self.base_memo = unpickler.memo.copy()
+        return self.model_obj
+
+    def _load_instruction(self, entry):
+        return ShardUnpickler(io.BytesIO(self._read_shard(entry)), self.instr_dicts, base_memo=self.base_memo).load()
+
+    def load(self, sets: Optional[List[str]] = None, instructions: Optional[List[str]] = None):
+        """Load the model with the given sets and instructions (default: all)."""
+        model_obj = self.load_base()
+        for set_name, set_def in list(model_obj.sets.items()):
+            if sets is not None and set_name not in sets:
+                del model_obj.sets[set_name]
+                continue
+            for key, instr_name, entry in self.index["sets"].get(set_name, []):
+                if instructions is not None and instr_name not in instructions:
+                    continue
+                if key not in set_def.instructions:
+                    set_def.instructions[key] = self._load_instruction(entry)
+        return model_obj
+
+
+def filter_model(model_obj, sets: Optional[List[str]] = None, instructions: Optional[List[str]] = None):
+    """Drop all sets and instructions which were not selected."""
+    for set_name, set_def in list(model_obj.sets.items()):
+        if sets is not None and set_name not in sets:
+            del model_obj.sets[set_name]
+            continue
+        if instructions is not None:
+            set_def.instructions = {
+                key: instr_def for key, instr_def in set_def.instructions.items() if instr_def.name in instructions
+            }
+    return model_obj
+
+
+def get_model_format(path: Path):
+    if Path(path).suffix == ".m2isarmodel":
+        # Keep readable for M2-ISA-R
+        return "pickle"
+    return MODEL_FORMAT
+
+
+@dataclass
+class SessionEntry:
+    """Model held in memory by a ModelSession."""
+
+    model_obj: Union[Seal5Model, M2Model]
+    dirty: bool = False
+    stat: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of file at last sync
+
+
+def _file_stat(path: Path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ModelSession:
+    """Keeps models in memory while a pass pipeline is running.
+
+    While a session is active, load_model() returns the live model object and dump_model() only marks
+    it as modified. Files are written back on sync() (checkpoints) and when the session is closed.
+    If a file was changed on disk in the meantime (i.e. by a pass running in a subprocess), it is
+    loaded again.
+    """
+
+    def __init__(self):
+        self.entries: Dict[Path, SessionEntry] = {}
+        self.lock = threading.RLock()
+        self.prev: Optional["ModelSession"] = None
+
+    def __enter__(self):
+        global _SESSION
+        self.prev = _SESSION
+        _SESSION = self
+        return self
+
+    def __exit__(self, exc_type, *_exc):
+        global _SESSION
+        _SESSION = self.prev
+        if exc_type is None:
+            self.sync()
+        else:
+            # Live objects might be partially transformed, keep files at last checkpoint
+            self.discard()
+
+    def lookup(self, path: Path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None:
+                return None
+            if not entry.dirty and entry.stat != _file_stat(path):
+                logger.debug("model changed on disk: %s", path)
+                del self.entries[path]
+                return None
+            return entry.model_obj
+
+    def track(self, path: Path, model_obj):
+        with self.lock:
+            self.entries[path] = SessionEntry(model_obj, dirty=False, stat=_file_stat(path))
+
+    def update(self, path: Path, model_obj):
+        with self.lock:
+            for other_path, entry in list(self.entries.items()):
+                if other_path != path and entry.model_obj is model_obj:
+                    # Model was written to another file, do not share live objects between entries
+                    if not entry.dirty:
+                        del self.entries[other_path]
+                    _dump_model_file(model_obj, path)
+                    return
+            self.entries[path] = SessionEntry(model_obj, dirty=True)
+
+    def sync(self, path: Optional[Path] = None):
+        """Write back modified models."""
+        with self.lock:
+            for path_, entry in self.entries.items():
+                if path is not None and path_ != path:
+                    continue
+                if not entry.dirty:
+                    continue
+                _dump_model_file(entry.model_obj, path_)
+                entry.dirty = False
+                entry.stat = _file_stat(path_)
+
+    def discard(self):
+        """Drop all models without writing them back."""
+        with self.lock:
+            num_dirty = len([entry for entry in self.entries.values() if entry.dirty])
+            if num_dirty > 0:
+                logger.warning("Discarding %d unsaved model(s)", num_dirty)
+            self.entries.clear()
+
+
+_SESSION: Optional[ModelSession] = None
+
+
+def get_model_session():
+    return _SESSION
+
+
+def reset_model_session():
+    """Forget session inherited from parent process (i.e. in forked workers)."""
+    global _SESSION
+    _SESSION = None
+
+
+def sync_model_session():
+    """Write back models of active session (if any). Needed before handing model files to other processes."""
+    if _SESSION is not None:
+        _SESSION.sync()
+
+
+def _load_model_file(model_path: Path):
     with open(model_path, "rb") as f:
         # models: "dict[str, arch.CoreDef]" = pickle.load(f)
         # sets: "dict[str, arch.InstructionSet]" = pickle.load(f)
-        model_obj: Union[Seal5Model, M2Model] = pickle.load(f)
+        return deserialize_model(f.read())
+
+
+def _load_partial_model_file(
+    model_path: Path, sets: Optional[List[str]] = None, instructions: Optional[List[str]] = None
+):
+    with open(model_path, "rb") as f:
+        if f.read(len(SHARDED_MAGIC)) == SHARDED_MAGIC:
+            # Only the index, the base and the selected instructions are read
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return ShardedModelReader(buf).load(sets=sets, instructions=instructions)
+        f.seek(0)
+        model_obj = deserialize_model(f.read())
+    return filter_model(model_obj, sets=sets, instructions=instructions)
+
+
+def _dump_model_file(model_obj, out_path: Path, fmt: Optional[str] = None):
+    logger.debug("writing model: %s", out_path)
+    out_path = Path(out_path)
+    if fmt is None:
+        fmt = get_model_format(out_path)
+    data = serialize_model(model_obj, fmt=fmt)
+    # Readers (i.e. other processes) should never see partially written files
+    tmp_path = out_path.parent / f"{out_path.name}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, out_path)
+
+
+def load_model(
+    model_path: Union[str, Path],
+    compat: bool = False,
+    allow_missmatch: bool = False,
+    sets: Optional[List[str]] = None,
+    instructions: Optional[List[str]] = None,
+) -> Union[Seal5Model, M2Model]:
+    """Load model from file (or the active session).
+
+    If sets or instructions are given, only the selected parts of the model are loaded. The returned model is
+    a private copy which is not tracked by the session. Partial loading is a library feature (also exposed by the
+    --sets/--instructions flags of the llvmir and patterngen writers for manual runs): the passes always load
+    whole models, as their outputs (e.g. patch indices) have to cover all instructions.
+    """
+    logger.debug("loading model: %s", str(model_path))
+    session = _SESSION
+    model_obj = None
+    partial = sets is not None or instructions is not None
+    if session is not None:
+        model_path = Path(model_path).resolve()
+        if partial:
+            session.sync(model_path)
+        else:
+            model_obj = session.lookup(model_path)
+    if partial:
+        model_obj = _load_partial_model_file(model_path, sets=sets, instructions=instructions)
+    elif model_obj is None:
+        model_obj: Union[Seal5Model, M2Model] = _load_model_file(model_path)
+        if session is not None:
+            session.track(model_path, model_obj)
     if compat:
         assert isinstance(model_obj, M2Model), "Expected M2Model"
     else:
@@ -44,5 +491,8 @@ def dump_model(
         else:
             assert suffix == required_suffix, f"Invalid suffix: {suffix}, Expected: {required_suffix}"
     logger.debug("dumping model: %s", out_path)
-    with open(out_path, "wb") as f:
-        pickle.dump(model_obj, f)
+    session = _SESSION
+    if session is not None:
+        session.update(Path(out_path).resolve(), model_obj)
+        return
+    _dump_model_file(model_obj, out_path)
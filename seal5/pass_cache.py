@@ -0,0 +1,191 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Content-addressed cache for results of Seal5 transform passes."""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, List
+
+from seal5.logging import Logger
+from seal5.model_utils import get_model_session
+from seal5.version import __version__
+
+logger = Logger("pass_cache")
+
+DEFAULT_PASS_CACHE_SIZE = 1024  # MB
+PASS_CACHE_SIZE = int(os.environ.get("SEAL5_PASS_CACHE_SIZE", DEFAULT_PASS_CACHE_SIZE))
+
+
+def get_pass_cache_dir(settings):
+    return settings.cache_dir / "passes"
+
+
+def hash_file(path: Path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_dir_size(path: Path):
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class PassCache:
+    """Persistent cache for model -> model passes.
+
+    Entries are keyed by the digest of the input model, the pass name, the (merged) pass options and the Seal5
+    version. Each entry holds the output model, the metrics CSV files written by the pass and the returned metrics.
+    The least recently used entries are evicted once the total size exceeds max_size (MB).
+    """
+
+    def __init__(self, directory: Path, max_size: int = PASS_CACHE_SIZE):
+        self.directory: Path = Path(directory)
+        self.max_size: int = max_size
+        self.lock = threading.Lock()
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def get_key(self, pass_name: str, input_file: Path, options: Optional[dict] = None):
+        session = get_model_session()
+        if session is not None:
+            # Digest needs to be computed on the file
+            session.sync(Path(input_file).resolve())
+        data = {
+            "pass": pass_name,
+            "input": hash_file(input_file),
+            "options": options if options is not None else {},
+            "version": __version__,
+        }
+        text = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def lookup(self, key: str):
+        entry_dir = self.directory / key
+        result_file = entry_dir / "result.json"
+        if not result_file.is_file():
+            with self.lock:
+                self.n_misses += 1
+            return None
+        with open(result_file, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        os.utime(result_file)  # LRU
+        with self.lock:
+            self.n_hits += 1
+        return result
+
+    def restore(self, key: str, result: dict, output_file: Path, metrics_dir: Path):
+        entry_dir = self.directory / key
+        shutil.copyfile(entry_dir / result["model"], output_file)
+        for metrics_file in result["metrics_files"]:
+            shutil.copyfile(entry_dir / metrics_file, metrics_dir / metrics_file)
+        return result["metrics"]
+
+    def store(self, key: str, output_file: Path, metrics_files: List[Path], metrics: Optional[dict]):
+        entry_dir = self.directory / key
+        tmp_dir = self.directory / f"{key}.tmp{os.getpid()}.{threading.get_ident()}"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(output_file, tmp_dir / output_file.name)
+        for metrics_file in metrics_files:
+            shutil.copyfile(metrics_file, tmp_dir / metrics_file.name)
+        result = {
+            "model": output_file.name,
+            "metrics_files": [metrics_file.name for metrics_file in metrics_files],
+            "metrics": metrics,
+        }
+        with open(tmp_dir / "result.json", "w", encoding="utf-8") as f:
+            json.dump(result, f, default=str)
+        try:
+            tmp_dir.rename(entry_dir)
+        except OSError:
+            # Entry was added concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        if not self.directory.is_dir():
+            return
+        with self.lock:
+            entries = []
+            total = 0
+            for entry_dir in self.directory.iterdir():
+                result_file = entry_dir / "result.json"
+                if not result_file.is_file():
+                    continue
+                size = get_dir_size(entry_dir)
+                entries.append((result_file.stat().st_mtime, size, entry_dir))
+                total += size
+            max_bytes = self.max_size * 1024 * 1024
+            for _, size, entry_dir in sorted(entries):
+                if total <= max_bytes:
+                    break
+                logger.debug("Evicting pass cache entry %s", entry_dir.name)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        if self.directory.is_dir():
+            shutil.rmtree(self.directory)
+
+
+def list_metrics_files(metrics_dir: Path, prefix: str):
+    return {path: path.stat().st_mtime_ns for path in metrics_dir.glob(f"{prefix}_*_metrics.csv")}
+
+
+def run_cached(
+    cache: PassCache,
+    pass_name: str,
+    handler,
+    input_model: str,
+    options: dict,
+    input_suffix: str = ".seal5model",
+    output_suffix: str = ".seal5model",
+    settings=None,
+    **kwargs,
+):
+    """Run model pass handler unless its result is already cached."""
+    from seal5.passes import PassResult
+
+    input_file = settings.models_dir / f"{input_model}{input_suffix}"
+    output_file = settings.models_dir / f"{input_model}{output_suffix}"
+    metrics_dir = settings.temp_dir
+    if not input_file.is_file():
+        return handler(input_model, settings=settings, **kwargs)
+    key = cache.get_key(pass_name, input_file, options)
+    result = cache.lookup(key)
+    if result is not None:
+        logger.info("Using cached result of pass %s for model %s", pass_name, input_model)
+        metrics = cache.restore(key, result, output_file, metrics_dir)
+        return PassResult(metrics=metrics)
+    prefix = f"{input_model}{output_suffix}"
+    before = list_metrics_files(metrics_dir, prefix)
+    ret = handler(input_model, settings=settings, **kwargs)
+    session = get_model_session()
+    if session is not None:
+        session.sync(output_file.resolve())
+    after = list_metrics_files(metrics_dir, prefix)
+    metrics_files = [path for path, mtime in after.items() if before.get(path) != mtime]
+    metrics = ret.metrics if ret else None
+    cache.store(key, output_file, metrics_files, metrics)
+    return ret
@@ -1,5 +1,11 @@
+import os
+import json
+import logging
+import time
+import hashlib
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
 
 from seal5 import utils
 from seal5.tools import cdsl2llvm
@@ -10,14 +16,67 @@ from seal5.types import PatchStage
 from seal5.settings import Seal5Settings, PatchSettings
 from seal5.riscv_utils import build_riscv_mattr, get_riscv_defaults
 from seal5.metrics import read_metrics
+from seal5.pass_cache import hash_file
+from seal5.tool_cache import TOOL_CACHE, get_tool_cache_dir, get_tool_digest, open_tool_cache
+from seal5.model_utils import sync_model_session, load_model
 
 logger = Logger("pass_list")
 
+# Max. number of concurrently running llc processes (see convert_llvmir_to_gmir)
+LLC_WORKERS = int(os.environ.get("SEAL5_LLC_WORKERS", os.cpu_count() or 1))
+
 
 def sanitize_args(args):
     return [str(arg) if isinstance(arg, Path) else arg for arg in args]
 
 
+def python(*args, **kwargs):
+    """Run a python module in a subprocess after writing back in-memory models."""
+    sync_model_session()
+    return utils.python(*args, **kwargs)
+
+
+def get_cdsl2llvm_build_dir(settings: Seal5Settings, check: bool = False):
+    """Build directory of the LLVM used for pattern-gen (integrated or standalone cdsl2llvm)."""
+    if settings.tools.pattern_gen.integrated:
+        return settings.get_llvm_build_dir(fallback=True, check=check)
+    return settings.deps_dir / "cdsl2llvm" / "llvm" / "build"
+
+
+def process_instrs(transform, instr_defs, set_def, log_level: str = "warning", skip_failing: bool = True):
+    """Apply a per-instruction transform to instructions of a set (PassScope.INSTR).
+
+    Uses the process_instr function, visitor and logger of the given transform module. The visitor is patched into
+    the model once and the outcome is reported like the model-level transforms do.
+    """
+    from m2isar.metamodel import patch_model
+
+    transform.logger.setLevel(getattr(logging, log_level.upper()))
+    patch_model(transform.visitor)
+    metrics = {
+        "n_instructions": 0,
+        "n_skipped": 0,
+        "n_failed": 0,
+        "n_success": 0,
+        "skipped_instructions": [],
+        "failed_instructions": [],
+        "success_instructions": [],
+    }
+    for instr_def in instr_defs:
+        metrics["n_instructions"] += 1
+        try:
+            transform.process_instr(instr_def, set_def)
+            metrics["n_success"] += 1
+            metrics["success_instructions"].append(instr_def.name)
+        except Exception as ex:
+            if not skip_failing:
+                raise ex
+            transform.logger.exception(ex)
+            metrics["n_failed"] += 1
+            metrics["failed_instructions"].append(instr_def.name)
+    return PassResult(metrics=metrics)
+
+
 def convert_models(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -53,7 +112,7 @@ def convert_models(
         args = sanitize_args(args)
         Converter(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.converter",
             *args,
@@ -90,7 +149,7 @@ def optimize_model(
         args = sanitize_args(args)
         OptimizeInstructions(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.optimize_instructions.optimizer",
             *args,
@@ -127,7 +186,7 @@ def inline_functions(
         args = sanitize_args(args)
         InlineFunctions(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.inline_functions.optimizer",
             *args,
@@ -164,7 +223,7 @@ def infer_types(
         args = sanitize_args(args)
         InferTypes(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.infer_types.transform",
             *args,
@@ -175,6 +234,21 @@ def infer_types(
     return PassResult(metrics={})
 
 
+def infer_types_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.infer_types import transform
+
+    process_instrs(transform, instr_defs, set_def, log_level=log_level if not verbose else "debug", skip_failing=False)
+    return PassResult(metrics={})
+
+
 def simplify_trivial_slices(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -206,7 +280,7 @@ def simplify_trivial_slices(
         args = sanitize_args(args)
         SimplifyTrivialSlices(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.simplify_trivial_slices.transform",
             *args,
@@ -220,6 +294,20 @@ def simplify_trivial_slices(
     return PassResult(metrics=metrics)
 
 
+def simplify_trivial_slices_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.simplify_trivial_slices import transform
+
+    return process_instrs(transform, instr_defs, set_def, log_level=log_level if not verbose else "debug")
+
+
 def explicit_truncations(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -251,7 +339,7 @@ def explicit_truncations(
         args = sanitize_args(args)
         ExplicitTruncations(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.explicit_truncations.transform",
             *args,
@@ -264,6 +352,20 @@ def explicit_truncations(
     return PassResult(metrics=metrics)
 
 
+def explicit_truncations_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.explicit_truncations import transform
+
+    return process_instrs(transform, instr_defs, set_def, log_level=log_level if not verbose else "debug")
+
+
 def process_settings(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -293,7 +395,7 @@ def process_settings(
         args = sanitize_args(args)
         ProcessSettings(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.process_settings.transform",
             *args,
@@ -357,7 +459,7 @@ def filter_model(
         args = sanitize_args(args)
         FilterModel(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.filter_model.filter",
             *args,
@@ -394,7 +496,7 @@ def drop_unused(
         args = sanitize_args(args)
         DropUnused(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.drop_unused.optimizer",
             *args,
@@ -430,7 +532,7 @@ def detect_registers(
         args = sanitize_args(args)
         DetectRegisters(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.detect_registers.detect",
             *args,
@@ -472,7 +574,7 @@ def detect_behavior_constraints(
         args = sanitize_args(args)
         CollectRaises(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.collect_raises.collect",
             *args,
@@ -517,7 +619,7 @@ def detect_side_effects(
         args = sanitize_args(args)
         DetectSideEffects(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.detect_side_effects.collect",
             *args,
@@ -531,6 +633,20 @@ def detect_side_effects(
     return PassResult(metrics=metrics)
 
 
+def detect_side_effects_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.detect_side_effects import collect
+
+    return process_instrs(collect, instr_defs, set_def, log_level=log_level if not verbose else "debug")
+
+
 def detect_inouts(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -562,7 +678,7 @@ def detect_inouts(
         args = sanitize_args(args)
         DetectInouts(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.detect_inouts.collect",
             *args,
@@ -576,6 +692,20 @@ def detect_inouts(
     return PassResult(metrics=metrics)
 
 
+def detect_inouts_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.detect_inouts import collect
+
+    return process_instrs(collect, instr_defs, set_def, log_level=log_level if not verbose else "debug")
+
+
 def collect_operand_types(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -603,7 +733,7 @@ def collect_operand_types(
         args = sanitize_args(args)
         CollectOperandTypes(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.collect_operand_types.collect",
             *args,
@@ -645,7 +775,7 @@ def collect_register_operands(
         args = sanitize_args(args)
         CollectRegisterOperands(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.collect_register_operands.collect",
             *args,
@@ -690,7 +820,7 @@ def collect_immediate_operands(
         args = sanitize_args(args)
         CollectImmediateOperands(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.collect_immediate_operands.collect",
             *args,
@@ -730,7 +860,7 @@ def eliminate_rd_cmp_zero(
         args = sanitize_args(args)
         EliminateRdCmpZero(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.eliminate_rd_cmp_zero.transform",
             *args,
@@ -767,7 +897,7 @@ def eliminate_mod_rfs(
         args = sanitize_args(args)
         EliminateModRFS(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.eliminate_mod_rfs.transform",
             *args,
@@ -787,9 +917,6 @@ def write_yaml(
     log_level: str = "warning",
     **_kwargs,
 ):
-    del use_subprocess  # unused
-    # if not use_subprocess:
-    #     raise NotImplementedError("use_subprocess=False")
     assert inplace
     input_file = settings.models_dir / f"{input_model}.seal5model"
     assert input_file.is_file(), f"File not found: {input_file}"
@@ -803,14 +930,20 @@ def write_yaml(
         "--output",
         settings.temp_dir / new_name,
     ]
-    utils.python(
-        "-m",
-        "seal5.backends.yaml.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.yaml import YAMLBackend
+
+        args = sanitize_args(args)
+        YAMLBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.yaml.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     new_settings: Seal5Settings = Seal5Settings.from_yaml_file(settings.temp_dir / new_name)
     settings.merge(new_settings, overwrite=False, inplace=True)
     settings.save()
@@ -829,10 +962,7 @@ def write_cdsl(
     log_level: str = "warning",
     **_kwargs,
 ):
-    del use_subprocess  # unused
     gen_metrics_file = True
-    # if not use_subprocess:
-    #     raise NotImplementedError("use_subprocess=False")
     assert inplace
     input_file = settings.models_dir / f"{input_model}.seal5model"
     assert input_file.is_file(), f"File not found: {input_file}"
@@ -858,14 +988,20 @@ def write_cdsl(
         # TODO: move to .seal5/metrics
         metrics_file = settings.temp_dir / (new_name + "_coredsl2_writer_metrics.csv")
         args.extend(["--metrics", metrics_file])
-    utils.python(
-        "-m",
-        "seal5.backends.coredsl2.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.coredsl2 import CoreDSL2Backend
+
+        args = sanitize_args(args)
+        CoreDSL2Backend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.coredsl2.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     # args_compat = [
     #     settings.models_dir / name,
     #     "--log",
@@ -975,6 +1111,7 @@ def convert_behav_to_llvmir(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = True,
     log_level: str = "warning",
     **_kwargs,
@@ -995,6 +1132,8 @@ def convert_behav_to_llvmir(
         log_level if not verbose else "debug",
         "--output",
         settings.temp_dir / new_name,
+        "--cdsl2llvm-dir",
+        get_cdsl2llvm_build_dir(settings),
     ]
     if split:
         (settings.temp_dir / new_name).mkdir(exist_ok=True)
@@ -1003,14 +1142,20 @@ def convert_behav_to_llvmir(
         # TODO: move to .seal5/metrics
         metrics_file = settings.temp_dir / (new_name + "_llvmir_metrics.csv")
         args.extend(["--metrics", metrics_file])
-    utils.python(
-        "-m",
-        "seal5.backends.llvmir.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.llvmir import LLVMIRBackend
+
+        args = sanitize_args(args)
+        LLVMIRBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.llvmir.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     metrics = {}
     if gen_metrics_file:
         metrics = read_metrics(metrics_file)
@@ -1022,6 +1167,7 @@ def convert_behav_to_tablegen(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = True,
     formats: bool = True,
     patterns: bool = True,
@@ -1047,6 +1193,8 @@ def convert_behav_to_tablegen(
         log_level if not verbose else "debug",
         "--output",
         settings.temp_dir / new_name,
+        "--cdsl2llvm-dir",
+        get_cdsl2llvm_build_dir(settings),
     ]
     if split:
         (settings.temp_dir / new_name).mkdir(exist_ok=True)
@@ -1061,6 +1209,8 @@ def convert_behav_to_tablegen(
     if gen_index_file:
         index_file = settings.temp_dir / (new_name + "_tblgen_patterns_index.yml")
         args.extend(["--index", index_file])
+    if TOOL_CACHE:
+        args.extend(["--cache-dir", get_tool_cache_dir(settings)])
     if parallel:
         import multiprocessing
 
@@ -1068,14 +1218,20 @@ def convert_behav_to_tablegen(
         args.extend(["--parallel", str(num_threads)])
     if verbose:
         args.append("--verbose")
-    utils.python(
-        "-m",
-        "seal5.backends.patterngen.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.patterngen import PatternGenBackend
+
+        args = sanitize_args(args)
+        PatternGenBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.patterngen.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             patch_name = f"tblgen_patterns_{input_file.stem}"
@@ -1088,7 +1244,6 @@ def convert_behav_to_tablegen(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
@@ -1102,6 +1257,7 @@ def gen_riscv_features_patch(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = False,
     log_level: str = "warning",
     gen_tests: bool = True,
@@ -1136,14 +1292,20 @@ def gen_riscv_features_patch(
         args.extend(["--index", index_file])
     if gen_tests:
         args.append("--generate-tests")
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_features.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_features import RISCVFeaturesBackend
+
+        args = sanitize_args(args)
+        RISCVFeaturesBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_features.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             comment = f"Generated RISCVFeatures.td patch for {input_file.name}"
@@ -1159,7 +1321,6 @@ def gen_riscv_features_patch(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
@@ -1173,6 +1334,7 @@ def gen_riscv_isa_info_patch(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = False,
     log_level: str = "warning",
     **_kwargs,
@@ -1212,14 +1374,20 @@ def gen_riscv_isa_info_patch(
     if gen_index_file:
         index_file = out_dir / ("riscv_isa_info_index.yml")
         args.extend(["--index", index_file])
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_isa_info.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_isa_info import RISCVISAInfoBackend
+
+        args = sanitize_args(args)
+        RISCVISAInfoBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_isa_info.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             patch_name = f"riscv_isa_info_{input_file.stem}"
@@ -1232,7 +1400,6 @@ def gen_riscv_isa_info_patch(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
@@ -1246,6 +1413,7 @@ def gen_riscv_intrinsics(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = False,
     log_level: str = "warning",
     ignore_failing: bool = False,
@@ -1280,14 +1448,20 @@ def gen_riscv_intrinsics(
     if gen_index_file:
         index_file = out_dir / ("riscv_intrinsics_index.yml")
         args.extend(["--index", index_file])
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_intrinsics.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_intrinsics import RISCVIntrinsicsBackend
+
+        args = sanitize_args(args)
+        RISCVIntrinsicsBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_intrinsics.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             patch_base = f"riscv_intrinsics_target_{input_file.stem}"
@@ -1300,7 +1474,6 @@ def gen_riscv_intrinsics(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
@@ -1314,6 +1487,7 @@ def gen_riscv_instr_info_patch(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = True,
     log_level: str = "warning",
     **_kwargs,
@@ -1351,14 +1525,20 @@ def gen_riscv_instr_info_patch(
     if gen_index_file:
         index_file = out_dir / ("riscv_instr_info_index.yml")
         args.extend(["--index", index_file])
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_instr_info.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_instr_info import RISCVInstrInfoBackend
+
+        args = sanitize_args(args)
+        RISCVInstrInfoBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_instr_info.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             patch_name = f"riscv_instr_info_{input_file.stem}"
@@ -1371,7 +1551,6 @@ def gen_riscv_instr_info_patch(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
@@ -1385,6 +1564,7 @@ def gen_riscv_register_info_patch(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = False,
     **_kwargs,
 ):
@@ -1420,14 +1600,20 @@ def gen_riscv_register_info_patch(
     if gen_index_file:
         index_file = out_dir / ("riscv_register_info_index.yml")
         args.extend(["--index", index_file])
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_register_info.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_register_info import RISCVRegisterInfoBackend
+
+        args = sanitize_args(args)
+        RISCVRegisterInfoBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_register_info.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             patch_name = f"riscv_register_info_{input_file.stem}"
@@ -1440,7 +1626,6 @@ def gen_riscv_register_info_patch(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
@@ -1454,6 +1639,7 @@ def gen_riscv_gisel_legalizer_patch(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     log_level: str = "warning",
     **_kwargs,
 ):
@@ -1483,14 +1669,20 @@ def gen_riscv_gisel_legalizer_patch(
     if gen_index_file:
         index_file = out_dir / ("riscv_gisel_legalizer_index.yml")
         args.extend(["--index", index_file])
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_gisel_legalizer.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_gisel_legalizer import RISCVGISelLegalizerBackend
+
+        args = sanitize_args(args)
+        RISCVGISelLegalizerBackend(args, settings=settings)
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_gisel_legalizer.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             patch_name = "riscv_gisel_legalizer"
@@ -1503,7 +1695,6 @@ def gen_riscv_gisel_legalizer_patch(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     # TODO: introduce global (model-independed) settings file
@@ -1563,6 +1754,14 @@ def gen_riscv_gisel_legalizer_patch(
 #     return PassResult(metrics={})
 
 
+def get_gmir_digest(ll_file: Path, mattr: str, xlen: int, llc_exe: Path):
+    """Digest of the inputs of llc for an instruction (used for incremental conversion)."""
+    text = json.dumps(
+        {"llc": get_tool_digest(llc_exe), "input": hash_file(ll_file), "mattr": mattr, "xlen": xlen}, sort_keys=True
+    )
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
 def convert_llvmir_to_gmir(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -1572,8 +1771,16 @@ def convert_llvmir_to_gmir(
     inplace: bool = True,
     allow_errors: bool = False,
     use_subprocess: bool = False,
+    incremental: bool = False,
+    parallel: Union[bool, int] = True,
     **_kwargs,
 ):
+    """Run llc on the LLVM-IR of every instruction.
+
+    With incremental, instructions are skipped if their GMIR file was generated from the same LLVM-IR, llc and
+    options (stored in a .gmir.digest file next to it). Up to parallel llc processes are run at the same time
+    (True: SEAL5_LLC_WORKERS, False: 1).
+    """
     del env  # unused
     assert inplace
     assert split
@@ -1581,7 +1788,22 @@ def convert_llvmir_to_gmir(
         raise NotImplementedError("use_subprocess=True")
     # input_files = list(settings.models_dir.glob("*.seal5model"))
     # assert len(input_files) > 0, "No Seal5 models found!"
+    llc_exe = None
+    if incremental:
+        llc_exe = Path(get_cdsl2llvm_build_dir(settings, check=True)) / "bin" / "llc"
     errs = []
+    jobs = []
+    metrics = {
+        "n_instructions": 0,
+        "n_skipped": 0,
+        "n_failed": 0,
+        "n_success": 0,
+        "skipped_instructions": [],
+        "failed_instructions": [],
+        "success_instructions": [],
+        "n_cached": 0,
+        "llc_times_s": {},
+    }
     # for input_file in input_files:
     #     name = input_file.name
     #     sub = name.replace(".seal5model", "")
@@ -1625,46 +1847,88 @@ def convert_llvmir_to_gmir(
                 assert len(insn_names) > 0, f"No instructions found in set: {set_name}"
                 # TODO: populate model in yaml backend!
                 for insn_name in insn_names:
+                    metrics["n_instructions"] += 1
                     ll_file = settings.temp_dir / model_name / set_name / f"{insn_name}.ll"
                     ll_err_file = settings.temp_dir / model_name / set_name / f"{insn_name}.ll.err"
                     if ll_err_file.is_file():
                         logger.warning("Skipping %s due to errors.", insn_name)
+                        metrics["n_skipped"] += 1
+                        metrics["skipped_instructions"].append(insn_name)
                         continue
                     elif not ll_file.is_file():
                         logger.info("Skipping %s (unsupported).", insn_name)
+                        metrics["n_skipped"] += 1
+                        metrics["skipped_instructions"].append(insn_name)
                         continue
                     output_file = ll_file.parent / (ll_file.stem + ".gmir")
-                    name = ll_file.name
-                    logger.info("Writing gmir for %s", name)
-                    try:
-                        # TODO: move to backends
-                        cdsl2llvm_build_dir = None
-                        integrated_pattern_gen = settings.tools.pattern_gen.integrated
-                        if integrated_pattern_gen:
-                            cdsl2llvm_build_dir = str(settings.get_llvm_build_dir(fallback=True, check=True))
-                        else:
-                            cdsl2llvm_build_dir = str(settings.deps_dir / "cdsl2llvm" / "llvm" / "build")
-                        # TODO: migrate with pass to cmdline backend
-                        cdsl2llvm.convert_ll_to_gmir(
-                            # settings.deps_dir / "cdsl2llvm" / "llvm" / "build", ll_file, output_file
-                            cdsl2llvm_build_dir,
-                            ll_file,
-                            output_file,
-                            mattr=mattr,
-                            xlen=xlen,
-                            verbose=verbose,
-                        )
-                    except AssertionError as ex:
-                        if allow_errors:
-                            errs.append((insn_name, str(ex)))
-                        else:
-                            raise ex
+                    digest = None
+                    if incremental:
+                        digest = get_gmir_digest(ll_file, mattr, xlen, llc_exe)
+                        digest_file = Path(f"{output_file}.digest")
+                        if output_file.is_file() and digest_file.is_file() and digest_file.read_text() == digest:
+                            logger.info("Skipping %s (unchanged).", insn_name)
+                            metrics["n_skipped"] += 1
+                            metrics["skipped_instructions"].append(insn_name)
+                            continue
+                    jobs.append((insn_name, ll_file, output_file, mattr, xlen, digest))
+
+    if len(jobs) > 0:
+        # TODO: move to backends
+        cdsl2llvm_build_dir = str(get_cdsl2llvm_build_dir(settings, check=True))
+        if isinstance(parallel, bool):
+            parallel = LLC_WORKERS if parallel else 1
+        cache = open_tool_cache(get_tool_cache_dir(settings))
+
+        def run_llc(job):
+            insn_name, ll_file, output_file, mattr, xlen, digest = job
+            logger.info("Writing gmir for %s", ll_file.name)
+            start = time.time()
+            digest_file = Path(f"{output_file}.digest")
+            digest_file.unlink(missing_ok=True)
+            try:
+                # TODO: migrate with pass to cmdline backend
+                cdsl2llvm.convert_ll_to_gmir(
+                    # settings.deps_dir / "cdsl2llvm" / "llvm" / "build", ll_file, output_file
+                    cdsl2llvm_build_dir,
+                    ll_file,
+                    output_file,
+                    mattr=mattr,
+                    xlen=xlen,
+                    verbose=verbose,
+                    cache=cache,
+                )
+            except AssertionError as ex:
+                return insn_name, time.time() - start, ex
+            if digest is not None:
+                digest_file.write_text(digest)
+            return insn_name, time.time() - start, None
+
+        # Every job blocks on a llc process, so threads are sufficient
+        executor = ThreadPoolExecutor(max_workers=max(1, min(parallel, len(jobs))))
+        try:
+            for insn_name, duration, ex in executor.map(run_llc, jobs):
+                metrics["llc_times_s"][insn_name] = duration
+                if ex is None:
+                    metrics["n_success"] += 1
+                    metrics["success_instructions"].append(insn_name)
+                    continue
+                metrics["n_failed"] += 1
+                metrics["failed_instructions"].append(insn_name)
+                if allow_errors:
+                    errs.append((insn_name, str(ex)))
+                else:
+                    raise ex
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if cache is not None:
+                metrics["n_cached"] = cache.n_hits
+                cache.evict()
     if len(errs) > 0:
         # print("errs", errs)
         logger.warning("Ignored Errors:")
         for insn_name, err_str in errs:
             logger.warning("%s: %s", insn_name, err_str)
-    return PassResult(metrics={})
+    return PassResult(metrics=metrics)
 
 
 def gen_seal5_td(
@@ -1874,7 +2138,7 @@ def detect_imm_leafs(
         args = sanitize_args(args)
         DetectImmLeafs(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.detect_imm_leafs.collect",
             *args,
@@ -1888,6 +2152,20 @@ def detect_imm_leafs(
     return PassResult(metrics=metrics)
 
 
+def detect_imm_leafs_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.detect_imm_leafs import collect
+
+    return process_instrs(collect, instr_defs, set_def, log_level=log_level if not verbose else "debug")
+
+
 def detect_calls(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -1919,7 +2197,7 @@ def detect_calls(
         args = sanitize_args(args)
         DetectCalls(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.detect_calls.collect",
             *args,
@@ -1933,6 +2211,20 @@ def detect_calls(
     return PassResult(metrics=metrics)
 
 
+def detect_calls_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.detect_calls import collect
+
+    return process_instrs(collect, instr_defs, set_def, log_level=log_level if not verbose else "debug")
+
+
 def detect_loops(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -1964,7 +2256,7 @@ def detect_loops(
         args = sanitize_args(args)
         DetectLoops(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.detect_loops.collect",
             *args,
@@ -1978,6 +2270,122 @@ def detect_loops(
     return PassResult(metrics=metrics)
 
 
+def detect_loops_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.detect_loops import collect
+
+    return process_instrs(collect, instr_defs, set_def, log_level=log_level if not verbose else "debug")
+
+
+def analyze_behavior(
+    input_model: str,
+    settings: Optional[Seal5Settings] = None,
+    env: Optional[dict] = None,
+    verbose: bool = False,
+    inplace: bool = True,
+    use_subprocess: bool = False,
+    log_level: str = "warning",
+    analyses: Optional[List[str]] = None,
+    **_kwargs,
+):
+    assert inplace
+    gen_metrics_file = True
+    input_file = settings.models_dir / f"{input_model}.seal5model"
+    assert input_file.is_file(), f"File not found: {input_file}"
+    name = input_file.name
+    logger.info("Analyzing behavior for %s", name)
+    from seal5.transform.analyze_behavior.analyses import ANALYSIS_NAMES
+
+    if analyses is None:
+        analyses = ANALYSIS_NAMES
+    args = [
+        settings.models_dir / name,
+        "--log",
+        log_level if not verbose else "debug",
+        "--analyses",
+        *analyses,
+    ]
+    if gen_metrics_file:
+        # TODO: move to .seal5/metrics
+        metrics_prefix = settings.temp_dir / name
+        args.extend(["--metrics", metrics_prefix])
+    if not use_subprocess:
+        from seal5.transform.analyze_behavior import AnalyzeBehavior
+
+        args = sanitize_args(args)
+        AnalyzeBehavior(args)
+    else:
+        python(
+            "-m",
+            "seal5.transform.analyze_behavior.collect",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
+    metrics = {}
+    if gen_metrics_file:
+        # One entry per analysis, reported like individual passes
+        metrics = {
+            "passes": [
+                {analysis: read_metrics(settings.temp_dir / (name + f"_{analysis}_metrics.csv"))}
+                for analysis in analyses
+            ]
+        }
+    return PassResult(metrics=metrics)
+
+
+def analyze_behavior_instr(
+    instr_defs,
+    set_def,
+    settings: Optional[Seal5Settings] = None,
+    verbose: bool = False,
+    log_level: str = "warning",
+    analyses: Optional[List[str]] = None,
+    **_kwargs,
+):
+    del settings  # unused
+    from seal5.transform.analyze_behavior import collect
+    from seal5.transform.analyze_behavior.analyses import ANALYSIS_NAMES
+
+    collect.logger.setLevel(getattr(logging, (log_level if not verbose else "debug").upper()))
+    if analyses is None:
+        analyses = ANALYSIS_NAMES
+    all_metrics = {
+        analysis: {
+            "n_instructions": 0,
+            "n_skipped": 0,
+            "n_failed": 0,
+            "n_success": 0,
+            "skipped_instructions": [],
+            "failed_instructions": [],
+            "success_instructions": [],
+        }
+        for analysis in ANALYSIS_NAMES
+        if analysis in analyses
+    }
+    for instr_def in instr_defs:
+        errors = collect.process_instr(instr_def, set_def, analyses=analyses)
+        for analysis, error in errors.items():
+            metrics = all_metrics[analysis]
+            metrics["n_instructions"] += 1
+            if error is None:
+                metrics["n_success"] += 1
+                metrics["success_instructions"].append(instr_def.name)
+            else:
+                collect.logger.exception(error, exc_info=error)
+                metrics["n_failed"] += 1
+                metrics["failed_instructions"].append(instr_def.name)
+    return PassResult(metrics={"passes": [{analysis: metrics} for analysis, metrics in all_metrics.items()]})
+
+
 def annotate_opcodes(
     input_model: str,
     settings: Optional[Seal5Settings] = None,
@@ -2009,7 +2417,7 @@ def annotate_opcodes(
         args = sanitize_args(args)
         AnnotateOpcodes(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.annotate_opcodes.annotate",
             *args,
@@ -2054,7 +2462,7 @@ def check_pattern_support(
         args = sanitize_args(args)
         CheckPatternSupport(args)
     else:
-        utils.python(
+        python(
             "-m",
             "seal5.transform.check_pattern_support.check",
             *args,
@@ -2073,6 +2481,7 @@ def gen_riscv_field_types_patch(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     log_level: str = "warning",
     **_kwargs,
 ):
@@ -2102,14 +2511,20 @@ def gen_riscv_field_types_patch(
     if gen_index_file:
         index_file = out_dir / ("riscv_field_types_index.yml")
         args.extend(["--index", index_file])
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_field_types.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_field_types import RISCVFieldTypesBackend
+
+        args = sanitize_args(args)
+        RISCVFieldTypesBackend(args, settings=settings)
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_field_types.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             patch_name = "riscv_field_types"
@@ -2122,7 +2537,6 @@ def gen_riscv_field_types_patch(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
@@ -2136,6 +2550,7 @@ def gen_riscv_disass_patch(
     settings: Optional[Seal5Settings] = None,
     env: Optional[dict] = None,
     verbose: bool = False,
+    use_subprocess: bool = False,
     split: bool = False,
     log_level: str = "warning",
     gen_tests: bool = True,
@@ -2170,14 +2585,20 @@ def gen_riscv_disass_patch(
         args.extend(["--index", index_file])
     if gen_tests:
         args.append("--generate-tests")
-    utils.python(
-        "-m",
-        "seal5.backends.riscv_disass.writer",
-        *args,
-        env=env,
-        print_func=logger.info if verbose else logger.debug,
-        live=verbose,
-    )
+    if not use_subprocess:
+        from seal5.backends.riscv_disass import RISCVDisassBackend
+
+        args = sanitize_args(args)
+        RISCVDisassBackend(args, model_obj=load_model(input_file))
+    else:
+        python(
+            "-m",
+            "seal5.backends.riscv_disass.writer",
+            *args,
+            env=env,
+            print_func=logger.info if verbose else logger.debug,
+            live=verbose,
+        )
     if gen_index_file:
         if index_file.is_file():
             comment = f"Generated RISCVDisassembler.cpp patch for {input_file.name}"
@@ -2193,7 +2614,6 @@ def gen_riscv_disass_patch(
                 target="llvm",
             )
             settings.add_patch(patch_settings)
-            settings.to_yaml_file(settings.settings_file)
         else:
             logger.warning("No patches found!")
     metrics = {}
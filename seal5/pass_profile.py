@@ -0,0 +1,200 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""CPU and memory profiling of Seal5 passes."""
+
+import io
+import os
+import json
+import time
+import pstats
+import cProfile
+import resource
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Optional, List
+
+from seal5.logging import Logger
+
+logger = Logger("pass_profile")
+
+# Number of functions reported as hotspots
+PROFILE_TOP = int(os.environ.get("SEAL5_PROFILE_TOP", 10))
+# Interval for sampling the resident set size (s)
+PROFILE_RSS_INTERVAL = float(os.environ.get("SEAL5_PROFILE_RSS_INTERVAL", 0.05))
+
+
+# Profilers which are currently tracking memory allocations
+_ACTIVE: List["PassProfiler"] = []
+_STARTED_TRACEMALLOC = False
+_LOCK = threading.Lock()
+
+
+def get_profiles_dir(settings):
+    return settings.logs_dir / "profiles"
+
+
+def get_rss():
+    """Current resident set size in bytes."""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Linux reports KB, macOS reports bytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_child_cpu_time():
+    """CPU time of terminated child processes (i.e. subprocess handlers)."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class RSSSampler(threading.Thread):
+    def __init__(self, interval: float = PROFILE_RSS_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.max_rss = get_rss()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.max_rss = max(self.max_rss, get_rss())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.max_rss = max(self.max_rss, get_rss())
+
+
+def update_peaks():
+    """Propagate peak of traced memory to all active profilers (before the peak is reset)."""
+    _, peak = tracemalloc.get_traced_memory()
+    for profiler in _ACTIVE:
+        profiler.peak = max(profiler.peak, peak)
+
+
+def start_memory_tracking(profiler: "PassProfiler"):
+    global _STARTED_TRACEMALLOC
+    with _LOCK:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _STARTED_TRACEMALLOC = True
+        update_peaks()
+        tracemalloc.reset_peak()
+        profiler.peak = tracemalloc.get_traced_memory()[0]
+        _ACTIVE.append(profiler)
+
+
+def stop_memory_tracking(profiler: "PassProfiler"):
+    global _STARTED_TRACEMALLOC
+    with _LOCK:
+        update_peaks()
+        _ACTIVE.remove(profiler)
+        if len(_ACTIVE) == 0 and _STARTED_TRACEMALLOC:
+            tracemalloc.stop()
+            _STARTED_TRACEMALLOC = False
+
+
+def format_hotspots(stats: pstats.Stats, top: int = PROFILE_TOP):
+    """Functions with the highest internal time: ['file:line(func) 1.234s', ...]."""
+    ret = []
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+    for (filename, line, func), (_, _, tottime, _, _) in entries[:top]:
+        ret.append(f"{Path(filename).name}:{line}({func}) {tottime:.3f}s")
+    return ret
+
+
+class PassProfiler:
+    """Collects CPU time, memory usage and hotspots while a pass is running.
+
+    Handlers are profiled individually via wrap() as they might be called from worker threads (cProfile only
+    covers the calling thread). Memory peaks are tracked process-wide, i.e. they also include concurrently
+    running passes. Worker processes of the pass manager are not covered.
+    """
+
+    def __init__(self, name: str, directory: Optional[Path] = None, top: int = PROFILE_TOP):
+        self.name = name
+        self.directory = directory
+        self.top = top
+        self.profiles: List[cProfile.Profile] = []
+        self.lock = threading.Lock()
+        self.sampler: Optional[RSSSampler] = None
+        self.peak = 0
+        self.start_cpu = None
+        self.start_child_cpu = None
+        self.metrics: dict = {}
+
+    def __enter__(self):
+        start_memory_tracking(self)
+        self.sampler = RSSSampler()
+        self.sampler.start()
+        self.start_cpu = time.process_time()
+        self.start_child_cpu = get_child_cpu_time()
+        return self
+
+    def __exit__(self, *_exc):
+        cpu_s = time.process_time() - self.start_cpu
+        child_cpu_s = get_child_cpu_time() - self.start_child_cpu
+        stop_memory_tracking(self)
+        self.sampler.stop()
+        self.metrics = {
+            "cpu_s": cpu_s,
+            "child_cpu_s": child_cpu_s,
+            "peak_mem_mb": self.peak / 1e6,
+            "max_rss_mb": self.sampler.max_rss / 1e6,
+        }
+        stats = self.get_stats()
+        if stats is not None:
+            self.metrics["hotspots"] = format_hotspots(stats, top=self.top)
+        if self.directory is not None:
+            self.write(stats)
+
+    def wrap(self, handler):
+        def wrapper(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active in this thread
+                return handler(*args, **kwargs)
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self.lock:
+                    self.profiles.append(profile)
+
+        return wrapper
+
+    def get_stats(self):
+        with self.lock:
+            if len(self.profiles) == 0:
+                return None
+            stats = pstats.Stats(self.profiles[0], stream=io.StringIO())
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+        return stats
+
+    def write(self, stats: Optional[pstats.Stats]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if stats is not None:
+            stats.dump_stats(self.directory / f"{self.name}.prof")
+        with open(self.directory / f"{self.name}.json", "w", encoding="utf-8") as f:
+            json.dump(self.metrics, f, indent=2)
@@ -0,0 +1,227 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Persisted state of Seal5 pass managers for resuming failed flows."""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from dataclasses import asdict
+from typing import Optional, List, Dict, Set
+
+import yaml
+
+from seal5.logging import Logger
+from seal5.settings import PatchSettings
+from seal5.version import __version__
+
+logger = Logger("pass_state")
+
+MODEL_SUFFIXES = [".m2isarmodel", ".seal5model"]
+
+
+def get_pass_state_file(settings, name: str):
+    return settings.temp_dir / f"{name}_state.yml"
+
+
+def hash_data(data):
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def get_models_digest(settings, input_models: List[str]):
+    """Digest of the model files on disk.
+
+    Computed after every pass, so it is based on size and modification time instead of the (large) contents.
+    """
+    data = {}
+    for input_model in input_models:
+        for suffix in MODEL_SUFFIXES:
+            model_file = settings.models_dir / f"{input_model}{suffix}"
+            try:
+                st = model_file.stat()
+            except FileNotFoundError:
+                continue
+            data[model_file.name] = [st.st_size, st.st_mtime_ns]
+    return hash_data(data)
+
+
+def get_settings_digest(settings):
+    """Digest of the settings, ignoring the collected metrics and the patches added by passes."""
+    data = asdict(settings)
+    data.pop("metrics", None)
+    data.pop("patches", None)
+    return hash_data(data)
+
+
+def get_options_digest(pass_):
+    options = {**(pass_.options if pass_.options is not None else {}), **pass_.filter_options}
+    return hash_data({"options": options, "version": __version__})
+
+
+class PassState:
+    """Status of the passes of a (top-level) pass manager, persisted in a YAML file after every change.
+
+    A pass is only reported as COMPLETED once its changes to the models were written to disk. Together with the
+    digests of models and settings at that point, this allows to skip completed passes if the flow is resumed.
+    """
+
+    def __init__(self, path: Path, pass_list: list, input_models: List[str]):
+        self.path = Path(path)
+        self.input_models = input_models
+        self.entries = [
+            {"name": pass_.name, "status": "CREATED", "options": get_options_digest(pass_)} for pass_ in pass_list
+        ]
+        self.models_digest: Optional[str] = None
+        self.settings_digest: Optional[str] = None
+        self.unsynced: List[int] = []
+        self.lock = threading.RLock()
+
+    def to_dict(self):
+        return {
+            "models": self.input_models,
+            "models_digest": self.models_digest,
+            "settings_digest": self.settings_digest,
+            "passes": self.entries,
+        }
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.parent / f"{self.path.name}.tmp{os.getpid()}"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                yaml.dump(self.to_dict(), f)
+            tmp_file.replace(self.path)
+
+    def load_previous(self):
+        if not self.path.is_file():
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f)
+
+    def init(self, settings):
+        """Digests at the start of the run."""
+        with self.lock:
+            self.models_digest = get_models_digest(settings, self.input_models)
+            self.settings_digest = get_settings_digest(settings)
+
+    def resume(self, settings, deps: Dict[int, Set[int]]):
+        """Lookup passes completed by the previous run which do not need to run again.
+
+        Requires models and settings to be unchanged since the previous run. Passes are only resumed if their
+        options did not change, all passes they depend on are resumed as well and the files of the patches they
+        added still exist.
+        """
+        prev = self.load_previous()
+        resumed = {}
+        if prev is None:
+            logger.info("No previous state found, running all passes")
+            return resumed
+        if prev.get("models") != self.input_models:
+            logger.info("Models changed since previous run, running all passes")
+            return resumed
+        if prev.get("models_digest") != self.models_digest or prev.get("settings_digest") != self.settings_digest:
+            logger.info("Models or settings changed since previous run, running all passes")
+            return resumed
+        prev_entries = prev.get("passes", [])
+        for i, entry in enumerate(self.entries):
+            if i >= len(prev_entries):
+                break
+            prev_entry = prev_entries[i]
+            if prev_entry.get("name") != entry["name"] or prev_entry.get("options") != entry["options"]:
+                continue
+            if prev_entry.get("status") != "COMPLETED":
+                continue
+            if not deps[i].issubset(resumed.keys()):
+                continue
+            if not all(check_patch_files(data) for data in prev_entry.get("patches", [])):
+                logger.info("Files of patches added by pass %s are missing, running it again", entry["name"])
+                continue
+            resumed[i] = prev_entry
+            self.entries[i] = prev_entry
+        return resumed
+
+    def update(self, i: int, status: str, **kwargs):
+        with self.lock:
+            self.entries[i].update({"status": status, **kwargs})
+            self.save()
+
+    def completed(self, i: int, metrics: Optional[dict], patches: List[PatchSettings], synced: bool, settings):
+        """Record completed pass (reported as COMPLETED once synced)."""
+        with self.lock:
+            self.entries[i].update(
+                {
+                    "end": time.time(),
+                    "inputs": self.models_digest,
+                    "metrics": metrics,
+                    "patches": [asdict(patch_settings) for patch_settings in patches],
+                }
+            )
+            self.unsynced.append(i)
+            if synced:
+                self.sync(settings)
+
+    def sync(self, settings):
+        """Models were written to disk."""
+        with self.lock:
+            self.models_digest = get_models_digest(settings, self.input_models)
+            self.settings_digest = get_settings_digest(settings)
+            for i in self.unsynced:
+                self.entries[i].update({"status": "COMPLETED", "outputs": self.models_digest})
+            self.unsynced = []
+            self.save()
+
+    def failed(self, pass_list: list):
+        """Record failed passes. Results of passes which were not synced yet are lost."""
+        with self.lock:
+            for i, pass_ in enumerate(pass_list):
+                if pass_.status.name == "FAILED":
+                    self.entries[i].update({"status": "FAILED", "end": time.time()})
+            for i in self.unsynced:
+                self.entries[i]["status"] = "CREATED"
+            self.unsynced = []
+            self.save()
+
+
+def check_patch_files(data: dict):
+    """Check that the index of a recorded patch and the source files of its artifacts still exist."""
+    index = data.get("index")
+    if index is None:
+        return True
+    index = Path(index)
+    if not index.is_file():
+        return False
+    with open(index, "r", encoding="utf-8") as f:
+        index_data = yaml.safe_load(f) or {}
+    artifacts = list(index_data.get("artifacts") or [])
+    for ext_data in index_data.get("extensions") or []:
+        artifacts.extend(ext_data.get("artifacts") or [])
+    for artifact in artifacts:
+        src_path = artifact.get("src_path")
+        if src_path is not None and not Path(src_path).exists():
+            return False
+    return True
+
+
+def get_resumed_patches(settings, entry: dict):
+    """Lookup patches added by a resumed pass (unless already contained in the settings)."""
+    names = {patch_settings.name for patch_settings in settings.patches}
+    return [PatchSettings.from_dict(data) for data in entry.get("patches", []) if data["name"] not in names]
@@ -1,15 +1,33 @@
+import io
 import os
+import copy
+import math
 import time
+import pickle
+from contextlib import nullcontext
 
 # import multiprocessing
 from pathlib import Path
 from enum import Enum, IntFlag, auto
 from dataclasses import dataclass
-from typing import Callable, Optional, List
-from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, List, Tuple, Union, Dict, Set
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 from seal5.logging import Logger
 from seal5.settings import Seal5Settings, PassesSettings
+from seal5.model_utils import (
+    ModelSession,
+    load_model,
+    dump_model,
+    get_model_session,
+    reset_model_session,
+    sync_model_session,
+)
+from seal5.pass_cache import PassCache, get_pass_cache_dir, run_cached
+from seal5.pass_state import PassState, get_pass_state_file, get_resumed_patches
+from seal5.pass_profile import PassProfiler, get_profiles_dir
+from seal5.metrics import read_metrics, write_metrics
+from seal5.utils import str2bool
 
 logger = Logger("passes")
 
@@ -17,6 +35,28 @@ logger = Logger("passes")
 # DEFAULT_NUM_THREADS = multiprocessing.cpu_count()
 DEFAULT_NUM_THREADS = 1
 NUM_THREADS = int(os.environ.get("SEAL5_NUM_THREADS", DEFAULT_NUM_THREADS))
+# Keep models in memory between passes instead of loading/dumping them for every pass
+MODEL_SESSION = str2bool(os.environ.get("SEAL5_MODEL_SESSION", False))
+# Write back in-memory models every N passes (0: only after the last pass)
+MODEL_CHECKPOINT = int(os.environ.get("SEAL5_MODEL_CHECKPOINT", 0))
+# Reuse results of cacheable passes from previous runs
+PASS_CACHE = str2bool(os.environ.get("SEAL5_PASS_CACHE", False))
+# Skip passes completed by the previous (failed) run if models and settings are unchanged
+RESUME = str2bool(os.environ.get("SEAL5_RESUME", False))
+# Record CPU time, memory usage and hotspots of passes (written to .seal5/logs/profiles)
+PROFILE = str2bool(os.environ.get("SEAL5_PROFILE", False))
+# Run MODEL/SET scoped pass handlers in worker threads or processes (thread, process)
+PASS_EXECUTOR = os.environ.get("SEAL5_PASS_EXECUTOR", "thread")
+# Order in which passes are executed: list (one after another) or dag (independent passes run concurrently)
+PASS_SCHEDULE = os.environ.get("SEAL5_PASS_SCHEDULE", "list")
+# Max. number of concurrently running passes with dag schedule (0: SEAL5_NUM_THREADS)
+PASS_WORKERS = int(os.environ.get("SEAL5_PASS_WORKERS", 0))
+# Run per-instruction transforms with PassScope.INSTR (instructions are distributed over SEAL5_NUM_THREADS processes)
+INSTR_SCOPE = str2bool(os.environ.get("SEAL5_INSTR_SCOPE", False))
+# Number of instruction chunks per worker process (smaller chunks balance better, larger ones pickle less)
+INSTR_CHUNKS_PER_WORKER = int(os.environ.get("SEAL5_INSTR_CHUNKS_PER_WORKER", 4))
+# Smaller sets are processed in the main process (worker startup and pickling would dominate)
+INSTR_PARALLEL_MIN = int(os.environ.get("SEAL5_INSTR_PARALLEL_MIN", 64))
 
 
 class PassFormat(IntFlag):
@@ -46,8 +86,13 @@ class PassStatus(Enum):
 class PassScope(Enum):
     GLOBAL = auto()
     MODEL = auto()
-    SET = auto()  # not supported yet
-    INSTR = auto()  # not supported yet
+    SET = auto()
+    INSTR = auto()
+
+
+class PassExecutor(Enum):
+    THREAD = auto()
+    PROCESS = auto()
 
 
 @dataclass
@@ -66,8 +111,142 @@ def check_filter(name, skip, only):
     return False
 
 
+# Set-level containers whose items are referenced by instructions (i.e. memories in the behavior)
+SHARED_SET_ATTRS = [
+    "constants",
+    "memories",
+    "memory_aliases",
+    "functions",
+    "registers",
+    "register_groups",
+    "intrinsics",
+    "aliases",
+    "constraints",
+]
+
+
+def get_shared_objects(set_def):
+    """Lookup objects of an instruction set which must not be copied alongside the instructions."""
+    ret = {("set",): set_def}
+    for attr in SHARED_SET_ATTRS:
+        container = getattr(set_def, attr, None)
+        if not isinstance(container, dict):
+            continue
+        for key, val in container.items():
+            ret[(attr, key)] = val
+    return ret
+
+
+class SharedPickler(pickle.Pickler):
+    """Pickler which stores references to shared objects instead of copies."""
+
+    def __init__(self, file, shared_ids):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = shared_ids
+
+    def persistent_id(self, obj):
+        return self.shared_ids.get(id(obj))
+
+
+class SharedUnpickler(pickle.Unpickler):
+    """Unpickler which resolves references to shared objects."""
+
+    def __init__(self, file, shared):
+        super().__init__(file)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        return self.shared[pid]
+
+
+def dumps_shared(obj, shared):
+    shared_ids = {id(val): key for key, val in shared.items()}
+    f = io.BytesIO()
+    SharedPickler(f, shared_ids).dump(obj)
+    return f.getvalue()
+
+
+def loads_shared(data, shared):
+    return SharedUnpickler(io.BytesIO(data), shared).load()
+
+
+def run_instr_chunk(handler, set_data, instrs_data, settings, kwargs):
+    """Worker: apply per-instruction handler to a chunk of instructions.
+
+    Only the instructions are sent back, changes to set-level objects can not be merged. Returns None instead if
+    the handler modified any of them.
+    """
+    set_stub, shared = pickle.loads(set_data)
+    before = pickle.dumps((set_stub, shared), protocol=pickle.HIGHEST_PROTOCOL)
+    shared[("set",)] = set_stub
+    instrs = loads_shared(instrs_data, shared)
+    result = handler(instrs, set_stub, settings=settings, **kwargs)
+    del shared[("set",)]
+    if pickle.dumps((set_stub, shared), protocol=pickle.HIGHEST_PROTOCOL) != before:
+        return None
+    shared[("set",)] = set_stub
+    return dumps_shared(instrs, shared), result
+
+
+def init_worker():
+    reset_model_session()
+
+
+def run_in_process(handler, *args, settings: Optional[Seal5Settings] = None, **kwargs):
+    """Worker: run pass handler on a snapshot of the settings.
+
+    Patches added by the handler are returned alongside the result, as changes to the settings are otherwise lost.
+    """
+    known = {id(patch_settings) for patch_settings in settings.patches}
+    result = handler(*args, settings=settings, **kwargs)
+    patches = [patch_settings for patch_settings in settings.patches if id(patch_settings) not in known]
+    return result, patches
+
+
+def merge_metrics(dest: dict, src: dict):
+    """Accumulate metrics of a chunk of instructions."""
+    for key, val in src.items():
+        if key == "passes":
+            # Nested metrics of fused passes: [{name: metrics}, ...]
+            merged = dict(item for pass_metrics in dest.get(key, []) for item in pass_metrics.items())
+            for pass_metrics in val:
+                for name, metrics in pass_metrics.items():
+                    merge_metrics(merged.setdefault(name, {}), metrics)
+            dest[key] = [{name: metrics} for name, metrics in merged.items()]
+        elif isinstance(val, list):
+            dest[key] = dest.get(key, []) + val
+        elif isinstance(val, (int, float)) and not isinstance(val, bool):
+            dest[key] = dest.get(key, 0) + val
+        else:
+            dest[key] = val
+
+
+def write_instr_metrics(input_model: str, name: str, n_sets: int, metrics: dict, settings: Seal5Settings):
+    """Write accumulated instruction metrics like the model-level transforms and return them as read back."""
+    # TODO: move to .seal5/metrics
+    metrics_file = settings.temp_dir / f"{input_model}.seal5model_{name}_metrics.csv"
+    write_metrics(metrics_file, {"n_sets": n_sets, **metrics})
+    return read_metrics(metrics_file)
+
+
 class Seal5Pass:
-    def __init__(self, name, pass_type, pass_scope, handler, fmt=PassFormat.NONE, order=-1, options=None):
+    def __init__(
+        self,
+        name,
+        pass_type,
+        pass_scope,
+        handler,
+        fmt=PassFormat.NONE,
+        order=-1,
+        options=None,
+        cache_io=None,
+        executor=None,
+        reads=None,
+        writes=None,
+        aliases=None,
+        alias_option=None,
+        model_handler=None,
+    ):
         self.name: str = name
         self.pass_type: PassType = pass_type
         self.pass_scope: PassScope = pass_scope
@@ -77,10 +256,59 @@ class Seal5Pass:
         self.order: int = order  # not supported yet
         self.options: Optional[dict] = options
         self.metrics: dict = {}
+        # (input suffix, output suffix) of model files if the pass result only depends on model and options
+        self.cache_io: Optional[Tuple[str, str]] = cache_io
+        # Executor for MODEL/SET scoped handlers (default: SEAL5_PASS_EXECUTOR, can be overridden via pass options)
+        self.executor: Optional[Union[str, PassExecutor]] = executor
+        # Resources (i.e. "model", "settings", "patch:riscv_features") accessed by the pass, used for dag schedule.
+        # Undefined: pass might access anything and is never run concurrently with other passes
+        self.reads: Optional[List[str]] = reads
+        self.writes: Optional[List[str]] = writes
+        # Names of former passes which are now parts of this pass. They are still accepted in skip/only/overrides
+        # and select the parts to run via the given (list) option.
+        self.aliases: Optional[List[str]] = aliases
+        self.alias_option: Optional[str] = alias_option
+        # Options resulting from skip/only of the pass manager
+        self.filter_options: dict = {}
+        # PassScope.INSTR: model-level handler used if the instructions can not be processed individually
+        self.model_handler: Optional[Callable] = model_handler
 
     def __repr__(self):
         return f"Seal5Pass({self.name}, {self.pass_type}, {self.pass_scope})"
 
+    def conflicts_with(self, other: "Seal5Pass"):
+        """Check if passes need to be run in order."""
+        if self.reads is None or self.writes is None or other.reads is None or other.writes is None:
+            return True
+        accesses = set(self.reads) | set(self.writes)
+        other_accesses = set(other.reads) | set(other.writes)
+        return len(set(self.writes) & other_accesses) > 0 or len(set(other.writes) & accesses) > 0
+
+    def apply_filter(self, options: dict, skip, only, overrides=None):
+        """Apply skip/only/overrides of the pass settings to the options of the pass (None: pass is skipped)."""
+        if skip is None:
+            skip = []
+        if only is None:
+            only = []
+        options = {**options}
+        if self.aliases:
+            parts = options.get(self.alias_option)
+            if parts is None:
+                parts = list(self.aliases)
+            if len(only) > 0 and self.name not in only:
+                parts = [part for part in parts if part in only]
+            parts = [part for part in parts if part not in skip]
+            if self.name in skip or len(parts) == 0:
+                return None
+            if parts != self.aliases:
+                options[self.alias_option] = parts
+        elif check_filter(self.name, skip, only):
+            return None
+        if overrides:
+            for name in [*(self.aliases or []), self.name]:
+                options.update(overrides.get(name) or {})
+        return options
+
     @property
     def is_pending(self):
         return self.status in [PassStatus.CREATED, PassStatus.SKIPPED]
@@ -88,6 +316,109 @@ class Seal5Pass:
     def skip(self):
         self.status = PassStatus.SKIPPED
 
+    def get_executor(self, override: Optional[Union[str, PassExecutor]] = None):
+        executor = override if override is not None else self.executor
+        if executor is None:
+            executor = PASS_EXECUTOR
+        if isinstance(executor, str):
+            executor = PassExecutor[executor.upper()]
+        return executor
+
+    def get_handler(self, override: Optional[Union[str, PassExecutor]] = None, parent=None):
+        if parent is None or self.get_executor(override) == PassExecutor.THREAD:
+            return self.handler
+        return self.call_in_process
+
+    def call_in_process(self, *args, settings: Optional[Seal5Settings] = None, parent=None, **kwargs):
+        """Run handler in a worker process of the pass manager and apply added patches to the settings."""
+        # Workers read the model files
+        sync_model_session()
+        future = parent.get_process_pool().submit(run_in_process, self.handler, *args, settings=settings, **kwargs)
+        result, patches = future.result()
+        for patch_settings in patches:
+            settings.add_patch(patch_settings)
+        return result
+
+    def run_instrs(self, input_model: str, settings: Optional[Seal5Settings] = None, parent=None, **kwargs):
+        """Apply per-instruction handler to all instructions of a model (PassScope.INSTR).
+
+        The handler is called with the instructions of a set (or a chunk of them). With parallel > 1, the
+        instructions of every set are split into chunks which are processed by a pool of worker processes.
+        Instructions are transferred without the set-level objects they reference (memories, functions,...), which
+        are linked back to the objects of the original model afterwards. Sets for which the handler modified such
+        objects are processed again in the main process. Metrics are written to the same files as the model-level
+        transforms ({model}.seal5model_{pass}_metrics.csv). With use_subprocess, the model-level handler is used.
+        """
+        if kwargs.get("use_subprocess", False):
+            assert self.model_handler is not None, f"Pass {self.name} has no model-level handler"
+            return self.model_handler(input_model, settings=settings, parent=parent, **kwargs)
+        parallel = parent.parallel if parent else 1
+        model_file = settings.models_dir / f"{input_model}.seal5model"
+        model_obj = load_model(model_file)
+        metrics = {}
+        for set_def in model_obj.sets.values():
+            instrs = list(set_def.instructions.items())
+            results = None
+            pass
+            if parallel > 1 and len(instrs) >= max(INSTR_PARALLEL_MIN, 2):
+                results = self.run_instr_chunks(set_def, instrs, parallel, parent, settings=settings, **kwargs)
+                if results is None:
+                    logger.warning(
+                        "Pass %s modifies set-level objects of set %s, processing it in the main process",
+                        self.name,
+                        set_def.name,
+                    )
+            if results is None:
+                results = [self.handler([instr_def for _, instr_def in instrs], set_def, settings=settings, **kwargs)]
+            for result in results:
+                if result and result.metrics:
+                    merge_metrics(metrics, result.metrics)
+        dump_model(model_obj, model_file)
+        if not metrics:
+            return PassResult(metrics={})
+        n_sets = len(model_obj.sets)
+        if "passes" in metrics:
+            metrics["passes"] = [
+                {name: write_instr_metrics(input_model, name, n_sets, metrics_, settings)}
+                for pass_metrics in metrics["passes"]
+                for name, metrics_ in pass_metrics.items()
+            ]
+        else:
+            metrics = write_instr_metrics(input_model, self.name, n_sets, metrics, settings)
+        return PassResult(metrics=metrics)
+
+    def run_instr_chunks(self, set_def, instrs, parallel, parent, settings: Optional[Seal5Settings] = None, **kwargs):
+        """Process the instructions of a set in worker processes (None: set-level objects were modified)."""
+        executor = parent.get_process_pool()
+        shared = get_shared_objects(set_def)
+        set_stub = copy.copy(set_def)
+        set_stub.instructions = {}
+        shared_ = {key: val for key, val in shared.items() if key != ("set",)}
+        set_data = pickle.dumps((set_stub, shared_), protocol=pickle.HIGHEST_PROTOCOL)
+        chunk_size = math.ceil(len(instrs) / (parallel * INSTR_CHUNKS_PER_WORKER))
+        chunks = [instrs[i : i + chunk_size] for i in range(0, len(instrs), chunk_size)]
+        futures = [
+            executor.submit(
+                run_instr_chunk,
+                self.handler,
+                set_data,
+                dumps_shared([instr_def for _, instr_def in chunk], shared),
+                settings,
+                kwargs,
+            )
+            for chunk in chunks
+        ]
+        outputs = [future.result() for future in futures]
+        if any(output is None for output in outputs):
+            return None
+        results = []
+        for chunk, (instrs_data, result) in zip(chunks, outputs):
+            new_instrs = loads_shared(instrs_data, shared)
+            for (key, _), instr_def in zip(chunk, new_instrs):
+                set_def.instructions[key] = instr_def
+            results.append(result)
+        return results
+
     def run(self, inputs: List[str], *_args, settings: Optional[Seal5Settings] = None, **kwargs):
         logger.debug("Running pass: %s", self)
         self.status = PassStatus.RUNNING
@@ -99,119 +430,150 @@ class Seal5Pass:
             kwargs_ = {**kwargs}
             if self.options:
                 kwargs_.update(self.options)
+            kwargs_.update(self.filter_options)
             start = time.time()
             parent = kwargs.get("parent", None)
             if parent:
                 parallel = parent.parallel
+                cache = parent.cache if self.cache_io is not None else None
+                profiler = parent.get_profiler(self.name, settings)
             else:
                 parallel = 1
-            if self.pass_scope == PassScope.SET:
-                with ThreadPoolExecutor(max_workers=parallel) as executor:
-                    futures = []
-                    # passes_settings_ = dataclasses.replace(passes_settings)
-                    passes_settings_ = PassesSettings(
-                        skip=[*passes_settings.skip],
-                        only=[*passes_settings.only],
-                        overrides=[*passes_settings.overrides],
-                    )
-                    for key, val in passes_settings_.overrides.items():
-                        passes_settings_.overrides[key] = {**val}
-                    for input_model in inputs:
-                        model_settings = settings.models[input_model]
-                        model_passes_settings = model_settings.passes
-                        if model_passes_settings is not None:
-                            passes_settings_ = passes_settings_.merge(model_passes_settings)
-                        if check_filter(self.name, passes_settings_.skip, passes_settings_.only):
-                            logger.info("Skipped pass %s for model %s", self.name, input_model)
-                            continue
-                        # passes_settings__ = dataclasses.replace(passes_settings_)
-                        # FIX
-                        passes_settings__ = PassesSettings(
-                            skip=[*passes_settings_.skip],
-                            only=[*passes_settings_.only],
-                            overrides={**passes_settings_.overrides},
-                        )
-                        for key, val in passes_settings__.overrides.items():
-                            passes_settings__.overrides[key] = {**val}
-                        for ext_name, ext_settings in model_settings.extensions.items():
-                            ext_passes_settings = model_settings.passes
-                            if ext_passes_settings is not None:
-                                passes_settings__.overrides = {**passes_settings__.overrides}
-                                passes_settings__ = passes_settings__.merge(ext_passes_settings)
-                            if check_filter(self.name, passes_settings__.skip, passes_settings__.only):
-                                logger.info("Skipped pass %s for extension %s", self.name, ext_name)
-                                continue
-                            kwargs__ = kwargs_.copy()
-                            if passes_settings__.overrides:
-                                overrides = passes_settings__.overrides.get(self.name)
-                                if overrides:
-                                    kwargs__.update(overrides)
-                            future = executor.submit(self.handler, input_model, ext_name, settings=settings, **kwargs__)
-                            futures.append(future)
-                    results = []
-                    for i, future in enumerate(futures):
-                        result = future.result()
-                        input_model = inputs[i]
-                        if result:
-                            metrics = result.metrics
-                            if metrics:
-                                self.metrics["models"].append({input_model: metrics})
-                        results.append(result)
-                    # TODO: check results (metrics?)
-            elif self.pass_scope == PassScope.MODEL:
-
-                with ThreadPoolExecutor(max_workers=parallel) as executor:
-                    futures = []
-                    for input_model in inputs:
+                cache = None
+                profiler = None
+            wrap = profiler.wrap if profiler is not None else (lambda handler: handler)
+            with profiler if profiler is not None else nullcontext():
+                if self.pass_scope == PassScope.SET:
+                    with ThreadPoolExecutor(max_workers=parallel) as executor:
+                        futures = []
                         # passes_settings_ = dataclasses.replace(passes_settings)
-                        # FIX
                         passes_settings_ = PassesSettings(
                             skip=[*passes_settings.skip],
                             only=[*passes_settings.only],
-                            overrides={**passes_settings.overrides},
+                            overrides=[*passes_settings.overrides],
                         )
                         for key, val in passes_settings_.overrides.items():
                             passes_settings_.overrides[key] = {**val}
-                            model_settings = settings.models.get(input_model)
-                        model_passes_settings = model_settings.passes if model_settings is not None else None
-                        kwargs__ = kwargs_.copy()
-                        if model_passes_settings is not None:
-                            passes_settings_.overrides = {**passes_settings_.overrides}
-                            passes_settings_ = passes_settings_.merge(model_passes_settings)
-                        if check_filter(self.name, passes_settings_.skip, passes_settings_.only):
-                            logger.info("Skipped pass %s for model %s", self.name, input_model)
-                            continue
-                        if passes_settings_.overrides:
-                            overrides = passes_settings_.overrides.get(self.name)
-                            if overrides:
-                                kwargs__.update(overrides)
-                        future = executor.submit(self.handler, input_model, settings=settings, **kwargs__)
-                        futures.append(future)
-                    results = []
-                    for i, future in enumerate(futures):
-                        result = future.result()
-                        input_model = inputs[i]
-                        if result:
-                            metrics = result.metrics
-                            if metrics:
-                                self.metrics["models"].append({input_model: metrics})
-                        results.append(result)
-                    # TODO: check results (metrics?)
-            elif self.pass_scope == PassScope.GLOBAL:
-                input_model = None
-                result = self.handler(input_model, settings=settings, **kwargs_)
-                if result:
-                    metrics = result.metrics
-                    if metrics:
-                        self.metrics["models"].append({input_model: metrics})
-            else:
-                raise NotImplementedError
+                        for input_model in inputs:
+                            model_settings = settings.models[input_model]
+                            model_passes_settings = model_settings.passes
+                            if model_passes_settings is not None:
+                                passes_settings_ = passes_settings_.merge(model_passes_settings)
+                            if self.apply_filter(kwargs_, passes_settings_.skip, passes_settings_.only) is None:
+                                logger.info("Skipped pass %s for model %s", self.name, input_model)
+                                continue
+                            # passes_settings__ = dataclasses.replace(passes_settings_)
+                            # FIX
+                            passes_settings__ = PassesSettings(
+                                skip=[*passes_settings_.skip],
+                                only=[*passes_settings_.only],
+                                overrides={**passes_settings_.overrides},
+                            )
+                            for key, val in passes_settings__.overrides.items():
+                                passes_settings__.overrides[key] = {**val}
+                            for ext_name, ext_settings in model_settings.extensions.items():
+                                ext_passes_settings = model_settings.passes
+                                if ext_passes_settings is not None:
+                                    passes_settings__.overrides = {**passes_settings__.overrides}
+                                    passes_settings__ = passes_settings__.merge(ext_passes_settings)
+                                kwargs__ = self.apply_filter(
+                                    kwargs_, passes_settings__.skip, passes_settings__.only, passes_settings__.overrides
+                                )
+                                if kwargs__ is None:
+                                    logger.info("Skipped pass %s for extension %s", self.name, ext_name)
+                                    continue
+                                handler = self.get_handler(kwargs__.pop("executor", None), parent=parent)
+                                future = executor.submit(
+                                    wrap(handler), input_model, ext_name, settings=settings, **kwargs__
+                                )
+                                futures.append(future)
+                        results = []
+                        for i, future in enumerate(futures):
+                            result = future.result()
+                            input_model = inputs[i]
+                            if result:
+                                metrics = result.metrics
+                                if metrics:
+                                    self.metrics["models"].append({input_model: metrics})
+                            results.append(result)
+                        # TODO: check results (metrics?)
+                elif self.pass_scope in [PassScope.MODEL, PassScope.INSTR]:
+                    # Parallelism is used on the instruction level instead
+                    max_workers = 1 if self.pass_scope == PassScope.INSTR else parallel
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        futures = []
+                        for input_model in inputs:
+                            # passes_settings_ = dataclasses.replace(passes_settings)
+                            # FIX
+                            passes_settings_ = PassesSettings(
+                                skip=[*passes_settings.skip],
+                                only=[*passes_settings.only],
+                                overrides={**passes_settings.overrides},
+                            )
+                            for key, val in passes_settings_.overrides.items():
+                                passes_settings_.overrides[key] = {**val}
+                                model_settings = settings.models.get(input_model)
+                            model_passes_settings = model_settings.passes if model_settings is not None else None
+                            if model_passes_settings is not None:
+                                passes_settings_.overrides = {**passes_settings_.overrides}
+                                passes_settings_ = passes_settings_.merge(model_passes_settings)
+                            kwargs__ = self.apply_filter(
+                                kwargs_, passes_settings_.skip, passes_settings_.only, passes_settings_.overrides
+                            )
+                            if kwargs__ is None:
+                                logger.info("Skipped pass %s for model %s", self.name, input_model)
+                                continue
+                            executor_ = kwargs__.pop("executor", None)
+                            if self.pass_scope == PassScope.INSTR:
+                                handler = self.run_instrs
+                            else:
+                                handler = self.get_handler(executor_, parent=parent)
+                            handler = wrap(handler)
+                            if cache is not None:
+                                options = {
+                                    key: val for key, val in kwargs__.items() if key not in ["env", "verbose", "parent"]
+                                }
+                                future = executor.submit(
+                                    run_cached,
+                                    cache,
+                                    self.name,
+                                    handler,
+                                    input_model,
+                                    options,
+                                    *self.cache_io,
+                                    settings=settings,
+                                    **kwargs__,
+                                )
+                            else:
+                                future = executor.submit(handler, input_model, settings=settings, **kwargs__)
+                            futures.append(future)
+                        results = []
+                        for i, future in enumerate(futures):
+                            result = future.result()
+                            input_model = inputs[i]
+                            if result:
+                                metrics = result.metrics
+                                if metrics:
+                                    self.metrics["models"].append({input_model: metrics})
+                            results.append(result)
+                        # TODO: check results (metrics?)
+                elif self.pass_scope == PassScope.GLOBAL:
+                    input_model = None
+                    result = wrap(self.handler)(input_model, settings=settings, **kwargs_)
+                    if result:
+                        metrics = result.metrics
+                        if metrics:
+                            self.metrics["models"].append({input_model: metrics})
+                else:
+                    raise NotImplementedError
             end = time.time()
             diff = end - start
             self.status = PassStatus.COMPLETED
             self.metrics["start"] = start
             self.metrics["end"] = end
             self.metrics["time_s"] = diff
+            if profiler is not None:
+                self.metrics.update(profiler.metrics)
         except Exception as e:
             self.status = PassStatus.FAILED
             raise e
@@ -227,12 +589,34 @@ class PassManager:
         only: Optional[List[str]] = None,
         parent: Optional["PassManager"] = None,
         parallel: Optional[int] = None,
+        session: Optional[bool] = None,
+        checkpoint: Optional[int] = None,
+        pass_cache: Optional[bool] = None,
+        schedule: Optional[str] = None,
+        workers: Optional[int] = None,
+        resume: Optional[bool] = None,
+        profile: Optional[bool] = None,
     ):
         self.name = name
         self.pass_list = pass_list
         self.skip = skip if skip is not None else (parent.skip if parent else [])
         self.only = only if only is not None else (parent.only if parent else [])
         self.parallel = parallel if parallel is not None else (parent.parallel if parent else NUM_THREADS)
+        # Nested pass managers reuse the session of the parent
+        self.session = session if session is not None else (False if parent else MODEL_SESSION)
+        self.checkpoint = checkpoint if checkpoint is not None else MODEL_CHECKPOINT
+        self.pass_cache = pass_cache if pass_cache is not None else (parent.pass_cache if parent else PASS_CACHE)
+        self.cache: Optional[PassCache] = parent.cache if parent else None
+        # Nested pass managers run in order
+        self.schedule = schedule if schedule is not None else ("list" if parent else PASS_SCHEDULE)
+        assert self.schedule in ["list", "dag"], f"Unsupported schedule: {self.schedule}"
+        workers = workers if workers is not None else PASS_WORKERS
+        self.workers = workers if workers > 0 else self.parallel
+        self.resume = resume if resume is not None else RESUME
+        self.state: Optional[PassState] = None
+        self.profile = profile if profile is not None else (parent.profile if parent else PROFILE)
+        self.parent = parent
+        self.executor: Optional[ProcessPoolExecutor] = None
         self.metrics: dict = {}
         self.open: bool = False
         self.has_parent = parent is not None
@@ -241,6 +625,14 @@ class PassManager:
     def size(self):
         return len(self.pass_list)
 
+    def get_process_pool(self):
+        """Worker processes are kept alive until all passes are completed (avoids repeated imports)."""
+        if self.parent is not None:
+            return self.parent.get_process_pool()
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.parallel, initializer=init_worker)
+        return self.executor
+
     def __enter__(self):
         assert not self.open
         self.open = True
@@ -249,6 +641,9 @@ class PassManager:
 
     def __exit__(self, *exc):
         self.open = False
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
         logger.debug("Done.")
         # return False
 
@@ -284,16 +679,74 @@ class PassManager:
                         logger.error(msg)
                         raise RuntimeError(msg)
 
+        if self.pass_cache and self.cache is None and settings is not None:
+            self.cache = PassCache(get_pass_cache_dir(settings))
+        num_completed = 0
+        pass_list = []
         for pass_ in self.pass_list:
             # input_models_ = []
             # for model_name in input_models:
             #    overrides = passes_settings.per_model.get(model_name, None)
             #    if overrides:
-            if check_filter(pass_.name, self.skip, self.only):
+            filter_options = pass_.apply_filter({}, self.skip, self.only)
+            if filter_options is None:
                 pass_.skip()
                 continue
+            pass_.filter_options = filter_options
             assert pass_.is_pending, f"Pass {pass_.name} is not pending"
-            result = pass_.run(input_models, settings=settings, env=env, verbose=verbose, parent=self)
+            pass_list.append(pass_)
+        resumed = {}
+        if settings is not None and not self.has_parent:
+            self.state = PassState(get_pass_state_file(settings, self.name), pass_list, input_models)
+            self.state.init(settings)
+            if self.resume:
+                resumed = self.state.resume(settings, get_pass_dependencies(pass_list))
+                for i in resumed:
+                    pass_list[i].status = PassStatus.COMPLETED
+                logger.info("Resuming %s: %d of %d passes already completed", self.name, len(resumed), len(pass_list))
+            self.state.save()
+        profiler = self.get_profiler(None, settings)
+        with profiler if profiler is not None else nullcontext():
+            with ModelSession() if self.session else nullcontext() as session:
+                try:
+                    if self.schedule == "dag":
+                        results = self.run_dag(
+                            pass_list, input_models, settings=settings, env=env, verbose=verbose, resumed=resumed
+                        )
+                    else:
+                        results = []
+                        for i, pass_ in enumerate(pass_list):
+                            if i in resumed:
+                                logger.info("Skipping completed pass %s", pass_.name)
+                                resumed_patches = get_resumed_patches(settings, resumed[i])
+                                for patch_settings in resumed_patches:
+                                    settings.add_patch(patch_settings)
+                                if len(resumed_patches) > 0:
+                                    self.save_settings(settings)
+                                results.append(PassResult(metrics=resumed[i].get("metrics")))
+                                continue
+                            known = self.pass_started(i, settings)
+                            result = pass_.run(input_models, settings=settings, env=env, verbose=verbose, parent=self)
+                            results.append(result)
+                            if settings is not None and any(
+                                id(patch_settings) not in known for patch_settings in settings.patches
+                            ):
+                                self.save_settings(settings)
+                            num_completed += 1
+                            synced = session is None
+                            if session is not None and self.checkpoint > 0 and num_completed % self.checkpoint == 0:
+                                logger.debug("Writing checkpoint after pass %s", pass_.name)
+                                session.sync()
+                                synced = True
+                            self.pass_completed(i, result, settings, settings, known, synced)
+                except Exception as ex:
+                    if self.state is not None:
+                        self.state.failed(pass_list)
+                    raise ex
+            if self.state is not None and session is not None:
+                # Remaining models were written back when closing the session
+                self.state.sync(settings)
+        for pass_, result in zip(pass_list, results):
             if result:
                 metrics = result.metrics
                 if metrics:
@@ -303,8 +756,163 @@ class PassManager:
         self.metrics["start"] = start
         self.metrics["end"] = end
         self.metrics["time_s"] = diff
+        if profiler is not None:
+            self.metrics.update(profiler.metrics)
+        if self.cache is not None and not self.has_parent:
+            logger.info("Pass cache: %d hits, %d misses", self.cache.n_hits, self.cache.n_misses)
+            self.metrics["pass_cache_hits"] = self.cache.n_hits
+            self.metrics["pass_cache_misses"] = self.cache.n_misses
         return PassResult(metrics=self.metrics)
 
+    def get_profiler(self, pass_name: Optional[str], settings: Optional[Seal5Settings] = None):
+        """Profiler for a single pass (or the whole pass manager if pass_name is None)."""
+        if not self.profile:
+            return None
+        name = self.name if pass_name is None else f"{self.name}.{pass_name}"
+        directory = get_profiles_dir(settings) if settings is not None else None
+        return PassProfiler(name, directory=directory)
+
+    def save_settings(self, settings: Optional[Seal5Settings]):
+        """Write settings after patches were added.
+
+        Only done by the top-level pass manager, which adds the patches of all passes in order (pass handlers must
+        not write the settings file themselves as they might run concurrently on a copy of the settings).
+        """
+        if settings is None or self.has_parent:
+            return
+        settings.save()
+
+    def pass_started(self, i: int, settings: Optional[Seal5Settings]):
+        """Record start of pass and return the patches known before."""
+        if self.state is not None:
+            self.state.update(i, "RUNNING", start=time.time())
+        if settings is None:
+            return set()
+        return {id(patch_settings) for patch_settings in settings.patches}
+
+    def pass_completed(
+        self,
+        i: int,
+        result: Optional[PassResult],
+        settings: Optional[Seal5Settings],
+        pass_settings: Optional[Seal5Settings],
+        known: set,
+        synced: bool,
+    ):
+        if self.state is None:
+            return
+        patches = [patch_settings for patch_settings in pass_settings.patches if id(patch_settings) not in known]
+        metrics = result.metrics if result else None
+        self.state.completed(i, metrics, patches, synced, settings)
+
+    def run_dag(
+        self,
+        pass_list: List[Seal5Pass],
+        input_models: List[str],
+        settings: Optional[Seal5Settings] = None,
+        env: Optional[dict] = None,
+        verbose: bool = False,
+        resumed: Optional[Dict[int, dict]] = None,
+    ):
+        """Run passes concurrently as soon as all conflicting predecessors are completed.
+
+        Passes which do not write the settings work on a copy with a separate list of patches. Added patches are
+        transferred in the original pass order, hence the patches are applied in the same order as with the list
+        schedule, and the settings file is written after every transfer. Passes working on the original settings
+        are only started once all patches of earlier passes were transferred.
+        """
+        deps = get_pass_dependencies(pass_list)
+        results = [None] * len(pass_list)
+        added_patches: Dict[int, list] = {}
+        resumed = resumed if resumed is not None else {}
+        for i, entry in resumed.items():
+            logger.info("Skipping completed pass %s", pass_list[i].name)
+            results[i] = PassResult(metrics=entry.get("metrics"))
+            added_patches[i] = get_resumed_patches(settings, entry)
+        pending = [i for i in range(len(pass_list)) if i not in resumed]
+        completed: Set[int] = set(resumed)
+        running = {}
+        num_flushed = 0
+        modified = False
+        error = None
+        session = get_model_session()
+
+        def flush_patches():
+            nonlocal num_flushed, modified
+            while num_flushed in completed:
+                for patch_settings in added_patches.pop(num_flushed, []):
+                    settings.add_patch(patch_settings)
+                    modified = True
+                num_flushed += 1
+            if modified:
+                self.save_settings(settings)
+                modified = False
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(pending) > 0 or len(running) > 0:
+                flush_patches()
+                if error is None:
+                    for i in list(pending):
+                        if len(running) >= self.workers:
+                            break
+                        if not deps[i].issubset(completed):
+                            continue
+                        pass_ = pass_list[i]
+                        pass_settings = settings
+                        if settings is not None and pass_.writes is not None and "settings" not in pass_.writes:
+                            pass_settings = copy.copy(settings)
+                            pass_settings.patches = list(settings.patches)
+                        elif num_flushed < i:
+                            continue
+                        pending.remove(i)
+                        logger.debug("Scheduling pass %s", pass_.name)
+                        known = self.pass_started(i, pass_settings)
+                        future = executor.submit(
+                            pass_.run, input_models, settings=pass_settings, env=env, verbose=verbose, parent=self
+                        )
+                        running[future] = (i, pass_settings, known)
+                if len(running) == 0:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, pass_settings, known = running.pop(future)
+                    try:
+                        results[i] = future.result()
+                    except Exception as ex:
+                        if error is None:
+                            error = ex
+                        continue
+                    if pass_settings is not settings:
+                        known = {id(patch_settings) for patch_settings in settings.patches}
+                        added_patches[i] = [
+                            patch_settings
+                            for patch_settings in pass_settings.patches
+                            if id(patch_settings) not in known
+                        ]
+                    elif settings is not None:
+                        modified = modified or any(
+                            id(patch_settings) not in known for patch_settings in settings.patches
+                        )
+                    completed.add(i)
+                    synced = session is None
+                    if session is not None and self.checkpoint > 0 and len(completed) % self.checkpoint == 0:
+                        logger.debug("Writing checkpoint after pass %s", pass_list[i].name)
+                        session.sync()
+                        synced = True
+                    self.pass_completed(i, results[i], settings, pass_settings, known, synced)
+        flush_patches()
+        if error is not None:
+            raise error
+        return results
+
+
+def get_pass_dependencies(pass_list: List[Seal5Pass]):
+    """Lookup earlier passes which have to be completed before each pass can run."""
+    deps = {}
+    for i, pass_ in enumerate(pass_list):
+        deps[i] = {j for j in range(i) if pass_.conflicts_with(pass_list[j])}
+    return deps
+
 
 def filter_passes(
     passes: List[Seal5Pass],
@@ -33,7 +33,8 @@ def build_riscv_mattr(features, xlen: Optional[int] = None):
     if xlen is not None:
         if xlen == 64:
             mattrs += ["64bit"]
-    mattrs = list(set(map(fix_prefix, mattrs)))
+    # Keep order (deterministic command lines, i.e. for caching)
+    mattrs = list(dict.fromkeys(map(fix_prefix, mattrs)))
     mattr = ",".join(mattrs)
     return mattr
 
@@ -0,0 +1,170 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Content-addressed cache for results of external tools (pattern-gen, llc)."""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from seal5.logging import Logger
+from seal5.utils import str2bool
+from seal5.pass_cache import hash_file, get_dir_size
+
+logger = Logger("tool_cache")
+
+# Cache outputs of pattern-gen and llc per instruction
+TOOL_CACHE = str2bool(os.environ.get("SEAL5_TOOL_CACHE", True))
+DEFAULT_TOOL_CACHE_SIZE = 1024  # MB
+TOOL_CACHE_SIZE = int(os.environ.get("SEAL5_TOOL_CACHE_SIZE", DEFAULT_TOOL_CACHE_SIZE))
+# Shared cache directory (i.e. for multiple CI workers), defaults to the cache directory of the Seal5 flow
+TOOL_CACHE_DIR = os.environ.get("SEAL5_TOOL_CACHE_DIR", None)
+
+# Digests of tool executables by (path, size, mtime)
+_TOOL_DIGESTS = {}
+_TOOL_DIGESTS_LOCK = threading.Lock()
+
+
+def get_tool_cache_dir(settings):
+    if TOOL_CACHE_DIR:
+        return Path(TOOL_CACHE_DIR)
+    return settings.cache_dir / "tools"
+
+
+def get_tool_digest(exe: Path):
+    exe = Path(exe).resolve()
+    st = exe.stat()
+    key = (exe, st.st_size, st.st_mtime_ns)
+    with _TOOL_DIGESTS_LOCK:
+        ret = _TOOL_DIGESTS.get(key)
+    if ret is None:
+        ret = hash_file(exe)
+        with _TOOL_DIGESTS_LOCK:
+            _TOOL_DIGESTS[key] = ret
+    return ret
+
+
+def unlink_outputs(outputs: List[Path]):
+    for output_file in outputs:
+        Path(output_file).unlink(missing_ok=True)
+
+
+class ToolCache:
+    """Persistent cache for tool invocations.
+
+    Entries are keyed by the digest of the executable, the command line arguments and the contents of the input
+    files. The paths of inputs and outputs are not part of the key, so entries can be shared between Seal5
+    directories. Each entry holds the exit code and output of the tool and the written output files, which are
+    restored by hardlinking (or copying) them to the new destination. As the number of entries is large, the least
+    recently used ones are only evicted when calling evict() (once the total size exceeds max_size (MB)).
+    """
+
+    def __init__(self, directory: Path, max_size: int = TOOL_CACHE_SIZE):
+        self.directory: Path = Path(directory)
+        self.max_size: int = max_size
+        self.lock = threading.Lock()
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def get_key(self, exe: Path, args: list, inputs: List[Path], outputs: List[Path]):
+        paths = {str(path): f"<input{i}>" for i, path in enumerate(inputs)}
+        paths.update({str(path): f"<output{i}>" for i, path in enumerate(outputs)})
+        data = {
+            "tool": Path(exe).name,
+            "digest": get_tool_digest(exe),
+            "args": [paths.get(str(arg), str(arg)) for arg in args],
+            "inputs": [hash_file(path) for path in inputs],
+        }
+        text = json.dumps(data, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def lookup(self, key: str, outputs: List[Path]):
+        """Restore the output files of a cached invocation, returns its exit code and output (or None)."""
+        entry_dir = self.directory / key
+        result_file = entry_dir / "result.json"
+        # Outputs might be hardlinks to cache entries restored earlier, which the tool must never write to on a miss
+        unlink_outputs(outputs)
+        try:
+            with open(result_file, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            for i, output_file in enumerate(outputs):
+                if not result["outputs"][i]:
+                    continue
+                try:
+                    os.link(entry_dir / f"output{i}", output_file)
+                except OSError:
+                    shutil.copyfile(entry_dir / f"output{i}", output_file)
+            os.utime(result_file)  # LRU
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Missing (or concurrently evicted) entry, drop partially restored outputs
+            unlink_outputs(outputs)
+            with self.lock:
+                self.n_misses += 1
+            return None
+        with self.lock:
+            self.n_hits += 1
+        return result["code"], result["output"]
+
+    def store(self, key: str, code: int, output: str, outputs: List[Path]):
+        entry_dir = self.directory / key
+        if entry_dir.is_dir():
+            return
+        tmp_dir = self.directory / f"{key}.tmp{os.getpid()}.{threading.get_ident()}"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        outputs_ = []
+        for i, output_file in enumerate(outputs):
+            found = Path(output_file).is_file()
+            if found:
+                shutil.copyfile(output_file, tmp_dir / f"output{i}")
+            outputs_.append(found)
+        with open(tmp_dir / "result.json", "w", encoding="utf-8") as f:
+            json.dump({"code": code, "output": output, "outputs": outputs_}, f)
+        try:
+            tmp_dir.rename(entry_dir)
+        except OSError:
+            # Entry was added concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def evict(self):
+        if not self.directory.is_dir():
+            return
+        with self.lock:
+            entries = []
+            total = 0
+            for entry_dir in self.directory.iterdir():
+                result_file = entry_dir / "result.json"
+                try:
+                    entries.append((result_file.stat().st_mtime, get_dir_size(entry_dir), entry_dir))
+                except FileNotFoundError:
+                    continue
+                total += entries[-1][1]
+            max_bytes = self.max_size * 1024 * 1024
+            for _, size, entry_dir in sorted(entries):
+                if total <= max_bytes:
+                    break
+                logger.debug("Evicting tool cache entry %s", entry_dir.name)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+
+
+def open_tool_cache(directory: Optional[Path]):
+    return ToolCache(directory) if TOOL_CACHE and directory is not None else None
@@ -19,9 +19,15 @@
 """PatternGen utils for seal5."""
 
 import re
+import os
+import json
+import functools
+import threading
+import subprocess
 from pathlib import Path
 from typing import Optional, Union
 from collections import defaultdict
+from concurrent.futures import Future
 
 import yaml
 
@@ -30,10 +36,16 @@ from seal5.settings import PatchSettings
 from seal5.types import PatchStage
 from seal5.index import File, Directory, NamedPatch, write_index_yaml
 from seal5.riscv_utils import build_riscv_mattr, get_riscv_defaults
+from seal5.tool_cache import ToolCache
 from seal5 import utils
 
 logger = Logger("tools")
 
+# Run all pattern-gen jobs of a set in a single process if supported by the executable (see PatternGenWorker)
+PATTERN_GEN_BATCH = utils.str2bool(os.environ.get("SEAL5_PATTERN_GEN_BATCH", True))
+# Max. number of times a crashed pattern-gen worker is restarted (afterwards one process per job is used)
+PATTERN_GEN_BATCH_RESTARTS = int(os.environ.get("SEAL5_PATTERN_GEN_BATCH_RESTARTS", 3))
+
 
 def build_pattern_gen(
     src: Path,
@@ -142,11 +154,141 @@ def build_llc(
     utils.make("llc", cwd=dest, print_func=logger.info if verbose else logger.debug, live=True, use_ninja=use_ninja)
 
 
-def run_pattern_gen(
-    build_dir: Path,
+def get_pattern_gen_exe(build_dir: Union[str, Path]):
+    if not isinstance(build_dir, Path):
+        build_dir = Path(build_dir)
+    pattern_gen_exe = build_dir / "bin" / "pattern-gen"
+    assert pattern_gen_exe.is_file(), "pattern-gen not found"
+    return pattern_gen_exe
+
+
+@functools.lru_cache(maxsize=None)
+def pattern_gen_supports_batch(pattern_gen_exe: Path):
+    """Check if the pattern-gen executable provides the --batch option (see PatternGenWorker)."""
+    try:
+        res = subprocess.run(
+            [str(pattern_gen_exe), "--help-hidden"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False
+        )
+    except OSError:
+        return False
+    return "--batch" in res.stdout.decode(errors="replace")
+
+
+class PatternGenWorkerError(RuntimeError):
+    """The pattern-gen worker is not running (anymore), the job has to be executed in a separate process."""
+
+
+class PatternGenWorker:
+    """Long-lived pattern-gen process, avoiding the startup costs (target initialization,...) for every instruction.
+
+    Jobs are sent as JSON lines to the stdin of `pattern-gen --batch` ({"id": ..., "args": [...]}, using the same
+    arguments as a separate invocation). The worker processes them using a pool of the given size (--batch-jobs)
+    and replies with one JSON line per finished job ({"id": ..., "code": ..., "output": ...}), in any order. The
+    output of a job is the same as printed by a separate process. The worker exits when stdin is closed.
+
+    If the process dies (i.e. pattern-gen crashes on an instruction), the futures of all pending jobs fail with a
+    PatternGenWorkerError and the process is restarted for the next job (up to SEAL5_PATTERN_GEN_BATCH_RESTARTS
+    times).
+    """
+
+    def __init__(self, build_dir: Union[str, Path], jobs: int = 1, verbose: bool = False):
+        self.pattern_gen_exe = get_pattern_gen_exe(build_dir)
+        self.print_func = logger.info if verbose else logger.debug
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.n_restarts = 0
+        self.closed = False
+        self._start()
+
+    def _start(self):
+        args = [str(self.pattern_gen_exe), "--batch", f"--batch-jobs={self.jobs}"]
+        logger.debug("- Executing: %s", str(args))
+        self.process = subprocess.Popen(
+            args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8", errors="replace"
+        )
+        self.pending = {}
+        self.reader = threading.Thread(target=self._read_results, args=(self.process, self.pending), daemon=True)
+        self.reader.start()
+
+    def _read_results(self, process, pending):
+        for line in process.stdout:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                self.print_func(line.rstrip("\n"))
+                continue
+            with self.lock:
+                future = pending.pop(result["id"], None)
+            if future is not None:
+                future.set_result((result["code"], result["output"]))
+        with self.lock:
+            failed = list(pending.values())
+            pending.clear()
+        for future in failed:
+            future.set_exception(PatternGenWorkerError("pattern-gen worker terminated unexpectedly"))
+
+    def _is_running(self):
+        return self.process.poll() is None and self.reader.is_alive()
+
+    def submit(self, args):
+        """Submit a job, returns a future for its exit code and output."""
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise PatternGenWorkerError("pattern-gen worker is closed")
+            if not self._is_running():
+                if self.n_restarts >= PATTERN_GEN_BATCH_RESTARTS:
+                    raise PatternGenWorkerError("pattern-gen worker is not running")
+                logger.warning("Restarting pattern-gen worker")
+                self.n_restarts += 1
+                self._stop()
+                self._start()
+            job_id = self.next_id
+            self.next_id += 1
+            try:
+                self.process.stdin.write(json.dumps({"id": job_id, "args": list(map(str, args))}) + "\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                raise PatternGenWorkerError("pattern-gen worker is not running") from e
+            self.pending[job_id] = future
+        return future
+
+    def _stop(self):
+        try:
+            if self.process.stdin and not self.process.stdin.closed:
+                self.process.stdin.close()
+        except OSError:
+            pass  # Broken pipe of dead process
+        self.process.wait()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        self._stop()
+        self.reader.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def start_pattern_gen_worker(build_dir: Optional[Union[str, Path]], jobs: int = 1, verbose: bool = False):
+    """Start a PatternGenWorker if enabled and supported, else None (use one pattern-gen process per job)."""
+    if not PATTERN_GEN_BATCH or build_dir is None:
+        return None
+    pattern_gen_exe = Path(build_dir) / "bin" / "pattern-gen"
+    if not pattern_gen_exe.is_file() or not pattern_gen_supports_batch(pattern_gen_exe):
+        logger.debug("pattern-gen does not support batch mode")
+        return None
+    return PatternGenWorker(build_dir, jobs=jobs, verbose=verbose)
+
+
+def get_pattern_gen_args(
     src: Path,
-    dest: Union[str, Path],
-    verbose: bool = False,
+    dest: Optional[Path],
     ext=None,
     mattr=None,
     xlen=None,
@@ -156,15 +298,10 @@ def run_pattern_gen(
     no_extend=True,
     debug=False,
 ):
-    """Excute pattern-gen executable."""
-    if not isinstance(build_dir, Path):
-        build_dir = Path(build_dir)
     pattern_gen_args = [src]
     # pattern_gen_args.extend(["-custom-legalizer-settings=foo", "-disable-gisel-legality-check"])
 
     if dest:
-        if isinstance(dest, str):
-            dest = Path(dest)
         assert dest.parent.is_dir(), f"Missing destination directory: {dest}"
         pattern_gen_args.extend(["-o", str(dest)])
 
@@ -205,20 +342,156 @@ def run_pattern_gen(
         pattern_gen_args.append("--no-extend")
     pattern_gen_args.append("--stats")
 
+    return pattern_gen_args
+
+
+def handle_pattern_gen_output(out: str, dest: Path):
+    """Split the output of pattern-gen into .pat, .uses, .stats and .out/.err files next to dest."""
+    # break_on_err = True
+    break_on_err = False
+    # errs = None
+    # opt_ll = None
+    pat = []
+    found_pattern = False
+    # reason = None
+    # rest = []
+    is_err = False
+    has_stats = False
+    all_stats = defaultdict(dict)
+    for line in out.split("\n"):
+        # print("line", line)
+        if len(line.strip()) == 0 or line.startswith("==="):
+            continue
+        if found_pattern:
+            # print("A1")
+            pat.append(line)
+            # found_pattern = False
+        else:
+            # print("A2")
+            if "Pattern for" in line:
+                # print("B1")
+                pat = [line.split(":", 1)[1]]
+                # found_pattern = True
+            elif "Pattern Generation failed for" in line:
+                # reason = line
+                is_err = True
+        if has_stats:
+            parsed = re.compile(r"^\s*(\d+)\s([^\s]+)\s+-\s(.*)$").findall(line)
+            if len(parsed) > 0:
+                assert len(parsed) == 1
+                assert len(parsed[0]) == 3
+                stat_count, stat_type, stat_descr = parsed[0]
+                stat_count = int(stat_count)
+                if stat_type not in ["pattern-gen"]:
+                    continue
+                new_stats = {stat_descr: stat_count}
+                all_stats[stat_type].update(new_stats)
+        else:
+            if "Statistics Collected" in line:
+                has_stats = True
+    if len(all_stats) > 0:
+        all_stats = dict(all_stats)
+        stat_file = str(dest) + ".stats"
+        with open(stat_file, "w", encoding="utf-8") as f:
+            yaml.dump(all_stats, f)
+    if len(pat) > 0:
+        pat = "\n".join(pat)
+        pat_file = str(dest) + ".pat"
+        with open(pat_file, "w", encoding="utf-8") as f:
+            f.write(pat)
+
+        uses = re.compile(r":\$([^:\s(),]*)").findall(pat)
+        assert len(uses) > 0
+        uses = list(set(uses))
+        uses_str = ",".join(uses) + "\n"
+
+        uses_file = str(dest) + ".uses"
+        with open(uses_file, "w", encoding="utf-8") as f:
+            f.write(uses_str)
+
+    else:
+        is_err = True
+    # else:
+    #     if break_on_err:
+    #         print("\n".join(rest))
+    #         input("^^^Pattern not found^^^")
+    if is_err:
+        if break_on_err:
+            print(out)
+            input("^^^ERROR^^^")
+        dest.unlink()
+    out_file = str(dest) + (".err" if is_err else ".out")
+    with open(out_file, "w", encoding="utf-8") as f:
+        f.write(out)
+    # if len(rest) > 0:
+    #     rest = "\n".join(rest)
+    #     rest_file = str(dest) + (".err" if is_err else ".out")
+    #     with open(rest_file, "w") as f:
+    #         f.write(rest)
+    # if reason:
+    #     reason_file = str(dest) + ".reason"
+    #     with open(reason_file, "w") as f:
+    #         f.write(reason)
+
+
+def run_pattern_gen(
+    build_dir: Path,
+    src: Path,
+    dest: Union[str, Path],
+    verbose: bool = False,
+    ext=None,
+    mattr=None,
+    xlen=None,
+    skip_formats=False,
+    skip_patterns=False,
+    skip_verify=True,
+    no_extend=True,
+    debug=False,
+    worker: Optional[PatternGenWorker] = None,
+    cache: Optional[ToolCache] = None,
+):
+    """Excute pattern-gen executable (or submit the job to a running worker).
+
+    With a cache, the result of a previous invocation with the same inputs is reused.
+    """
+    print_func = logger.info if verbose else logger.debug
+    if isinstance(dest, str):
+        dest = Path(dest)
+    pattern_gen_args = get_pattern_gen_args(
+        src,
+        dest,
+        ext=ext,
+        mattr=mattr,
+        xlen=xlen,
+        skip_formats=skip_formats,
+        skip_patterns=skip_patterns,
+        skip_verify=skip_verify,
+        no_extend=no_extend,
+        debug=debug,
+    )
+
     # break_on_err = True
     break_on_err = False
 
+    pattern_gen_exe = get_pattern_gen_exe(build_dir) if worker is None else worker.pattern_gen_exe
+    cached = None
+    if cache is None:
+        # Might be a hardlink to a tool cache entry of a previous run
+        dest.unlink(missing_ok=True)
+    else:
+        key = cache.get_key(pattern_gen_exe, pattern_gen_args, [src], [dest])
+        cached = cache.lookup(key, [dest])
+
     # TODO: dump gmir?
     def handle_exit(code=None, out=None):
+        if cache is not None and cached is None:
+            cache.store(key, code, out, [dest])
         if code is not None and code != 0:
             err_file = str(dest) + ".err"
             with open(err_file, "w", encoding="utf-8") as f:
                 f.write(out)
         return code
 
-    pattern_gen_exe = build_dir / "bin" / "pattern-gen"
-    assert pattern_gen_exe.is_file(), "pattern-gen not found"
-
     # Write cmd file to easily rerun patterngen
     cmd_str = " ".join(
         map(lambda x: str(x) if str(x).count(" ") == 0 else f"'{x}'", [pattern_gen_exe, *pattern_gen_args])
@@ -227,14 +500,27 @@ def run_pattern_gen(
     with open(cmd_file, "w", encoding="utf-8") as f:
         f.write(cmd_str)
     try:
-        out = utils.exec_getout(
-            pattern_gen_exe,
-            *pattern_gen_args,
-            # cwd=dest,
-            print_func=logger.info if verbose else logger.debug,
-            handle_exit=handle_exit,
-            live=True,
-        )
+        result = cached
+        if cached is None and worker is not None:
+            try:
+                result = worker.submit(pattern_gen_args).result()
+            except PatternGenWorkerError as ex:
+                # Run the job on its own to find out if it is responsible for the failure
+                logger.warning("%s, running pattern-gen for %s in a separate process", ex, src)
+        if result is None:
+            out = utils.exec_getout(
+                pattern_gen_exe,
+                *pattern_gen_args,
+                # cwd=dest,
+                print_func=print_func,
+                handle_exit=handle_exit,
+                live=True,
+            )
+        else:
+            exit_code, out = result
+            print_func(out)
+            handle_exit(exit_code, out)
+            assert exit_code == 0, f"The process returned an non-zero exit code {exit_code}! (CMD: `{cmd_str}`)"
     except Exception as e:
         if break_on_err:
             input("^^^ERR^^^")
@@ -245,89 +531,7 @@ def run_pattern_gen(
                 dest.unlink()
         raise e
     if not skip_patterns:
-        # errs = None
-        # opt_ll = None
-        pat = []
-        found_pattern = False
-        # reason = None
-        # rest = []
-        is_err = False
-        has_stats = False
-        all_stats = defaultdict(dict)
-        for line in out.split("\n"):
-            # print("line", line)
-            if len(line.strip()) == 0 or line.startswith("==="):
-                continue
-            if found_pattern:
-                # print("A1")
-                pat.append(line)
-                # found_pattern = False
-            else:
-                # print("A2")
-                if "Pattern for" in line:
-                    # print("B1")
-                    pat = [line.split(":", 1)[1]]
-                    # found_pattern = True
-                elif "Pattern Generation failed for" in line:
-                    # reason = line
-                    is_err = True
-            if has_stats:
-                parsed = re.compile(r"^\s*(\d+)\s([^\s]+)\s+-\s(.*)$").findall(line)
-                if len(parsed) > 0:
-                    assert len(parsed) == 1
-                    assert len(parsed[0]) == 3
-                    stat_count, stat_type, stat_descr = parsed[0]
-                    stat_count = int(stat_count)
-                    if stat_type not in ["pattern-gen"]:
-                        continue
-                    new_stats = {stat_descr: stat_count}
-                    all_stats[stat_type].update(new_stats)
-            else:
-                if "Statistics Collected" in line:
-                    has_stats = True
-        if len(all_stats) > 0:
-            all_stats = dict(all_stats)
-            stat_file = str(dest) + ".stats"
-            with open(stat_file, "w", encoding="utf-8") as f:
-                yaml.dump(all_stats, f)
-        if len(pat) > 0:
-            pat = "\n".join(pat)
-            pat_file = str(dest) + ".pat"
-            with open(pat_file, "w", encoding="utf-8") as f:
-                f.write(pat)
-
-            uses = re.compile(r":\$([^:\s(),]*)").findall(pat)
-            assert len(uses) > 0
-            uses = list(set(uses))
-            uses_str = ",".join(uses) + "\n"
-
-            uses_file = str(dest) + ".uses"
-            with open(uses_file, "w", encoding="utf-8") as f:
-                f.write(uses_str)
-
-        else:
-            is_err = True
-        # else:
-        #     if break_on_err:
-        #         print("\n".join(rest))
-        #         input("^^^Pattern not found^^^")
-        if is_err:
-            if break_on_err:
-                print(out)
-                input("^^^ERROR^^^")
-            dest.unlink()
-        out_file = str(dest) + (".err" if is_err else ".out")
-        with open(out_file, "w", encoding="utf-8") as f:
-            f.write(out)
-        # if len(rest) > 0:
-        #     rest = "\n".join(rest)
-        #     rest_file = str(dest) + (".err" if is_err else ".out")
-        #     with open(rest_file, "w") as f:
-        #         f.write(rest)
-        # if reason:
-        #     reason_file = str(dest) + ".reason"
-        #     with open(reason_file, "w") as f:
-        #         f.write(reason)
+        handle_pattern_gen_output(out, dest)
 
 
 def convert_ll_to_gmir(
@@ -338,8 +542,9 @@ def convert_ll_to_gmir(
     xlen=None,
     optimize=3,
     verbose: bool = False,
+    cache: Optional[ToolCache] = None,
 ):
-    """Convert LLVM-IR file to GMIR file."""
+    """Convert LLVM-IR file to GMIR file (or restore it from the cache)."""
     if mattr is None:
         features, _ = get_riscv_defaults()
         mattr = build_riscv_mattr(features, xlen=xlen)
@@ -360,10 +565,30 @@ def convert_ll_to_gmir(
     assert dest is not None
     llc_args.extend(["-o", str(dest)])
 
+    if cache is None:
+        # Might be a hardlink to a tool cache entry of a previous run
+        Path(dest).unlink(missing_ok=True)
+        handle_exit = None
+    else:
+        key = cache.get_key(llc_exe, llc_args, [src], [dest])
+        cached = cache.lookup(key, [dest])
+        if cached is not None:
+            exit_code, out = cached
+            (logger.info if verbose else logger.debug)(out)
+            assert exit_code == 0, "The process returned an non-zero exit code {}! (CMD: `{}`)".format(
+                exit_code, " ".join(list(map(str, [llc_exe, *llc_args])))
+            )
+            return
+
+        def handle_exit(code=None, out=None):
+            cache.store(key, code, out, [dest])
+            return code
+
     _ = utils.exec_getout(
         llc_exe,
         *llc_args,
         # cwd=dest,
         print_func=logger.info if verbose else logger.debug,
+        handle_exit=handle_exit,
         live=True,
     )
@@ -0,0 +1,269 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Analyses of the detect_* passes implemented as BehaviorWalker callbacks."""
+
+from functools import reduce
+
+from m2isar.metamodel import arch, behav
+
+import seal5.model
+from seal5.transform.detect_imm_leafs.visitor import Mode
+from seal5.transform.detect_inouts.utils import IOMode
+
+from .walker import Analysis
+
+
+def reduce_or(values):
+    return reduce(lambda x, y: x | y, values)
+
+
+class SideEffectsAnalysis(Analysis):
+    """Annotate side effects (loads, stores,...). See detect_side_effects."""
+
+    name = "detect_side_effects"
+
+    READ_SLOTS = {
+        (behav.Assignment, "expr"),
+        (behav.Conditional, "conds"),
+        (behav.Loop, "cond"),
+        (behav.Ternary, "cond"),
+    }
+
+    def __init__(self, instr_def, set_def):
+        super().__init__(instr_def, set_def)
+        self.is_read = False
+        self.is_write = False
+        self.may_load = False
+        self.may_store = False
+
+    def is_read_slot(self, node, slot):
+        return any(isinstance(node, cls) and slot == slot_ for cls, slot_ in self.READ_SLOTS)
+
+    def enter_slot(self, node, slot):
+        if isinstance(node, behav.Assignment) and slot == "target":
+            self.is_write = True
+        elif self.is_read_slot(node, slot):
+            self.is_read = True
+
+    def leave_slot(self, node, slot):
+        if isinstance(node, behav.Assignment) and slot == "target":
+            self.is_write = False
+        elif self.is_read_slot(node, slot):
+            self.is_read = False
+
+    def enter(self, node):
+        if isinstance(node, behav.IndexedReference):
+            assert isinstance(node.reference, arch.Memory)
+            if arch.MemoryAttribute.IS_MAIN_MEM in node.reference.attributes:
+                if self.is_write:
+                    self.may_store = True
+                elif self.is_read:
+                    self.may_load = True
+
+    def finalize(self):
+        instr_def = self.instr_def
+        num_ins = len(
+            [
+                op
+                for op in instr_def.operands.values()
+                if seal5.model.Seal5OperandAttribute.IN in op.attributes
+                or seal5.model.Seal5OperandAttribute.INOUT in op.attributes
+            ]
+        )
+        has_side_effects = num_ins == 0
+        if self.may_load:
+            if seal5.model.Seal5InstrAttribute.MAY_LOAD not in instr_def.attributes:
+                instr_def.attributes[seal5.model.Seal5InstrAttribute.MAY_LOAD] = []
+        if self.may_store:
+            if seal5.model.Seal5InstrAttribute.MAY_STORE not in instr_def.attributes:
+                instr_def.attributes[seal5.model.Seal5InstrAttribute.MAY_STORE] = []
+        if has_side_effects:
+            if seal5.model.Seal5InstrAttribute.HAS_SIDE_EFFECTS not in instr_def.attributes:
+                instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_SIDE_EFFECTS] = []
+
+
+class InoutsAnalysis(Analysis):
+    """Annotate inputs and outputs (operands and registers). See detect_inouts."""
+
+    name = "detect_inouts"
+
+    SLOT_MODES = {
+        (behav.SliceOperation, "left"): IOMode.READ,
+        (behav.SliceOperation, "right"): IOMode.READ,
+        (behav.Assignment, "target"): IOMode.WRITE,
+        (behav.Assignment, "expr"): IOMode.READ,
+        (behav.Conditional, "conds"): IOMode.READ,
+        (behav.Loop, "cond"): IOMode.READ,
+        (behav.Ternary, "cond"): IOMode.READ,
+        (behav.Ternary, "then_expr"): IOMode.READ,
+        (behav.Ternary, "else_expr"): IOMode.READ,
+    }
+
+    def __init__(self, instr_def, set_def):
+        super().__init__(instr_def, set_def)
+        self.reads = set()
+        self.writes = set()
+        self.stack = []
+
+    def lookup_mode(self, node, slot):
+        for (cls, slot_), mode in self.SLOT_MODES.items():
+            if isinstance(node, cls) and slot == slot_:
+                return mode
+        return None
+
+    def enter_slot(self, node, slot):
+        mode = self.lookup_mode(node, slot)
+        if mode is not None:
+            self.stack.append(mode)
+
+    def leave_slot(self, node, slot):
+        if self.lookup_mode(node, slot) is not None:
+            self.stack.pop()
+
+    def enter(self, node):
+        if isinstance(node, behav.NamedReference):
+            if self.stack[-1] == IOMode.READ:
+                self.reads.add(node.reference.name)
+            elif self.stack[-1] == IOMode.WRITE:
+                self.writes.add(node.reference.name)
+
+    def finalize(self):
+        instr_def = self.instr_def
+        for op_name, op_def in instr_def.operands.items():
+            if op_name in self.reads and op_name in self.writes:
+                if seal5.model.Seal5OperandAttribute.INOUT not in instr_def.attributes:
+                    op_def.attributes[seal5.model.Seal5OperandAttribute.INOUT] = []
+            elif op_name in self.reads:
+                if seal5.model.Seal5OperandAttribute.IN not in instr_def.attributes:
+                    op_def.attributes[seal5.model.Seal5OperandAttribute.IN] = []
+            elif op_name in self.writes:
+                if seal5.model.Seal5OperandAttribute.OUT not in instr_def.attributes:
+                    op_def.attributes[seal5.model.Seal5OperandAttribute.OUT] = []
+        for reg_names, attr in [
+            (self.reads, seal5.model.Seal5InstrAttribute.USES),
+            (self.writes, seal5.model.Seal5InstrAttribute.DEFS),
+        ]:
+            for reg_name in reg_names:
+                if reg_name == "PC":
+                    continue
+                if reg_name in instr_def.operands.keys():
+                    continue
+                if reg_name in instr_def.scalars.keys():
+                    continue
+                # TODO: how about register groups
+                assert reg_name in self.set_def.registers
+                regs = instr_def.attributes.get(attr, [])
+                regs.append(reg_name)
+                instr_def.attributes[attr] = regs
+
+
+class ImmLeafsAnalysis(Analysis):
+    """Annotate immediate operands which are used as leafs. See detect_imm_leafs."""
+
+    name = "detect_imm_leafs"
+
+    def __init__(self, instr_def, set_def):
+        super().__init__(instr_def, set_def)
+        self.imm_op_names = [
+            op_name
+            for op_name, op_def in instr_def.operands.items()
+            if seal5.model.Seal5OperandAttribute.IS_IMM in op_def.attributes
+        ]
+        self.imm_leaf_names = set()
+        self.last_imm_name = None
+
+    def add_leaf(self):
+        assert self.last_imm_name is not None
+        self.imm_leaf_names.add(self.last_imm_name)
+        self.last_imm_name = None
+
+    def leave(self, node, values):
+        if isinstance(node, behav.Block):
+            return reduce_or(values) if len(values) > 0 else Mode.NONE
+        if isinstance(node, (behav.BinaryOperation, behav.UnaryOperation)):
+            mode = reduce_or(values)
+            if mode == Mode.IMM_CONST:
+                self.add_leaf()
+                return Mode.NONE
+            return mode
+        if isinstance(node, behav.NumberLiteral):
+            return Mode.CONST
+        if isinstance(node, (behav.ScalarDefinition, behav.Break)):
+            return Mode.NONE
+        if isinstance(node, behav.Return) and node.expr is None:
+            return Mode.NONE
+        if isinstance(node, behav.NamedReference):
+            if isinstance(node.reference, arch.BitFieldDescr):
+                if node.reference.name in self.imm_op_names:
+                    self.last_imm_name = node.reference.name
+                    return Mode.IMM
+                return Mode.REG
+            return Mode.NONE
+        if isinstance(node, behav.IndexedReference):
+            assert isinstance(node.reference, arch.Memory)
+        return reduce_or(values)
+
+    def finalize(self):
+        for name in self.imm_leaf_names:
+            operand = self.instr_def.operands.get(name)
+            assert operand is not None
+            operand.attributes[seal5.model.Seal5OperandAttribute.IS_IMM_LEAF] = []
+
+
+class CallsAnalysis(Analysis):
+    """Detect function and procedure calls. See detect_calls."""
+
+    name = "detect_calls"
+
+    def __init__(self, instr_def, set_def):
+        super().__init__(instr_def, set_def)
+        self.has_call = False
+
+    def enter(self, node):
+        if isinstance(node, behav.Callable):
+            self.has_call = True
+
+    def finalize(self):
+        if self.has_call:
+            if seal5.model.Seal5InstrAttribute.HAS_CALL not in self.instr_def.attributes:
+                self.instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_CALL] = []
+
+
+class LoopsAnalysis(Analysis):
+    """Detect loops. See detect_loops."""
+
+    name = "detect_loops"
+
+    def __init__(self, instr_def, set_def):
+        super().__init__(instr_def, set_def)
+        self.has_loop = False
+
+    def enter(self, node):
+        if isinstance(node, behav.Loop):
+            self.has_loop = True
+
+    def finalize(self):
+        if self.has_loop:
+            if seal5.model.Seal5InstrAttribute.HAS_LOOP not in self.instr_def.attributes:
+                self.instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_LOOP] = []
+
+
+# Ordered as the standalone passes in the default transform pipeline
+ANALYSES = [SideEffectsAnalysis, InoutsAnalysis, ImmLeafsAnalysis, CallsAnalysis, LoopsAnalysis]
+ANALYSIS_NAMES = [cls.name for cls in ANALYSES]
@@ -0,0 +1,124 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Run the detect_* analyses using a single traversal of every instruction behavior."""
+
+import sys
+import argparse
+import logging
+import pathlib
+
+import pandas as pd
+
+from seal5.model_utils import load_model, dump_model
+
+from .analyses import ANALYSES, ANALYSIS_NAMES
+from .walker import BehaviorWalker
+
+from seal5.logging import Logger
+
+logger = Logger("transform.analyze_behavior")
+
+
+def get_parser():
+    # read command line args
+    parser = argparse.ArgumentParser()
+    parser.add_argument("top_level", help="A .m2isarmodel or .seal5model file.")
+    parser.add_argument("--log", default="info", choices=["critical", "error", "warning", "info", "debug"])
+    parser.add_argument("--output", "-o", type=str, default=None)
+    parser.add_argument("--metrics", default=None, help="Output metrics to files ({metrics}_{analysis}_metrics.csv)")
+    parser.add_argument("--analyses", nargs="+", default=ANALYSIS_NAMES, choices=ANALYSIS_NAMES)
+    parser.add_argument("--compat", action="store_true")
+    return parser
+
+
+def process_instr(instr_def, set_def, analyses=None):
+    """Run the selected analyses on a single instruction.
+
+    Returns a dict mapping the analysis name to the raised exception (None on success).
+    """
+    if analyses is None:
+        analyses = ANALYSIS_NAMES
+    logger.debug("analyzing behavior of instr %s", instr_def.name)
+    analyses_ = [cls(instr_def, set_def) for cls in ANALYSES if cls.name in analyses]
+    walker = BehaviorWalker(analyses_)
+    try:
+        errors = walker.run(instr_def.operation)
+    except Exception as ex:
+        errors = [ex] * len(analyses_)
+    return {analysis.name: error for analysis, error in zip(analyses_, errors)}
+
+
+def run(args):
+    # initialize logging
+    logger.setLevel(getattr(logging, args.log.upper()))
+
+    # resolve model paths
+    top_level = pathlib.Path(args.top_level)
+
+    out_path = (top_level.parent / top_level.stem) if args.output is None else args.output
+
+    model_obj = load_model(top_level, compat=args.compat)
+
+    all_metrics = {
+        name: {
+            "n_sets": 0,
+            "n_instructions": 0,
+            "n_skipped": 0,
+            "n_failed": 0,
+            "n_success": 0,
+            "skipped_instructions": [],
+            "failed_instructions": [],
+            "success_instructions": [],
+        }
+        for name in ANALYSIS_NAMES
+        if name in args.analyses
+    }
+    for _, set_def in model_obj.sets.items():
+        for metrics in all_metrics.values():
+            metrics["n_sets"] += 1
+        logger.debug("analyzing behavior for set %s", set_def.name)
+        for _, instr_def in set_def.instructions.items():
+            errors = process_instr(instr_def, set_def, analyses=args.analyses)
+            for name, error in errors.items():
+                metrics = all_metrics[name]
+                metrics["n_instructions"] += 1
+                if error is None:
+                    metrics["n_success"] += 1
+                    metrics["success_instructions"].append(instr_def.name)
+                else:
+                    logger.exception(error, exc_info=error)
+                    metrics["n_failed"] += 1
+                    metrics["failed_instructions"].append(instr_def.name)
+
+    dump_model(model_obj, out_path, compat=args.compat)
+    if args.metrics:
+        for name, metrics in all_metrics.items():
+            metrics_file = f"{args.metrics}_{name}_metrics.csv"
+            metrics_df = pd.DataFrame({key: [val] for key, val in metrics.items()})
+            metrics_df.to_csv(metrics_file, index=False)
+
+
+def main(argv):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    run(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,152 @@
+#
+# Copyright (c) 2025 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of Seal5.
+# See https://github.com/tum-ei-eda/seal5.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Single traversal of M2-ISA-R behavior trees driving multiple analyses."""
+
+from typing import List
+
+from m2isar.metamodel import behav
+
+# Child slots visited by the detect_* visitors, in visiting order.
+SLOTS = [
+    (behav.Operation, ("statements",)),
+    (behav.BinaryOperation, ("left", "right")),
+    (behav.SliceOperation, ("expr", "left", "right")),
+    (behav.ConcatOperation, ("left", "right")),
+    (behav.NumberLiteral, ()),
+    (behav.ScalarDefinition, ()),
+    (behav.Break, ()),
+    (behav.Assignment, ("target", "expr")),
+    (behav.Conditional, ("conds", "stmts")),
+    (behav.Loop, ("cond", "stmts")),
+    (behav.Ternary, ("cond", "then_expr", "else_expr")),
+    (behav.Return, ("expr",)),
+    (behav.UnaryOperation, ("right",)),
+    (behav.NamedReference, ()),
+    (behav.IndexedReference, ("index",)),
+    (behav.TypeConv, ("expr",)),
+    (behav.Callable, ("args",)),
+    (behav.Group, ("expr",)),
+]
+
+
+def lookup_slots(cls):
+    for base in cls.__mro__:
+        for cls_, slots in SLOTS:
+            if base is cls_:
+                return slots
+    raise NotImplementedError(f"Unsupported behavior node: {cls.__name__}")
+
+
+def is_empty_conditional(stmt):
+    if isinstance(stmt, behav.Conditional):
+        if len(stmt.conds) == 1:
+            if isinstance(stmt.stmts[0], behav.Block):
+                if len(stmt.stmts[0].statements) == 0:
+                    return True
+    return False
+
+
+class Analysis:
+    """Base class for analyses driven by the BehaviorWalker.
+
+    Hooks are called in the same order the corresponding visitor functions would have been called by
+    a dedicated ``operation.generate(context)`` traversal. Analyses must not modify the tree (apart from the
+    pruning of empty conditionals done by the BehaviorWalker).
+    """
+
+    name = None
+
+    def __init__(self, instr_def, set_def):
+        self.instr_def = instr_def
+        self.set_def = set_def
+
+    def enter(self, node):
+        """Called before the children of node are visited."""
+
+    def enter_slot(self, node, slot):
+        """Called before the children in the given slot of node are visited."""
+
+    def leave_slot(self, node, slot):
+        """Called after the children in the given slot of node were visited."""
+
+    def leave(self, node, values):
+        """Called after the children of node were visited with their return values.
+
+        For Block nodes, empty conditionals are already dropped from values (and statements).
+        """
+        del node, values
+        return None
+
+    def finalize(self):
+        """Apply the results of the analysis to the instruction."""
+
+
+class BehaviorWalker:
+    """Visit a behavior tree once while invoking the hooks of all given analyses.
+
+    An exception raised by an analysis only disables this analysis (see ``errors``), the remaining ones
+    are unaffected. Errors related to the tree itself (i.e. unsupported nodes) are propagated.
+
+    Unlike the analyses, the walker itself modifies the tree: empty conditionals are pruned from the
+    statements of every Block (as done by the former detect_* visitors).
+    """
+
+    def __init__(self, analyses: List[Analysis]):
+        self.analyses = analyses
+        self.errors = [None] * len(analyses)
+
+    def call(self, idx, hook, *args):
+        if self.errors[idx] is not None:
+            return None
+        try:
+            return getattr(self.analyses[idx], hook)(*args)
+        except Exception as ex:
+            self.errors[idx] = ex
+        return None
+
+    def call_all(self, hook, *args):
+        for idx in range(len(self.analyses)):
+            self.call(idx, hook, *args)
+
+    def walk(self, node):
+        slots = lookup_slots(type(node))
+        self.call_all("enter", node)
+        values = [[] for _ in self.analyses]
+        for slot in slots:
+            children = getattr(node, slot)
+            if children is None:
+                continue
+            is_list = isinstance(children, list)
+            self.call_all("enter_slot", node, slot)
+            for child in children if is_list else [children]:
+                child_values = self.walk(child)
+                for idx, value in enumerate(child_values):
+                    values[idx].append(value)
+            self.call_all("leave_slot", node, slot)
+        if isinstance(node, behav.Block):
+            keep = [not is_empty_conditional(stmt) for stmt in node.statements]
+            node.statements = [stmt for stmt, keep_ in zip(node.statements, keep) if keep_]
+            values = [[value for value, keep_ in zip(values_, keep) if keep_] for values_ in values]
+        return [self.call(idx, "leave", node, values[idx]) for idx in range(len(self.analyses))]
+
+    def run(self, operation):
+        self.walk(operation)
+        for idx in range(len(self.analyses)):
+            self.call(idx, "finalize")
+        return self.errors
@@ -134,8 +134,7 @@ def type_conv(self: behav.TypeConv, context):
             if ty != self.data_type:
                 # update
                 if ty.datatype == arch.DataType.U:
-                    ty.datatype = self.data_type
-                    op.ty = ty
+                    op.ty = model.Seal5Type(self.data_type, ty.width, ty.lanes)
 
                 else:
                     assert False, "Conflicting types"
@@ -174,7 +173,7 @@ def type_conv(self: behav.TypeConv, context):
                     if reg_ty != self.data_type:
                         # update
                         if reg_ty.datatype == arch.DataType.U:
-                            reg_ty.datatype = self.data_type
+                            reg_ty = model.Seal5Type(self.data_type, reg_ty.width, reg_ty.lanes)
                             op.reg_ty = reg_ty
 
                         else:
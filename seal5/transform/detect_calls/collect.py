@@ -42,6 +42,20 @@ def get_parser():
     return parser
 
 
+def process_instr(instr_def, set_def=None):
+    """Annotate a single instruction if its behavior contains function calls.
+
+    The visitor has to be patched into the model before (see run).
+    """
+    del set_def  # unused
+    context = VisitorContext()
+    logger.debug("collecting calls for instr %s", instr_def.name)
+    instr_def.operation.generate(context)
+    if context.has_call:
+        if seal5.model.Seal5InstrAttribute.HAS_CALL not in instr_def.attributes:
+            instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_CALL] = []
+
+
 def run(args):
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -69,13 +83,8 @@ def run(args):
         patch_model(visitor)
         for _, instr_def in set_def.instructions.items():
             metrics["n_instructions"] += 1
-            context = VisitorContext()
-            logger.debug("collecting calls for instr %s", instr_def.name)
             try:
-                instr_def.operation.generate(context)
-                if context.has_call:
-                    if seal5.model.Seal5InstrAttribute.HAS_CALL not in instr_def.attributes:
-                        instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_CALL] = []
+                process_instr(instr_def, set_def)
                 metrics["n_success"] += 1
                 metrics["success_instructions"].append(instr_def.name)
             except Exception as ex:
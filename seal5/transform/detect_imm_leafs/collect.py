@@ -45,6 +45,31 @@ def get_parser():
     return parser
 
 
+def process_instr(instr_def, set_def=None):
+    """Annotate immediate operands of a single instruction which are used as leafs.
+
+    The visitor has to be patched into the model before (see run).
+    """
+    del set_def  # unused
+    imm_op_names = [
+        op_name
+        for op_name, op_def in instr_def.operands.items()
+        if seal5.model.Seal5OperandAttribute.IS_IMM in op_def.attributes
+    ]
+    # print("imm_op_names", imm_op_names)
+    context = VisitorContext(imm_op_names)
+    logger.debug("detecting imm leafs for instr %s", instr_def.name)
+    instr_def.operation.generate(context)
+    # print("context.imm_leaf_names", context.imm_leaf_names)
+    if len(context.imm_leaf_names) > 0:
+        logger.debug("Found {len(context.imm_leaf_names)} imm leafs")
+    for name in context.imm_leaf_names:
+        operand = instr_def.operands.get(name)
+        assert operand is not None
+        operand.attributes[seal5.model.Seal5OperandAttribute.IS_IMM_LEAF] = []
+        instr_def.operands[name] = operand
+
+
 def run(args):
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -72,24 +97,8 @@ def run(args):
         patch_model(visitor)
         for _, instr_def in set_def.instructions.items():
             metrics["n_instructions"] += 1
-            imm_op_names = [
-                op_name
-                for op_name, op_def in instr_def.operands.items()
-                if seal5.model.Seal5OperandAttribute.IS_IMM in op_def.attributes
-            ]
-            # print("imm_op_names", imm_op_names)
-            context = VisitorContext(imm_op_names)
-            logger.debug("detecting imm leafs for instr %s", instr_def.name)
             try:
-                instr_def.operation.generate(context)
-                # print("context.imm_leaf_names", context.imm_leaf_names)
-                if len(context.imm_leaf_names) > 0:
-                    logger.debug("Found {len(context.imm_leaf_names)} imm leafs")
-                for name in context.imm_leaf_names:
-                    operand = instr_def.operands.get(name)
-                    assert operand is not None
-                    operand.attributes[seal5.model.Seal5OperandAttribute.IS_IMM_LEAF] = []
-                    instr_def.operands[name] = operand
+                process_instr(instr_def, set_def)
                 metrics["n_success"] += 1
                 metrics["success_instructions"].append(instr_def.name)
             except Exception as ex:
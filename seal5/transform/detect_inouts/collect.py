@@ -60,6 +60,61 @@ def get_parser():
     return parser
 
 
+def process_instr(instr_def, set_def):
+    """Annotate inputs and outputs (operands and registers) of a single instruction.
+
+    The visitor has to be patched into the model before (see run).
+    """
+    context = VisitorContext()
+    logger.debug("collecting inouts for instr %s", instr_def.name)
+    instr_def.operation.generate(context)
+    for op_name, op_def in instr_def.operands.items():
+        if op_name in context.reads and op_name in context.writes:
+            if seal5.model.Seal5OperandAttribute.INOUT not in instr_def.attributes:
+                op_def.attributes[seal5.model.Seal5OperandAttribute.INOUT] = []
+        elif op_name in context.reads:
+            if seal5.model.Seal5OperandAttribute.IN not in instr_def.attributes:
+                op_def.attributes[seal5.model.Seal5OperandAttribute.IN] = []
+        elif op_name in context.writes:
+            if seal5.model.Seal5OperandAttribute.OUT not in instr_def.attributes:
+                op_def.attributes[seal5.model.Seal5OperandAttribute.OUT] = []
+    # print("---")
+    # print("instr_def.scalars.keys()", instr_def.scalars.keys())
+    for reg_name in context.reads:
+        if reg_name == "PC":
+            continue
+        # print("reg_name1", reg_name)
+        if reg_name in instr_def.operands.keys():
+            continue
+        if reg_name in instr_def.scalars.keys():
+            continue
+        # TODO: how about register groups
+        # TODO: handle other architectural state vars here (PC,...)
+        assert reg_name in set_def.registers
+        uses = instr_def.attributes.get(seal5.model.Seal5InstrAttribute.USES, [])
+        uses.append(reg_name)
+        # TODO: drop duplicates?
+        instr_def.attributes[seal5.model.Seal5InstrAttribute.USES] = uses
+    for reg_name in context.writes:
+        # print("reg_name2", reg_name)
+        if reg_name == "PC":
+            continue
+        if reg_name in instr_def.operands.keys():
+            continue
+        if reg_name in instr_def.scalars.keys():
+            continue
+        # TODO: how about register groups
+        # TODO: handle other architectural state vars here (PC,...)
+        assert reg_name in set_def.registers
+        defs = instr_def.attributes.get(seal5.model.Seal5InstrAttribute.DEFS, [])
+        defs.append(reg_name)
+        # TODO: drop duplicates?
+        instr_def.attributes[seal5.model.Seal5InstrAttribute.DEFS] = defs
+    # print("instr_def.operands_", instr_def.operands)
+    # print("instr_def.attributes", instr_def.attributes)
+    # input("999")
+
+
 def run(args):
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -87,55 +142,8 @@ def run(args):
         patch_model(visitor)
         for _, instr_def in set_def.instructions.items():
             metrics["n_instructions"] += 1
-            context = VisitorContext()
-            logger.debug("collecting inouts for instr %s", instr_def.name)
             try:
-                instr_def.operation.generate(context)
-                for op_name, op_def in instr_def.operands.items():
-                    if op_name in context.reads and op_name in context.writes:
-                        if seal5.model.Seal5OperandAttribute.INOUT not in instr_def.attributes:
-                            op_def.attributes[seal5.model.Seal5OperandAttribute.INOUT] = []
-                    elif op_name in context.reads:
-                        if seal5.model.Seal5OperandAttribute.IN not in instr_def.attributes:
-                            op_def.attributes[seal5.model.Seal5OperandAttribute.IN] = []
-                    elif op_name in context.writes:
-                        if seal5.model.Seal5OperandAttribute.OUT not in instr_def.attributes:
-                            op_def.attributes[seal5.model.Seal5OperandAttribute.OUT] = []
-                # print("---")
-                # print("instr_def.scalars.keys()", instr_def.scalars.keys())
-                for reg_name in context.reads:
-                    if reg_name == "PC":
-                        continue
-                    # print("reg_name1", reg_name)
-                    if reg_name in instr_def.operands.keys():
-                        continue
-                    if reg_name in instr_def.scalars.keys():
-                        continue
-                    # TODO: how about register groups
-                    # TODO: handle other architectural state vars here (PC,...)
-                    assert reg_name in set_def.registers
-                    uses = instr_def.attributes.get(seal5.model.Seal5InstrAttribute.USES, [])
-                    uses.append(reg_name)
-                    # TODO: drop duplicates?
-                    instr_def.attributes[seal5.model.Seal5InstrAttribute.USES] = uses
-                for reg_name in context.writes:
-                    # print("reg_name2", reg_name)
-                    if reg_name == "PC":
-                        continue
-                    if reg_name in instr_def.operands.keys():
-                        continue
-                    if reg_name in instr_def.scalars.keys():
-                        continue
-                    # TODO: how about register groups
-                    # TODO: handle other architectural state vars here (PC,...)
-                    assert reg_name in set_def.registers
-                    defs = instr_def.attributes.get(seal5.model.Seal5InstrAttribute.DEFS, [])
-                    defs.append(reg_name)
-                    # TODO: drop duplicates?
-                    instr_def.attributes[seal5.model.Seal5InstrAttribute.DEFS] = defs
-                # print("instr_def.operands_", instr_def.operands)
-                # print("instr_def.attributes", instr_def.attributes)
-                # input("999")
+                process_instr(instr_def, set_def)
                 metrics["n_success"] += 1
                 metrics["success_instructions"].append(instr_def.name)
             except Exception as ex:
@@ -43,6 +43,20 @@ def get_parser():
     return parser
 
 
+def process_instr(instr_def, set_def=None):
+    """Annotate a single instruction if its behavior contains loops.
+
+    The visitor has to be patched into the model before (see run).
+    """
+    del set_def  # unused
+    context = VisitorContext()
+    logger.debug("collecting loops for instr %s", instr_def.name)
+    instr_def.operation.generate(context)
+    if context.has_loop:
+        if seal5.model.Seal5InstrAttribute.HAS_LOOP not in instr_def.attributes:
+            instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_LOOP] = []
+
+
 def run(args):
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -70,13 +84,8 @@ def run(args):
         patch_model(visitor)
         for _, instr_def in set_def.instructions.items():
             metrics["n_instructions"] += 1
-            context = VisitorContext()
-            logger.debug("collecting loops for instr %s", instr_def.name)
             try:
-                instr_def.operation.generate(context)
-                if context.has_loop:
-                    if seal5.model.Seal5InstrAttribute.HAS_LOOP not in instr_def.attributes:
-                        instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_LOOP] = []
+                process_instr(instr_def, set_def)
                 metrics["n_success"] += 1
                 metrics["success_instructions"].append(instr_def.name)
             except Exception as ex:
@@ -53,6 +53,39 @@ def get_parser():
     return parser
 
 
+def process_instr(instr_def, set_def=None):
+    """Annotate side effects (loads, stores,...) of a single instruction.
+
+    The visitor has to be patched into the model before (see run).
+    """
+    del set_def  # unused
+    context = VisitorContext()
+    logger.debug("collecting side effects for instr %s", instr_def.name)
+    instr_def.operation.generate(context)
+    # TODO:
+    # if arch.InstrAttribute.NO_CONT:
+    # if arch.InstrAttribute.COND:
+    num_ins = len(
+        [
+            op
+            for op in instr_def.operands.values()
+            if seal5.model.Seal5OperandAttribute.IN in op.attributes
+            or seal5.model.Seal5OperandAttribute.INOUT in op.attributes
+        ]
+    )
+    has_side_effects = num_ins == 0
+    if context.may_load:
+        if seal5.model.Seal5InstrAttribute.MAY_LOAD not in instr_def.attributes:
+            instr_def.attributes[seal5.model.Seal5InstrAttribute.MAY_LOAD] = []
+    if context.may_store:
+        if seal5.model.Seal5InstrAttribute.MAY_STORE not in instr_def.attributes:
+            instr_def.attributes[seal5.model.Seal5InstrAttribute.MAY_STORE] = []
+    if has_side_effects:
+        if seal5.model.Seal5InstrAttribute.HAS_SIDE_EFFECTS not in instr_def.attributes:
+            instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_SIDE_EFFECTS] = []
+    # TODO
+
+
 def run(args):
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -80,32 +113,8 @@ def run(args):
         patch_model(visitor)
         for _, instr_def in set_def.instructions.items():
             metrics["n_instructions"] += 1
-            context = VisitorContext()
-            logger.debug("collecting side effects for instr %s", instr_def.name)
             try:
-                instr_def.operation.generate(context)
-                # TODO:
-                # if arch.InstrAttribute.NO_CONT:
-                # if arch.InstrAttribute.COND:
-                num_ins = len(
-                    [
-                        op
-                        for op in instr_def.operands.values()
-                        if seal5.model.Seal5OperandAttribute.IN in op.attributes
-                        or seal5.model.Seal5OperandAttribute.INOUT in op.attributes
-                    ]
-                )
-                has_side_effects = num_ins == 0
-                if context.may_load:
-                    if seal5.model.Seal5InstrAttribute.MAY_LOAD not in instr_def.attributes:
-                        instr_def.attributes[seal5.model.Seal5InstrAttribute.MAY_LOAD] = []
-                if context.may_store:
-                    if seal5.model.Seal5InstrAttribute.MAY_STORE not in instr_def.attributes:
-                        instr_def.attributes[seal5.model.Seal5InstrAttribute.MAY_STORE] = []
-                if has_side_effects:
-                    if seal5.model.Seal5InstrAttribute.HAS_SIDE_EFFECTS not in instr_def.attributes:
-                        instr_def.attributes[seal5.model.Seal5InstrAttribute.HAS_SIDE_EFFECTS] = []
-                # TODO
+                process_instr(instr_def, set_def)
                 metrics["n_success"] += 1
                 metrics["success_instructions"].append(instr_def.name)
             except Exception as ex:
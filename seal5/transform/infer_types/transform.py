@@ -49,6 +49,16 @@ def get_parser():
     return parser
 
 
+def process_instr(instr_def, set_def=None):
+    """Infer types for the behavior of a single instruction.
+
+    The visitor has to be patched into the model before (see run).
+    """
+    del set_def  # unused
+    logger.debug("inferring types for instr %s", instr_def.name)
+    instr_def.operation.generate(None)
+
+
 def run(args):
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -65,8 +75,7 @@ def run(args):
         patch_model(visitor)
         # TODO: handle RFS symbolically
         for _, instr_def in set_def.instructions.items():
-            logger.debug("inferring types for instr %s", instr_def.name)
-            instr_def.operation.generate(None)
+            process_instr(instr_def, set_def)
 
     dump_model(model_obj, out_path, compat=args.compat)
 
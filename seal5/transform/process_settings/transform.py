@@ -47,6 +47,8 @@ def run(args):
     if args.yaml is None:
         raise RuntimeError("Undefined --yaml not allowed")
     settings = Seal5Settings.from_yaml_file(args.yaml)
+    # Metrics of previous runs do not belong into the model (would change the model digest on every run)
+    settings.metrics = []
 
     if model_obj.settings is None:
         model_obj.settings = settings
@@ -37,6 +37,16 @@ def get_parser():
     return parser
 
 
+def process_instr(instr_def, set_def=None):
+    """Simplify trivial slices in the behavior of a single instruction.
+
+    The visitor has to be patched into the model before (see run).
+    """
+    del set_def  # unused
+    logger.debug("simplify trivial slices for instr %s", instr_def.name)
+    instr_def.operation.generate(None)
+
+
 def run(args):
     # initialize logging
     logger.setLevel(getattr(logging, args.log.upper()))
@@ -65,9 +75,8 @@ def run(args):
         # TODO: handle RFS symbolically
         for _, instr_def in set_def.instructions.items():
             metrics["n_instructions"] += 1
-            logger.debug("simplify trivial slices for instr %s", instr_def.name)
             try:
-                instr_def.operation.generate(None)
+                process_instr(instr_def, set_def)
                 metrics["n_success"] += 1
                 metrics["success_instructions"].append(instr_def.name)
             except Exception as ex: